@@ -0,0 +1,240 @@
+"""An in-process fake of the SmartCocoon cloud API, for benchmarks.
+
+Serves auth/sign_in, client_systems, thermostats, rooms and fans (list, get
+and update) over real HTTP on localhost, with configurable latency, error
+rate and fleet size. SmartCocoonAPI builds its URLs from the real host, so
+RedirectingSession rewrites them to the fake server on the way out; every
+other part of the request path -- headers, retries, JSON decoding -- runs
+exactly as it does against the cloud.
+"""
+
+import asyncio
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from aiohttp import ClientSession, web
+
+from pysmartcocoon.const import API_URL
+
+ROOM_COUNT = 20
+
+
+@dataclass
+class FakeServerConfig:
+    """How the fake cloud behaves."""
+
+    #: Number of fans on the account.
+    fans: int = 100
+    #: Seconds added to every response.
+    latency: float = 0.0
+    #: Fraction of requests, other than sign-in, answered with a 503.
+    error_rate: float = 0.0
+    #: Send ETags and answer matching conditional GETs with 304.
+    etags: bool = False
+    seed: int = 0
+
+
+@dataclass
+class FakeServerStats:
+    """What the fake cloud has served."""
+
+    requests: int = 0
+    errors: int = 0
+    not_modified: int = 0
+    by_path: dict[str, int] = field(default_factory=dict)
+
+
+def _fan(identifier: int, last_connection: str) -> dict[str, Any]:
+    return {
+        "id": identifier,
+        "fan_id": f"fan-{identifier:06d}",
+        "mode": "auto",
+        "fan_on": True,
+        "firmware_version": "1.0.0",
+        "is_room_estimating": False,
+        "connected": True,
+        "last_connection": last_connection,
+        "power": 3300,
+        "predicted_room_temperature": 21.0,
+        "room_id": identifier % ROOM_COUNT,
+        "thermostat_vendor": None,
+        "mqtt_username": f"user-{identifier}",
+        "mqtt_password": "secret",
+    }
+
+
+def _room(identifier: int) -> dict[str, Any]:
+    return {
+        "id": identifier,
+        "name": f"Room {identifier}",
+        "desired_temperature": 21.0,
+        "hvac_mode": "heat",
+        "hvac_state": "idle",
+        "is_estimating": False,
+        "predicted_temperature": 20.0,
+        "target_temperature": 21.0,
+        "temperature": 19.5,
+        "thermostat_id": 1,
+    }
+
+
+class FakeSmartCocoonServer:  # pylint: disable=too-many-instance-attributes
+    """Serve a fake SmartCocoon cloud on a free localhost port."""
+
+    def __init__(self, config: Optional[FakeServerConfig] = None) -> None:
+        self.config = config or FakeServerConfig()
+        self.stats = FakeServerStats()
+        self._random = random.Random(self.config.seed)
+        # Recent enough that no fan is reported as stale and disconnected.
+        now = datetime.now(timezone.utc).isoformat()
+        self._fans = {i: _fan(i, now) for i in range(self.config.fans)}
+        self._version = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/api/auth/sign_in", self._sign_in)
+        app.router.add_get("/api/client_systems", self._locations)
+        app.router.add_get("/api/thermostats", self._thermostats)
+        app.router.add_get("/api/rooms", self._rooms)
+        app.router.add_get("/api/fans", self._fan_list)
+        app.router.add_get("/api/fans/{identifier}", self._get_fan)
+        app.router.add_put("/api/fans/{identifier}", self._update_fan)
+        self._app = app
+
+    async def __aenter__(self) -> "FakeSmartCocoonServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        """Start serving."""
+        self._runner = web.AppRunner(self._app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}/api/"
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler: Any) -> Any:
+        self.stats.requests += 1
+        resource = request.match_info.route.resource
+        path = request.path if resource is None else resource.canonical
+        self.stats.by_path[path] = self.stats.by_path.get(path, 0) + 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        if (
+            request.path != "/api/auth/sign_in"
+            and self._random.random() < self.config.error_rate
+        ):
+            self.stats.errors += 1
+            return web.Response(status=503)
+        return await handler(request)
+
+    def _json(self, request: web.Request, body: Any) -> web.Response:
+        if not self.config.etags or request.method != "GET":
+            return web.json_response(body)
+        etag = f'"{self._version}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.stats.not_modified += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=json.dumps(body),
+            content_type="application/json",
+            headers={"ETag": etag},
+        )
+
+    async def _sign_in(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response(
+            {"data": {"id": 1, "email": body["email"]}},
+            headers={
+                "access-token": "token",
+                "client": "client",
+                "expiry": "86400",
+            },
+        )
+
+    async def _locations(self, request: web.Request) -> web.Response:
+        return self._json(
+            request,
+            {"client_systems": [{"id": 1, "location": {"postal_code": "A"}}]},
+        )
+
+    async def _thermostats(self, request: web.Request) -> web.Response:
+        return self._json(
+            request,
+            {
+                "thermostats": [
+                    {
+                        "id": 1,
+                        "name": "Hall",
+                        "thermostat_id": 1,
+                        "token": "t",
+                        "hvac_mode": "heat",
+                        "hvac_state": "idle",
+                        "temperature": 20.0,
+                        "target_temperature": 21.0,
+                        "vendor": "ecobee",
+                    }
+                ]
+            },
+        )
+
+    async def _rooms(self, request: web.Request) -> web.Response:
+        return self._json(
+            request, {"rooms": [_room(i) for i in range(ROOM_COUNT)]}
+        )
+
+    async def _fan_list(self, request: web.Request) -> web.Response:
+        return self._json(request, {"fans": list(self._fans.values())})
+
+    def _find_fan(self, request: web.Request) -> dict[str, Any]:
+        fan = self._fans.get(int(request.match_info["identifier"]))
+        if fan is None:
+            raise web.HTTPNotFound()
+        return fan
+
+    async def _get_fan(self, request: web.Request) -> web.Response:
+        return self._json(request, self._find_fan(request))
+
+    async def _update_fan(self, request: web.Request) -> web.Response:
+        fan = self._find_fan(request)
+        body = await request.json()
+        fan.update(mode=body["mode"], power=body["power"])
+        self._version += 1
+        return web.json_response(fan)
+
+
+class RedirectingSession:
+    """Send SmartCocoonAPI's requests to a fake server instead.
+
+    Only request and closed are used by SmartCocoonAPI.
+    """
+
+    def __init__(self, session: ClientSession, base_url: str) -> None:
+        self._session = session
+        self._base_url = base_url
+
+    @property
+    def closed(self) -> bool:
+        """Return whether the underlying session is closed."""
+        return self._session.closed
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Make the request against the fake server."""
+        return await self._session.request(
+            method, url.replace(API_URL, self._base_url, 1), **kwargs
+        )
@@ -0,0 +1,230 @@
+"""Benchmark the manager's refresh and command paths.
+
+Runs SmartCocoonManager against the in-process fake cloud in fake_server.py
+and reports, for each scenario, operations and requests per second, p50 and
+p99 latency per operation, and the peak memory of one operation.
+
+    python -m benchmarks.run_benchmarks --fans 500 --iterations 50
+    python -m benchmarks.run_benchmarks --latency 0.02 --error-rate 0.01
+
+Numbers are only comparable between runs on the same machine with the same
+arguments; the point is to catch regressions, not to predict the cloud.
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Optional
+
+from aiohttp import ClientSession
+
+from benchmarks.fake_server import (
+    FakeServerConfig,
+    FakeSmartCocoonServer,
+    RedirectingSession,
+)
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import FanMode
+from pysmartcocoon.manager import SmartCocoonManager
+
+Operation = Callable[[int], Awaitable[object]]
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """The measurements for one scenario."""
+
+    name: str
+    operations: int
+    requests: int
+    wall_time: float
+    latencies: tuple[float, ...]
+    #: The most memory, in bytes, one operation had live at once beyond
+    #: what was live before it started: the largest over a few operations
+    #: traced one at a time after the timed pass.
+    peak_bytes_per_op: float
+
+    @property
+    def ops_per_second(self) -> float:
+        """Return operations completed per second."""
+        return self.operations / self.wall_time if self.wall_time else 0.0
+
+    @property
+    def requests_per_second(self) -> float:
+        """Return requests served by the fake cloud per second."""
+        return self.requests / self.wall_time if self.wall_time else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Return a latency percentile in seconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def format(self) -> str:
+        """Return the result as one table row."""
+        return (
+            f"{self.name:<16} {self.operations:>6} "
+            f"{self.ops_per_second:>9.1f} {self.requests_per_second:>9.1f} "
+            f"{self.percentile(0.5) * 1000:>9.2f} "
+            f"{self.percentile(0.99) * 1000:>9.2f} "
+            f"{self.peak_bytes_per_op / 1024:>10.1f}"
+        )
+
+
+HEADER = (
+    f"{'scenario':<16} {'ops':>6} {'ops/s':>9} {'req/s':>9} "
+    f"{'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10}"
+)
+
+
+async def _async_measure(
+    name: str,
+    server: FakeSmartCocoonServer,
+    operation: Operation,
+    iterations: int,
+    concurrency: int,
+) -> BenchmarkResult:
+    """Time iterations of an operation, then trace a few for memory."""
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _async_timed(index: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await operation(index)
+            latencies.append(time.perf_counter() - started)
+
+    requests_before = server.stats.requests
+    started = time.perf_counter()
+    await asyncio.gather(*(_async_timed(i) for i in range(iterations)))
+    wall_time = time.perf_counter() - started
+    requests = server.stats.requests - requests_before
+
+    # Traced separately: tracemalloc slows everything it watches.
+    # Each is traced on its own, so its peak is not mixed up with the
+    # others' and memory still held from earlier ones is not counted.
+    peak = 0
+    tracemalloc.start()
+    try:
+        for index in range(max(1, min(iterations, 10))):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            await operation(iterations + index)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return BenchmarkResult(
+        name=name,
+        operations=iterations,
+        requests=requests,
+        wall_time=wall_time,
+        latencies=tuple(latencies),
+        peak_bytes_per_op=peak,
+    )
+
+
+def _scenarios(manager: SmartCocoonManager) -> dict[str, Operation]:
+    """Return each scenario's operation, run against a started manager."""
+    fans = list(manager.fans.values())
+
+    async def _update_data(_: int) -> object:
+        return await manager.async_update_data()
+
+    async def _update_fans(_: int) -> object:
+        return await manager.async_update_fans()
+
+    async def _set_fan_modes(index: int) -> object:
+        # Alternate speeds so no command is a no-op.
+        fan = fans[index % len(fans)]
+        speed = 30 if fan.speed_pct != 30 else 60
+        return await fan.async_set_fan_modes(FanMode.ON, speed)
+
+    return {
+        "update_data": _update_data,
+        "update_fans": _update_fans,
+        "set_fan_modes": _set_fan_modes,
+    }
+
+
+async def async_run_benchmarks(
+    config: FakeServerConfig,
+    iterations: int = 20,
+    concurrency: int = 1,
+    scenarios: Optional[list[str]] = None,
+    stream_fans: bool = False,
+) -> list[BenchmarkResult]:
+    """Run the scenarios against a fresh fake cloud, returning results."""
+    results: list[BenchmarkResult] = []
+    async with FakeSmartCocoonServer(config) as server:
+        async with ClientSession() as session:
+            api = SmartCocoonAPI(
+                RedirectingSession(  # type: ignore[arg-type]
+                    session, server.base_url
+                )
+            )
+            manager = SmartCocoonManager(api=api, stream_fans=stream_fans)
+            await manager.async_start_services("bench@example.com", "pw")
+            available = _scenarios(manager)
+            for name in scenarios or list(available):
+                results.append(
+                    await _async_measure(
+                        name,
+                        server,
+                        available[name],
+                        iterations,
+                        concurrency,
+                    )
+                )
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fans", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--etags", action="store_true")
+    parser.add_argument("--stream-fans", action="store_true")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=["update_data", "update_fans", "set_fan_modes"],
+        help="run only this scenario; may be repeated",
+    )
+    args = parser.parse_args(argv)
+
+    config = FakeServerConfig(
+        fans=args.fans,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        etags=args.etags,
+    )
+    results = asyncio.run(
+        async_run_benchmarks(
+            config,
+            args.iterations,
+            args.concurrency,
+            args.scenario,
+            args.stream_fans,
+        )
+    )
+    print(
+        f"fans={config.fans} latency={config.latency}s "
+        f"error_rate={config.error_rate} etags={config.etags} "
+        f"concurrency={args.concurrency} stream_fans={args.stream_fans}"
+    )
+    print(HEADER)
+    for result in results:
+        print(result.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 """SmartCocoon API REST Client."""
 
 from .api import SmartCocoonAPI
+from .fleet import SmartCocoonFleet
 from .manager import SmartCocoonManager
 
 __version__ = "1.4.6"
-__all__ = ["SmartCocoonManager", "SmartCocoonAPI"]
+__all__ = ["SmartCocoonManager", "SmartCocoonAPI", "SmartCocoonFleet"]
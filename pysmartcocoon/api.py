@@ -1,24 +1,49 @@
 """Define a manager to interact with SmartCocoon"""
 
 import asyncio
+import contextlib
 import json
 import logging
 import random
+import time
+from collections.abc import AsyncGenerator, Callable, Sequence
 from datetime import datetime, timedelta
 from typing import Any, Optional, cast
 
 import async_timeout
-from aiohttp import ClientResponseError, ClientSession, ClientTimeout
+from aiohttp import (
+    ClientError,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+)
 from aiohttp.client_exceptions import ClientConnectionError
 
+from pysmartcocoon.cache import ResponseCache
+from pysmartcocoon.codec import STDLIB_CODEC, JsonCodec
 from pysmartcocoon.const import (
     API_AUTH_URL,
     API_FANS_URL,
     API_HEADERS,
+    DEFAULT_STREAM_CHUNK_SIZE,
     DEFAULT_TIMEOUT,
+    DEFAULT_TOKEN_REFRESH_MARGIN,
+    MAX_TOKEN_REFRESH_RETRY_DELAY,
+    MIN_TOKEN_REFRESH_DELAY,
+)
+from pysmartcocoon.errors import (
+    RequestError,
+    SmartCocoonError,
+    UnauthorizedError,
+)
+from pysmartcocoon.metrics import (
+    RequestObserver,
+    RequestRecord,
+    endpoint_for_url,
 )
-from pysmartcocoon.errors import RequestError, UnauthorizedError
-from pysmartcocoon.redact import mask_identifier, redact
+from pysmartcocoon.ratelimit import TokenBucket
+from pysmartcocoon.redact import RedactedLog, mask_identifier
+from pysmartcocoon.streaming import JsonArrayStream
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
@@ -27,11 +52,24 @@ _LOGGER: logging.Logger = logging.getLogger(__name__)
 class SmartCocoonAPI:
     """This class will communicate with the SmartCocoon cloud API"""
 
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
     def __init__(
         self,
         session: Optional[ClientSession] = None,
         request_timeout: int = DEFAULT_TIMEOUT,
+        token_refresh_margin: Optional[int] = DEFAULT_TOKEN_REFRESH_MARGIN,
+        deduplicate_requests: bool = True,
+        response_cache: Optional[ResponseCache] = None,
+        rate_limiters: Sequence[TokenBucket] = (),
+        conditional_requests: bool = True,
+        observers: Sequence[RequestObserver] = (),
+        log_bodies_every: int = 1,
+        log_body_max_length: Optional[int] = None,
+        codec: Optional[JsonCodec] = None,
     ) -> None:
+        if log_bodies_every < 1:
+            raise ValueError("log_bodies_every must be at least 1")
+
         self._session = session
         # A session passed in belongs to the caller. Only a session this
         # class creates itself may be closed by it -- Home Assistant shares
@@ -47,6 +85,67 @@ class SmartCocoonAPI:
         self._headers_auth = API_HEADERS.copy()
         self._user_id: Optional[int] = None
 
+        # Proactive token refresh. The credentials are kept so the token can
+        # be renewed before it expires; a request that would otherwise fail
+        # with 401 waits on the one shared sign-in instead. None as the
+        # margin turns this off, leaving expiry to surface as before.
+        self._token_refresh_margin = token_refresh_margin
+        self._token_refresh_at: Optional[datetime] = None
+        self._credentials: Optional[tuple[str, str]] = None
+        self._sign_in: Optional[asyncio.Task[bool]] = None
+        self._refresh_task: Optional[asyncio.Task[None]] = None
+        # Refreshes failed in a row, which push the next attempt back.
+        self._refresh_failures = 0
+        # Set by close, so a sign-in finishing afterwards schedules nothing.
+        # Signing in or restoring auth again clears it.
+        self._closed = False
+
+        # Acquired in order before every attempt. Typically one bucket for
+        # this account and one shared by every account in the process.
+        self._rate_limiters = tuple(rate_limiters)
+        # Told about every 429, with its Retry-After in seconds if it had
+        # one, so callers can slow down more than one request's worth.
+        self._rate_limit_listeners: list[Callable[[Optional[float]], None]] = (
+            []
+        )
+
+        # Off unless a cache is supplied: cached data is stale by design.
+        self._response_cache = response_cache
+
+        # GETs in flight, keyed by URL and the token they were sent with.
+        self._deduplicate_requests = deduplicate_requests
+        self._in_flight: dict[
+            tuple[str, Optional[str]], asyncio.Future[dict | None]
+        ] = {}
+
+        # Validators from the last GET of each URL that sent any, as
+        # (ETag, Last-Modified, parsed body). The body is what a 304
+        # answers with, so it is returned again rather than re-decoded.
+        self._conditional_requests = conditional_requests
+        self._validators: dict[
+            str, tuple[Optional[str], Optional[str], dict[str, Any]]
+        ] = {}
+        # The body last handed out again for each URL, by a 304 or the
+        # response cache, rather than freshly decoded. is_unchanged checks
+        # against this, so a new body is never mistaken for an old one.
+        self._reused: dict[str, dict[str, Any]] = {}
+
+        # Told about every attempt and sign-in. With none, requests are not
+        # timed or measured at all.
+        self._observers = tuple(observers)
+
+        # DEBUG logging of bodies: only every Nth request's bodies are
+        # written, each cut to a maximum length, so DEBUG can stay on under
+        # load. Headers and status are always written.
+        self._log_bodies_every = log_bodies_every
+        self._log_body_max_length = log_body_max_length
+        self._requests_logged = 0
+
+        # Decodes response bodies. Streamed collections always use the
+        # standard library, whose decoder can resume partway through a
+        # buffer; request bodies are still encoded by aiohttp.
+        self._codec = codec or STDLIB_CODEC
+
     async def __aenter__(self) -> "SmartCocoonAPI":
         return self
 
@@ -75,7 +174,19 @@ class SmartCocoonAPI:
         A caller-supplied session is deliberately left open. Home Assistant
         passes its shared aiohttp session here, and closing that would break
         every other integration in the instance.
+
+        The background token refresh is stopped, along with any sign-in in
+        flight, and no further refresh is scheduled.
         """
+        self._closed = True
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        sign_in, self._sign_in = self._sign_in, None
+        if sign_in is not None and not sign_in.done():
+            sign_in.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await sign_in
         if self._owns_session and self._session is not None:
             if not self._session.closed:
                 await self._session.close()
@@ -83,19 +194,249 @@ class SmartCocoonAPI:
             self._owns_session = False
 
     async def async_authenticate(self, username: str, password: str) -> bool:
-        """Function to authenticate user with API"""
+        """Function to authenticate user with API
+
+        The credentials are kept so the token can be refreshed before it
+        expires without the caller signing in again.
+        """
+        self._credentials = (username, password)
+        self._closed = False
+        return await self._async_sign_in()
+
+    async def _async_sign_in(self) -> bool:
+        """Sign in, sharing one in-flight sign-in between every caller."""
+        if self._sign_in is None or self._sign_in.done():
+            self._sign_in = asyncio.create_task(self._async_do_sign_in())
+        # Shielded so one waiter being cancelled does not cancel the sign-in
+        # the others are waiting on.
+        return await asyncio.shield(self._sign_in)
+
+    async def _async_do_sign_in(self) -> bool:
         self._authenticated = False
+        if self._credentials is None:
+            return False
 
         # Authenticate with user and pass
+        username, password = self._credentials
         request_body: dict[str, Any] = {}
         request_body.setdefault("json", {})
         request_body["json"]["email"] = username
         request_body["json"]["password"] = password
 
-        await self.async_request("POST", API_AUTH_URL, **request_body)
+        refresh = self._bearer_token is not None
+        succeeded = False
+        try:
+            await self.async_request("POST", API_AUTH_URL, **request_body)
+            succeeded = self._authenticated
+        finally:
+            for observer in self._observers:
+                observer.on_sign_in(succeeded, refresh)
+            if not succeeded:
+                self._postpone_token_refresh()
+
+        if self._authenticated:
+            self._refresh_failures = 0
+            self._schedule_token_refresh()
+        return self._authenticated
+
+    def _postpone_token_refresh(self) -> None:
+        """Retry a failed refresh later, backing off as failures continue.
+
+        Otherwise the renewal stays due, and every request would start
+        another sign-in first -- during an auth outage, when that extra
+        traffic hurts most. Requests go ahead with the current token in
+        the meantime, and sign in again on their own 401.
+        """
+        if self._token_refresh_at is None:
+            return
+        delay = min(
+            MIN_TOKEN_REFRESH_DELAY * 2**self._refresh_failures,
+            MAX_TOKEN_REFRESH_RETRY_DELAY,
+        )
+        self._refresh_failures += 1
+        self._token_refresh_at = datetime.now() + timedelta(seconds=delay)
+        self._schedule_token_refresh()
+
+    def _refresh_time(self, expiration: datetime) -> Optional[datetime]:
+        """Return when a token expiring at expiration should be renewed."""
+        if self._token_refresh_margin is None:
+            return None
+        remaining = expiration - datetime.now()
+        lead = min(
+            timedelta(seconds=self._token_refresh_margin), remaining / 2
+        )
+        return expiration - lead
+
+    def _schedule_token_refresh(self) -> None:
+        """(Re)start the background task that renews the token."""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if (
+            self._closed
+            or self._token_refresh_at is None
+            or self._credentials is None
+        ):
+            return
 
+        delay = max(
+            (self._token_refresh_at - datetime.now()).total_seconds(),
+            MIN_TOKEN_REFRESH_DELAY,
+        )
+        self._refresh_task = asyncio.create_task(
+            self._async_refresh_token_later(delay)
+        )
+
+    async def _async_refresh_token_later(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        # Cleared first: the sign-in schedules the next refresh, and must not
+        # cancel this task while it is still waiting on the result.
+        self._refresh_task = None
+        _LOGGER.debug("Refreshing SmartCocoon token before it expires")
+        try:
+            if not await self._async_sign_in():
+                _LOGGER.warning("Unable to refresh the SmartCocoon token")
+        except SmartCocoonError as err:
+            # The current token is still valid until it expires, and the next
+            # request will try again, so this is not fatal.
+            _LOGGER.warning("Unable to refresh the SmartCocoon token: %s", err)
+
+    async def _async_wait_for_token(self) -> None:
+        """Hold a request until the token it would send is usable.
+
+        Waits on a sign-in already in flight, or starts one if the token is
+        due for renewal, so concurrent requests share a single sign-in
+        rather than each failing with 401.
+        """
+        in_flight = self._sign_in is not None and not self._sign_in.done()
+        due = (
+            self._credentials is not None
+            and self._token_refresh_at is not None
+            and datetime.now() >= self._token_refresh_at
+        )
+        if not in_flight and not due:
+            return
+
+        try:
+            await self._async_sign_in()
+        except SmartCocoonError as err:
+            # Let the request go ahead; it reports its own failure.
+            _LOGGER.debug("Token refresh before request failed: %s", err)
+
+    @property
+    def rate_limiters(self) -> tuple[TokenBucket, ...]:
+        """Return the rate limiters requests are paced by."""
+        return self._rate_limiters
+
+    def add_rate_limit_listener(
+        self, listener: Callable[[Optional[float]], None]
+    ) -> Callable[[], None]:
+        """Call listener with the Retry-After seconds of every 429.
+
+        The argument is None when the response did not say. Returns a
+        function that removes the listener again.
+        """
+        self._rate_limit_listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in self._rate_limit_listeners:
+                self._rate_limit_listeners.remove(listener)
+
+        return _remove
+
+    @property
+    def codec(self) -> JsonCodec:
+        """Return the codec response bodies are decoded with."""
+        return self._codec
+
+    @property
+    def observers(self) -> tuple[RequestObserver, ...]:
+        """Return the observers told about every request and sign-in."""
+        return self._observers
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Return the response cache, if one was supplied."""
+        return self._response_cache
+
+    @property
+    def authenticated(self) -> bool:
+        """Return whether the API holds credentials from a sign-in."""
         return self._authenticated
 
+    @property
+    def auth_state(self) -> Optional[dict[str, Any]]:
+        """Return the auth triple and its expiry, or None if not signed in.
+
+        This is enough to make authenticated requests without signing in
+        again, so treat it as a credential.
+        """
+        if not self._authenticated or self._bearer_token is None:
+            return None
+        return {
+            "access-token": self._bearer_token,
+            "client": self._api_client,
+            "uid": self._headers_auth.get("uid"),
+            "user_id": self._user_id,
+            "expiry": (
+                self._bearer_token_expiration.timestamp()
+                if self._bearer_token_expiration
+                else None
+            ),
+        }
+
+    def restore_auth(
+        self,
+        state: dict[str, Any],
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> bool:
+        """Reuse auth saved from auth_state instead of signing in.
+
+        Returns False, leaving the API unauthenticated, if the state is
+        incomplete or its token has already expired. With the username and
+        password as well, the restored token is refreshed before it expires
+        just as a signed-in one would be.
+        """
+        try:
+            token = state["access-token"]
+            client = state["client"]
+            uid = state["uid"]
+            expiry = state["expiry"]
+        except (KeyError, TypeError):
+            return False
+        if not token or not client or not uid or expiry is None:
+            return False
+
+        try:
+            expiration = datetime.fromtimestamp(expiry)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return False
+        if expiration <= datetime.now():
+            return False
+
+        self._bearer_token = token
+        self._bearer_token_expiration = expiration
+        self._api_client = client
+        self._user_id = state.get("user_id")
+        self._headers_auth["access-token"] = token
+        self._headers_auth["client"] = client
+        self._headers_auth["uid"] = uid
+        self._authenticated = True
+        self._closed = False
+
+        if username is not None and password is not None:
+            self._credentials = (username, password)
+        self._token_refresh_at = self._refresh_time(expiration)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Restored outside the event loop: nothing can be scheduled, but
+            # requests still renew the token once it is due.
+            return True
+        self._schedule_token_refresh()
+        return True
+
     def _compute_retry_delay(
         self, attempt: int, retry_after: str | None
     ) -> float:
@@ -108,7 +449,6 @@ class SmartCocoonAPI:
         base = 2 ** (attempt - 1)
         return base + random.uniform(0, 0.5 * base)
 
-    # pylint: disable=too-many-branches,too-many-statements
     async def async_request(
         self, method: str, url: str, **kwargs: Any
     ) -> dict | None:
@@ -118,8 +458,146 @@ class SmartCocoonAPI:
             path: path of the REST API endpoint.
         Returns:
             the Response object corresponding to the result of the API request.
+
+        Identical GETs made while one is already in flight share its request
+        and its parsed result, as do GETs answered from the response cache,
+        so the result must be treated as read-only.
+
+        A GET the server answers with 304 Not Modified returns the very
+        object the previous GET of that URL did; is_unchanged tells the
+        caller so.
+        """
+        cache = self._response_cache
+        if method != "GET" or kwargs:
+            try:
+                return await self._async_request(method, url, **kwargs)
+            finally:
+                # A write makes anything cached about its entity suspect.
+                if cache is not None:
+                    cache.invalidate_url(url)
+
+        if cache is not None and (cached := cache.get(url)) is not None:
+            _LOGGER.debug("Answered from cache - url: %s", url)
+            self._reused[url] = cached
+            return cached
+
+        data = await self._async_shared_get(url)
+        if cache is not None and data is not None:
+            cache.put(url, data)
+        return data
+
+    def is_unchanged(self, url: str, data: Any) -> bool:
+        """Return whether data was served again rather than fetched anew.
+
+        True when data came from a 304 Not Modified, or from the response
+        cache, so a caller that applied it last time can skip applying it
+        again. False for a body just decoded from a 200.
         """
+        return data is not None and self._reused.get(url) is data
+
+    def _conditional_headers(self, url: str) -> dict[str, str]:
+        """Return the headers for a GET, with validators if there are any."""
+        validated = self._validators.get(url)
+        if validated is None:
+            return self._headers_auth
+        etag, last_modified, _ = validated
+        headers = dict(self._headers_auth)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _store_validators(self, url: str, headers: Any, data: Any) -> None:
+        """Keep a GET's validators, or forget them if it sent none."""
+        etag = headers.get("ETag") if headers else None
+        last_modified = headers.get("Last-Modified") if headers else None
+        if isinstance(data, dict) and (etag or last_modified):
+            self._validators[url] = (etag, last_modified, data)
+        else:
+            self._validators.pop(url, None)
+
+    async def _async_shared_get(self, url: str) -> dict | None:
+        """GET a URL, sharing a request already in flight for it."""
+        if not self._deduplicate_requests:
+            return await self._async_request("GET", url)
+
+        key = (url, self._headers_auth.get("access-token"))
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self._async_request("GET", url))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(
+                lambda done: self._forget_in_flight(key, done)
+            )
+        else:
+            _LOGGER.debug("Joining in-flight request - url: %s", url)
+
+        # Shielded so one caller being cancelled does not cancel the request
+        # the other callers are waiting on.
+        return await asyncio.shield(in_flight)
+
+    def _forget_in_flight(
+        self,
+        key: tuple[str, Optional[str]],
+        done: "asyncio.Future[dict | None]",
+    ) -> None:
+        if self._in_flight.get(key) is done:
+            del self._in_flight[key]
+        # Marks any error as retrieved, so it is not reported again as
+        # unhandled when every caller was cancelled before it arrived.
+        if not done.cancelled():
+            done.exception()
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def _notify_attempt(
+        self,
+        method: str,
+        url: str,
+        status: Optional[int],
+        started: float,
+        attempt: int,
+        will_retry: bool,
+        response: Any = None,
+        **kwargs: Any,
+    ) -> None:
+        """Tell the observers how one attempt at a request went."""
+        record = RequestRecord(
+            method=method,
+            endpoint=endpoint_for_url(url),
+            status=status,
+            duration=time.perf_counter() - started,
+            attempt=attempt,
+            will_retry=will_retry,
+            bytes_sent=(
+                len(json.dumps(kwargs["json"]).encode())
+                if "json" in kwargs
+                else 0
+            ),
+            bytes_received=(
+                response.content_length or 0 if response is not None else 0
+            ),
+        )
+        for observer in self._observers:
+            observer.on_request(record)
+
+    def _sample_bodies(self) -> bool:
+        """Return whether this request's bodies are logged at DEBUG."""
+        sampled = self._requests_logged % self._log_bodies_every == 0
+        self._requests_logged += 1
+        return sampled
+
+    def _loggable_body(self, body: Any, as_json: bool = True) -> RedactedLog:
+        return RedactedLog(body, as_json, self._log_body_max_length)
+
+    # pylint: disable=too-many-branches,too-many-statements,too-many-locals
+    async def _async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> dict | None:
         # pylint: disable=broad-except
+        if url != API_AUTH_URL:
+            await self._async_wait_for_token()
+
         session = self._ensure_session()
 
         data = None
@@ -128,30 +606,46 @@ class SmartCocoonAPI:
             "Calling SmartCocoon API - method: %s, url: %s", method, url
         )
 
-        # Enhanced debug logging for HA integration
+        # Enhanced debug logging for HA integration. Redaction and
+        # formatting are left to the handlers, so they are only paid for
+        # when a record is actually written.
+        log_bodies = False
         if _LOGGER.isEnabledFor(logging.DEBUG):
+            log_bodies = self._sample_bodies()
             _LOGGER.debug(
                 "┌─ API REQUEST ──────────────────────────────────────────────"
             )
             _LOGGER.debug("│ Method: %s", method)
             _LOGGER.debug("│ URL: %s", url)
-            _LOGGER.debug(
-                "│ Headers:\n%s",
-                json.dumps(redact(self._headers_auth), indent=2),
-            )
-            if "json" in kwargs:
+            _LOGGER.debug("│ Headers:\n%s", RedactedLog(self._headers_auth))
+            if not log_bodies:
+                if "json" in kwargs or "data" in kwargs:
+                    _LOGGER.debug(
+                        "│ Request body: not sampled (1 in %d logged)",
+                        self._log_bodies_every,
+                    )
+            elif "json" in kwargs:
                 _LOGGER.debug(
                     "│ Request body (JSON):\n%s",
-                    json.dumps(redact(kwargs["json"]), indent=2),
+                    self._loggable_body(kwargs["json"]),
                 )
-            if "data" in kwargs:
+            elif "data" in kwargs:
                 _LOGGER.debug(
-                    "│ Request body (data): %s", redact(kwargs["data"])
+                    "│ Request body (data): %s",
+                    self._loggable_body(kwargs["data"], as_json=False),
                 )
             _LOGGER.debug(
                 "└────────────────────────────────────────────────────────────"
             )
 
+        # Only plain GETs are conditional; their bodies are the same for
+        # every caller and safe to hand out again.
+        conditional = (
+            self._conditional_requests and method == "GET" and not kwargs
+        )
+
+        observed = bool(self._observers)
+
         # Basic retry loop for transient errors
         max_attempts = 3
         for attempt in range(1, max_attempts + 1):
@@ -163,12 +657,21 @@ class SmartCocoonAPI:
                     method,
                     url,
                 )
+            # Paced before the timeout starts, so time spent waiting for a
+            # slot is not counted against the request itself.
+            for limiter in self._rate_limiters:
+                await limiter.acquire()
+            started = time.perf_counter() if observed else 0.0
             try:
                 async with async_timeout.timeout(self._request_timeout):
                     response = await session.request(
                         method,
                         url,
-                        headers=self._headers_auth,
+                        headers=(
+                            self._conditional_headers(url)
+                            if conditional
+                            else self._headers_auth
+                        ),
                         **kwargs,
                     )
                     _LOGGER.debug(
@@ -184,26 +687,74 @@ class SmartCocoonAPI:
                         _LOGGER.debug("│ Method: %s | URL: %s", method, url)
                         _LOGGER.debug("│ Status: %s", response.status)
                         _LOGGER.debug(
-                            "│ Headers:\n%s",
-                            json.dumps(
-                                redact(dict(response.headers)), indent=2
-                            ),
+                            "│ Headers:\n%s", RedactedLog(response.headers)
                         )
 
                     response.raise_for_status()
-                    data = await response.json(content_type=None)
+                    validated = self._validators.get(url)
+                    if (
+                        conditional
+                        and response.status == 304
+                        and validated is not None
+                    ):
+                        _LOGGER.debug("Not modified - url: %s", url)
+                        data = self._reused[url] = validated[2]
+                        for limiter in self._rate_limiters:
+                            limiter.on_success()
+                        if observed:
+                            self._notify_attempt(
+                                method, url, 304, started, attempt, False
+                            )
+                        break
+                    data = await response.json(
+                        content_type=None, loads=self._codec.loads
+                    )
+                    self._reused.pop(url, None)
+                    if conditional:
+                        self._store_validators(url, response.headers, data)
 
                     # Debug: Log response body
                     if _LOGGER.isEnabledFor(logging.DEBUG):
-                        _LOGGER.debug(
-                            "│ Response body:\n%s",
-                            json.dumps(redact(data), indent=2),
-                        )
+                        if log_bodies:
+                            _LOGGER.debug(
+                                "│ Response body:\n%s",
+                                self._loggable_body(data),
+                            )
+                        else:
+                            _LOGGER.debug(
+                                "│ Response body: not sampled"
+                                " (1 in %d logged)",
+                                self._log_bodies_every,
+                            )
                         _LOGGER.debug(
                             "└────────────────────────────────────────────────────────────"  # pylint: disable=line-too-long
                         )
+                    for limiter in self._rate_limiters:
+                        limiter.on_success()
+                    if observed:
+                        self._notify_attempt(
+                            method,
+                            url,
+                            response.status,
+                            started,
+                            attempt,
+                            False,
+                            response,
+                            **kwargs,
+                        )
                     break
             except ClientResponseError as err:
+                if observed:
+                    self._notify_attempt(
+                        method,
+                        url,
+                        err.status,
+                        started,
+                        attempt,
+                        attempt < max_attempts
+                        and (err.status == 429 or 500 <= err.status < 600),
+                        **kwargs,
+                    )
                 if err.status in (401, 403):
                     _LOGGER.debug(
                         "Auth error (%s), re-authenticating", err.status
@@ -215,10 +766,20 @@ class SmartCocoonAPI:
                         # Raise UnauthorizedError so caller can re-authenticate
                         raise UnauthorizedError(str(err)) from err
                     raise UnauthorizedError(str(err)) from err
-                if err.status == 429 and attempt < max_attempts:
-                    retry_after = (
-                        err.headers.get("Retry-After") if err.headers else None
+                retry_after = (
+                    err.headers.get("Retry-After") if err.headers else None
+                )
+                if err.status == 429:
+                    retry_seconds = (
+                        float(retry_after)
+                        if retry_after and retry_after.isdigit()
+                        else None
                     )
+                    for limiter in self._rate_limiters:
+                        limiter.on_rate_limited(retry_seconds)
+                    for listener in list(self._rate_limit_listeners):
+                        listener(retry_seconds)
+                if err.status == 429 and attempt < max_attempts:
                     await asyncio.sleep(
                         self._compute_retry_delay(attempt, retry_after)
                     )
@@ -228,11 +789,25 @@ class SmartCocoonAPI:
                     continue
                 raise RequestError(str(err)) from err
             except (ClientConnectionError, asyncio.TimeoutError) as err:
+                if observed:
+                    self._notify_attempt(
+                        method,
+                        url,
+                        None,
+                        started,
+                        attempt,
+                        attempt < max_attempts,
+                        **kwargs,
+                    )
                 if attempt < max_attempts:
                     await asyncio.sleep(2 ** (attempt - 1))
                     continue
                 raise RequestError(str(err)) from err
             except Exception as err:  # pylint: disable=broad-except
+                if observed:
+                    self._notify_attempt(
+                        method, url, None, started, attempt, False, **kwargs
+                    )
                 _LOGGER.exception("API call to SmartCocoon failed")
                 raise RequestError(str(err)) from err
 
@@ -281,6 +856,9 @@ class SmartCocoonAPI:
             self._bearer_token_expiration = datetime.now() + timedelta(
                 seconds=int(response.headers["expiry"]) - 10
             )
+            self._token_refresh_at = self._refresh_time(
+                self._bearer_token_expiration
+            )
             self._api_client = response.headers["client"]
 
             self._headers_auth["access-token"] = self._bearer_token
@@ -309,6 +887,82 @@ class SmartCocoonAPI:
         _LOGGER.error("Response data is None")
         return None
 
+    async def async_stream_items(
+        self,
+        url: str,
+        key: str,
+        chunk_size: int = DEFAULT_STREAM_CHUNK_SIZE,
+    ) -> AsyncGenerator[Any, None]:
+        """GET a collection, yielding the items under key as they arrive.
+
+        The body is parsed as it is read, so only the item being parsed is
+        held rather than the whole response. That rules out what needs the
+        whole body: nothing is retried, since items may already have been
+        yielded, and the request is never shared, cached or conditional.
+
+        Raises UnauthorizedError or RequestError as async_request does,
+        including partway through if the body is cut short or malformed.
+        """
+        await self._async_wait_for_token()
+        session = self._ensure_session()
+        for limiter in self._rate_limiters:
+            await limiter.acquire()
+        _LOGGER.debug("Streaming SmartCocoon API - url: %s", url)
+
+        started = time.perf_counter() if self._observers else 0.0
+        status: Optional[int] = None
+        response = None
+        parser = JsonArrayStream(key)
+        try:
+            async with async_timeout.timeout(self._request_timeout):
+                response = await session.request(
+                    "GET", url, headers=self._headers_auth
+                )
+            status = response.status
+            response.raise_for_status()
+            while True:
+                # Timed per chunk: a large body may rightly take longer
+                # than the timeout as a whole.
+                async with async_timeout.timeout(self._request_timeout):
+                    chunk = await response.content.read(chunk_size)
+                if not chunk:
+                    break
+                for item in parser.feed(chunk):
+                    yield item
+            for item in parser.close():
+                yield item
+        except ClientResponseError as err:
+            if err.status in (401, 403):
+                raise UnauthorizedError(str(err)) from err
+            if err.status == 429:
+                retry_after = (
+                    err.headers.get("Retry-After") if err.headers else None
+                )
+                retry_seconds = (
+                    float(retry_after)
+                    if retry_after and retry_after.isdigit()
+                    else None
+                )
+                for limiter in self._rate_limiters:
+                    limiter.on_rate_limited(retry_seconds)
+                for listener in list(self._rate_limit_listeners):
+                    listener(retry_seconds)
+            raise RequestError(str(err)) from err
+        except (ClientError, asyncio.TimeoutError, ValueError) as err:
+            # ClientError includes a body cut short (ClientPayloadError);
+            # ValueError is a body that is not the JSON expected.
+            raise RequestError(str(err)) from err
+        else:
+            for limiter in self._rate_limiters:
+                limiter.on_success()
+        finally:
+            if response is not None:
+                response.release()
+            if self._observers:
+                self._notify_attempt(
+                    "GET", url, status, started, 1, False, response
+                )
+
     async def async_get_fan(self, fan_identifier: int) -> dict | None:
         """Fetch a single fan by internal identifier."""
         return await self.async_request(
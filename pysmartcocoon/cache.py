@@ -0,0 +1,131 @@
+"""Define a response cache for SmartCocoon GET requests.
+
+Locations, thermostats and rooms change far less often than fans, yet a
+refresh fetches every collection each time. The cache keeps parsed GET
+responses for a time-to-live chosen per entity type, so a poll only goes to
+the cloud for what might actually have changed.
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from typing import Any, Optional
+
+from pysmartcocoon.const import (
+    API_FANS_URL,
+    API_URL,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_CACHE_TTLS,
+    EntityType,
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+def entity_type_for_url(url: str) -> Optional[EntityType]:
+    """Return the entity type a request URL reads, if it is one of them.
+
+    Both a collection URL and a single fan's URL belong to their type, so
+    writing to a fan can invalidate the fan list as well.
+    """
+    if url.startswith(API_FANS_URL):
+        return EntityType.FANS
+    for entity in EntityType:
+        if url == f"{API_URL}{entity.value}":
+            return entity
+    return None
+
+
+class ResponseCache:
+    """Cache parsed GET responses with a time-to-live per entity type.
+
+    An entity type with no TTL, or a TTL of zero, is never cached. The least
+    recently used entry is evicted once max_entries is reached.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Mapping[EntityType, float]] = None,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttls = dict(DEFAULT_CACHE_TTLS if ttls is None else ttls)
+        self._max_entries = max_entries
+        self._clock = clock
+        # url -> (entity type, expiry time, parsed response)
+        self._entries: OrderedDict[
+            str, tuple[EntityType, float, dict[str, Any]]
+        ] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def hits(self) -> int:
+        """Return the number of lookups answered from the cache."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Return the number of cacheable lookups that went to the cloud."""
+        return self._misses
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _ttl(self, url: str) -> tuple[Optional[EntityType], float]:
+        entity = entity_type_for_url(url)
+        if entity is None:
+            return None, 0.0
+        return entity, self._ttls.get(entity, 0.0)
+
+    def is_cacheable(self, url: str) -> bool:
+        """Return whether responses for this URL are cached at all."""
+        return self._ttl(url)[1] > 0
+
+    def get(self, url: str) -> Optional[dict[str, Any]]:
+        """Return the cached response for a URL, or None if there is none.
+
+        Lookups for URLs that are never cached are not counted.
+        """
+        if not self.is_cacheable(url):
+            return None
+
+        entry = self._entries.get(url)
+        if entry is not None and entry[1] > self._clock():
+            self._entries.move_to_end(url)
+            self._hits += 1
+            return entry[2]
+
+        if entry is not None:
+            del self._entries[url]
+        self._misses += 1
+        return None
+
+    def put(self, url: str, data: dict[str, Any]) -> None:
+        """Store a response, if responses for this URL are cached."""
+        entity, ttl = self._ttl(url)
+        if entity is None or ttl <= 0:
+            return
+
+        self._entries[url] = (entity, self._clock() + ttl, data)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, entity: Optional[EntityType] = None) -> None:
+        """Drop cached responses for one entity type, or for all of them."""
+        if entity is None:
+            self._entries.clear()
+            return
+        for url in [
+            url for url, entry in self._entries.items() if entry[0] is entity
+        ]:
+            del self._entries[url]
+
+    def invalidate_url(self, url: str) -> None:
+        """Drop everything cached for the entity type a URL belongs to."""
+        entity = entity_type_for_url(url)
+        if entity is not None:
+            _LOGGER.debug("Invalidating cached %s responses", entity.value)
+            self.invalidate(entity)
@@ -0,0 +1,114 @@
+"""Define the change sets produced by SmartCocoonManager refreshes.
+
+A refresh used to rebuild every location, thermostat and room, so consumers
+could not tell what had actually changed and re-rendered everything. The
+manager now updates existing entities in place and reports only the
+differences, field by field.
+"""
+
+from collections.abc import Callable, Iterator, Mapping
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any, Optional
+
+from pysmartcocoon.const import EntityType
+
+
+class ChangeKind(StrEnum):
+    """What happened to an entity."""
+
+    ADDED = "added"
+    REMOVED = "removed"
+    CHANGED = "changed"
+
+
+@dataclass(frozen=True)
+class EntityChange:
+    """One entity that was added, removed or changed by a refresh."""
+
+    entity_type: EntityType
+    #: The key the entity is stored under on the manager.
+    identifier: Any
+    kind: ChangeKind
+    #: Changed fields as field -> (old, new). For an added entity every
+    #: field is listed with an old value of None; for a removed one, none.
+    fields: Mapping[str, tuple[Any, Any]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """Every change made by one refresh. Empty when nothing changed."""
+
+    changes: tuple[EntityChange, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __iter__(self) -> Iterator[EntityChange]:
+        return iter(self.changes)
+
+    def of_type(self, entity_type: EntityType) -> list[EntityChange]:
+        """Return the changes to one entity type."""
+        return [
+            change
+            for change in self.changes
+            if change.entity_type is entity_type
+        ]
+
+    @property
+    def added(self) -> list[EntityChange]:
+        """Return the entities that are new."""
+        return [c for c in self.changes if c.kind is ChangeKind.ADDED]
+
+    @property
+    def removed(self) -> list[EntityChange]:
+        """Return the entities that are gone."""
+        return [c for c in self.changes if c.kind is ChangeKind.REMOVED]
+
+    @property
+    def changed(self) -> list[EntityChange]:
+        """Return the entities with changed fields."""
+        return [c for c in self.changes if c.kind is ChangeKind.CHANGED]
+
+
+@dataclass(frozen=True)
+class Subscription:
+    """A callback and the changes it wants to hear about.
+
+    With no entity type it receives every change; with an identifier as
+    well, only changes to that one entity.
+    """
+
+    callback: Callable[[ChangeSet], None]
+    entity_type: Optional[EntityType] = None
+    identifier: Any = None
+
+    def select(self, change_set: ChangeSet) -> ChangeSet:
+        """Return the part of a change set this subscription wants."""
+        if self.entity_type is None:
+            return change_set
+        return ChangeSet(
+            tuple(
+                change
+                for change in change_set
+                if change.entity_type is self.entity_type
+                and (
+                    self.identifier is None
+                    or change.identifier == self.identifier
+                )
+            )
+        )
+
+
+def diff_state(
+    old: Mapping[str, Any], new: Mapping[str, Any]
+) -> dict[str, tuple[Any, Any]]:
+    """Return the fields whose values differ, as field -> (old, new)."""
+    return {
+        name: (old.get(name), value)
+        for name, value in new.items()
+        if old.get(name) != value
+    }
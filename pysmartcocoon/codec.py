@@ -0,0 +1,89 @@
+"""Define the JSON codecs responses and snapshots can be decoded with.
+
+Every poll decodes a response per collection, so the decoder is worth
+choosing. The standard library's json is always available; orjson and
+msgspec are several times faster and are used when asked for, falling back
+to the standard library when they are not installed.
+
+Whichever codec is used, payloads decode to the same plain dicts and lists,
+so entities and callers see no difference.
+"""
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Union
+
+from pysmartcocoon.errors import SmartCocoonError
+
+
+@dataclass(frozen=True)
+class JsonCodec:
+    """A JSON decoder and encoder, and the library they come from."""
+
+    name: str
+    #: Decode a document from str or UTF-8 bytes, raising ValueError if it
+    #: is not valid JSON.
+    loads: Callable[[Union[str, bytes]], Any]
+    #: Encode a document compactly to UTF-8 bytes.
+    dumps: Callable[[Any], bytes]
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+STDLIB_CODEC = JsonCodec(name="json", loads=json.loads, dumps=_stdlib_dumps)
+
+
+def orjson_codec() -> JsonCodec:
+    """Return a codec backed by orjson.
+
+    Raises SmartCocoonError if orjson is not installed; it is installed with
+    ``pip install pysmartcocoon[orjson]``.
+    """
+    try:
+        import orjson  # pylint: disable=import-outside-toplevel
+    except ImportError as err:
+        raise SmartCocoonError(
+            "The orjson codec needs orjson: pip install pysmartcocoon[orjson]"
+        ) from err
+    # pylint: disable-next=no-member
+    return JsonCodec(name="orjson", loads=orjson.loads, dumps=orjson.dumps)
+
+
+def msgspec_codec() -> JsonCodec:
+    """Return a codec backed by msgspec.
+
+    Raises SmartCocoonError if msgspec is not installed; it is installed
+    with ``pip install pysmartcocoon[msgspec]``.
+    """
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        import msgspec  # type: ignore[import-not-found]
+    except ImportError as err:
+        raise SmartCocoonError(
+            "The msgspec codec needs msgspec: "
+            "pip install pysmartcocoon[msgspec]"
+        ) from err
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def _loads(raw: Union[str, bytes]) -> Any:
+        # msgspec's errors are not ValueErrors, unlike json's and orjson's.
+        try:
+            return decoder.decode(raw)
+        except msgspec.DecodeError as err:
+            raise ValueError(str(err)) from err
+
+    return JsonCodec(name="msgspec", loads=_loads, dumps=encoder.encode)
+
+
+def best_available_codec() -> JsonCodec:
+    """Return the fastest codec installed: orjson, msgspec, then json."""
+    for factory in (orjson_codec, msgspec_codec):
+        try:
+            return factory()
+        except SmartCocoonError:
+            continue
+    return STDLIB_CODEC
@@ -17,6 +17,78 @@ DEFAULT_FAN_POWER_PCT = 33
 
 DEFAULT_TIMEOUT: int = 30
 
+# The API keeps reporting a fan as connected for a while after it drops off.
+# A fan it reports connected is taken to be disconnected once its last
+# connection is more than this many seconds old.
+STALE_CONNECTION_AFTER: int = 15 * 60
+
+# Bytes read at a time when a collection is streamed rather than decoded
+# whole. Memory held is about one chunk plus the item being parsed.
+DEFAULT_STREAM_CHUNK_SIZE: int = 16 * 1024
+
+# Tokens are refreshed this many seconds before they expire, or halfway
+# through their lifetime if that is shorter. Refreshes are never scheduled
+# closer together than the minimum delay, however short the lifetime.
+DEFAULT_TOKEN_REFRESH_MARGIN: int = 300
+MIN_TOKEN_REFRESH_DELAY: int = 30
+# A failed refresh is retried after the minimum delay, doubling with each
+# further failure up to this many seconds.
+MAX_TOKEN_REFRESH_RETRY_DELAY: int = 600
+
+# Fleet defaults. Every account talks to the same host, so the per-host limit
+# is what actually bounds the number of open sockets.
+DEFAULT_FLEET_CONCURRENCY: int = 20
+DEFAULT_FLEET_CONNECTION_LIMIT: int = 100
+DEFAULT_FLEET_CONNECTIONS_PER_HOST: int = 20
+
+# Polling for subscribers, in seconds. Polls run at the update interval,
+# every fast interval for the fast window after a command, and back off
+# towards the maximum while nothing changes. With MQTT enabled, fan state
+# also arrives between polls.
+DEFAULT_UPDATE_INTERVAL: int = 60
+DEFAULT_FAST_POLL_INTERVAL: int = 5
+DEFAULT_FAST_POLL_WINDOW: int = 30
+DEFAULT_MAX_POLL_INTERVAL: int = 900
+
+# Samples of the fleet's aggregates kept by FleetTelemetry: a day's worth
+# at the default update interval.
+DEFAULT_TELEMETRY_HISTORY: int = 24 * 60
+
+# Per-fan history kept by FanHistory: the latest changes as they happened,
+# then averages over fixed buckets -- by default a day of quarter hours.
+DEFAULT_HISTORY_POINTS: int = 256
+DEFAULT_HISTORY_BUCKETS: int = 96
+DEFAULT_HISTORY_BUCKET_SECONDS: int = 15 * 60
+
+# How many fans a batch of commands updates at once.
+DEFAULT_BATCH_CONCURRENCY: int = 8
+
+
+# MQTT topics. SmartCocoon does not publish its topic layout, so these are
+# templates, formatted with the fan's fan_id and identifier, that can be
+# overridden per transport.
+DEFAULT_MQTT_COMMAND_TOPIC = "smartcocoon/{fan_id}/command"
+DEFAULT_MQTT_STATE_TOPIC = "smartcocoon/{fan_id}/state"
+DEFAULT_MQTT_TIMEOUT: int = 5
+# How long, in seconds, a fan has to report the state a command asked for
+# before the command is sent through the REST API instead.
+DEFAULT_MQTT_CONFIRM_TIMEOUT: int = 5
+
+
+# Upper bounds, in seconds, of the request latency histogram buckets. The
+# cloud usually answers in a few hundred milliseconds; the top buckets catch
+# requests that ran into the timeout.
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
 
 class EntityType(Enum):
     """Class to define entity types"""
@@ -29,6 +101,17 @@ class EntityType(Enum):
     FANS = "fans"
 
 
+# Suggested response cache lifetimes, in seconds. Locations almost never
+# change; fans are worth caching only long enough to absorb a burst of polls.
+DEFAULT_CACHE_TTLS: dict[EntityType, float] = {
+    EntityType.LOCATIONS: 6 * 60 * 60,
+    EntityType.THERMOSTATS: 5 * 60,
+    EntityType.ROOMS: 5 * 60,
+    EntityType.FANS: 5,
+}
+DEFAULT_CACHE_MAX_ENTRIES: int = 256
+
+
 class FanMode(StrEnum):
     """Fan mode."""
 
@@ -0,0 +1,68 @@
+"""Define the base of entities held exactly as the API sends them."""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from operator import attrgetter
+from typing import Any
+
+from pysmartcocoon.changes import diff_state
+
+
+class RecordEntity(ABC):
+    """An entity whose fields are read straight from an API record.
+
+    A subclass lists its fields in __slots__ and implements _read, _apply
+    and state; one that leaves any out cannot be instantiated.
+
+    Because the fields are kept as read, those read from a record are its
+    fingerprint: update compares them with the entity's own first, and a
+    record that matches, as most do, costs nothing further.
+    """
+
+    __slots__: tuple[str, ...] = ()
+
+    # Every field, for comparing two entities without building dicts.
+    _values: Callable[["RecordEntity"], tuple[Any, ...]]
+    _identifier: int
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._values = attrgetter(*cls.__slots__)
+
+    def __init__(self, data: dict[str, Any]) -> None:
+        """Initialize."""
+        self._apply(self._read(data))
+
+    @staticmethod
+    @abstractmethod
+    def _read(data: dict[str, Any], /) -> tuple[Any, ...]:
+        """Read the fields from a record, in the order of __slots__.
+
+        Raises KeyError, before anything is assigned, if one is missing.
+        """
+
+    @abstractmethod
+    def _apply(self, values: tuple[Any, ...]) -> None:
+        """Assign the fields _read returned."""
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, type(self)):
+            return NotImplemented
+        return self._values(self) == other._values(other)
+
+    def __hash__(self) -> int:
+        return hash(self._identifier)
+
+    @property
+    @abstractmethod
+    def state(self) -> dict[str, Any]:
+        """Return the entity's fields, for detecting changes."""
+
+    def update(self, data: dict[str, Any]) -> dict[str, tuple[Any, Any]]:
+        """Update in place from API data, returning the changed fields."""
+        values = self._read(data)
+        if values == self._values(self):
+            return {}
+        old = self.state
+        self._apply(values)
+        return diff_state(old, self.state)
@@ -1,26 +1,105 @@
 """Define a SmartCocoon Fan class."""
 
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Any, Optional
+from operator import attrgetter, itemgetter
+from typing import TYPE_CHECKING, Any, Optional
 
 from pysmartcocoon.api import SmartCocoonAPI
-from pysmartcocoon.const import FanMode
+from pysmartcocoon.changes import diff_state
+from pysmartcocoon.const import STALE_CONNECTION_AFTER, FanMode
 from pysmartcocoon.fan_helpers import derive_mode_from_speed, resolve_speed
 
+if TYPE_CHECKING:
+    from pysmartcocoon.mqtt import MqttFanTransport
+
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
+# The values a mode may have.
+_MODES = frozenset(mode.value for mode in FanMode)
+
+
+def _has_type(value: Any, types: tuple[type, ...]) -> bool:
+    """Return whether value is one of types, not counting bools as ints."""
+    if isinstance(value, bool):
+        return bool in types
+    return isinstance(value, types)
+
 
 # pylint: disable=too-many-instance-attributes, too-many-public-methods
 class Fan:
     """Define the fan."""
 
+    # Tens of thousands of fans may be held at once across a fleet.
+    __slots__ = (
+        "_fan_id",
+        "_identifier",
+        "_fan_on",
+        "_firmware_version",
+        "_is_room_estimating",
+        "_connected",
+        "_last_connection",
+        "_mode",
+        "_power",
+        "_predicted_room_temperature",
+        "_room_id",
+        "_thermostat_vendor",
+        "_mqtt_username",
+        "_mqtt_password",
+        "_room_name",
+        "_api",
+        "_refresh_on_partial_response",
+        "_transport",
+        "_awaiting_refresh",
+        "_unconfirmed_command",
+        "_coalesce_delay",
+        "_pending_result",
+        "_pending_target",
+        "_pending_task",
+        "_fingerprint",
+        "_stale_at",
+    )
+
+    # The fan's data, for comparing two fans without building dicts. The
+    # API, transport and command state are left out.
+    _values = attrgetter(
+        "_fan_id",
+        "_identifier",
+        "_fan_on",
+        "_firmware_version",
+        "_is_room_estimating",
+        "_connected",
+        "_last_connection",
+        "_mode",
+        "_power",
+        "_predicted_room_temperature",
+        "_room_id",
+        "_thermostat_vendor",
+        "_mqtt_username",
+        "_mqtt_password",
+        "_room_name",
+    )
+
     def __init__(
         self,
         fan_id: str,
         api: SmartCocoonAPI,
+        coalesce_delay: Optional[float] = None,
+        refresh_on_partial_response: bool = True,
     ) -> None:
-        """Initialize."""
+        """Initialize.
+
+        coalesce_delay, in seconds, turns on command coalescing: changes
+        made within that window of the first one are sent as a single update
+        carrying the last requested mode and speed. None sends every change
+        immediately.
+
+        refresh_on_partial_response controls whether an update whose
+        response is not a complete fan payload is followed by a fetch of the
+        fan. A complete payload is always applied directly.
+        """
 
         # Fan attributes from SmartCocoon
         self._fan_id: str = fan_id
@@ -42,6 +121,39 @@ class Fan:
         self._room_name: Optional[str] = None
 
         self._api = api
+        self._refresh_on_partial_response = refresh_on_partial_response
+        self._transport: Optional["MqttFanTransport"] = None
+        # Set when an update was accepted with a partial response and the
+        # caller chose to refresh later; cleared by the next full payload.
+        self._awaiting_refresh = False
+        # Set when a command sent through the API changed the fan locally;
+        # cleared by the next full payload, which says whether it took.
+        self._unconfirmed_command = False
+
+        # Command coalescing. The pending target is (mode, mode value, power)
+        # and is re-applied just before sending, because the refresh after an
+        # earlier update may have overwritten the local values in between.
+        self._coalesce_delay = coalesce_delay
+        self._pending_result: Optional[asyncio.Future[bool]] = None
+        self._pending_target: Optional[tuple[FanMode, str, int]] = None
+        self._pending_task: Optional[asyncio.Task[None]] = None
+
+        # The fields of the last payload applied, exactly as they were read,
+        # so an identical payload is recognised without applying it again.
+        # Cleared whenever the fan is changed locally, since the payload no
+        # longer describes it.
+        self._fingerprint: Optional[tuple[Any, ...]] = None
+        # When, as a timestamp, a fan reported connected should be taken to
+        # have dropped off. None unless connected with a last connection.
+        self._stale_at: Optional[float] = None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Fan):
+            return NotImplemented
+        return self._values(self) == other._values(other)
+
+    def __hash__(self) -> int:
+        return hash(self._fan_id)
 
     @property
     def identifier(self) -> Optional[int]:  # pylint: disable=invalid-name
@@ -215,6 +327,7 @@ class Fan:
         )
 
         self._power = fan_speed_pct * 100
+        self._fingerprint = None
         return True
 
     def set_room_name(self, room_name: str) -> bool:
@@ -227,13 +340,44 @@ class Fan:
         self._room_name = room_name
         return True
 
-    # pylint: disable=too-many-branches
+    def resolve_target(
+        self,
+        fan_mode: Optional[FanMode] = None,
+        fan_speed_pct: Optional[int] = None,
+    ) -> Optional[tuple[FanMode, int]]:
+        """Return the mode and speed a change would leave the fan at.
+
+        Returns None if the change is invalid. Nothing is modified, so this
+        also tells whether a change would do anything at all.
+        """
+        if fan_mode is None and fan_speed_pct is None:
+            _LOGGER.debug(
+                "async_set_fan_modes must provide a value for fan_mode and/or"
+                " fan_speed"
+            )
+            return None
+
+        if fan_mode is None:
+            fan_mode = derive_mode_from_speed(self.mode_enum, fan_speed_pct)
+
+        resolved_speed = resolve_speed(self.speed_pct, fan_mode, fan_speed_pct)
+        if resolved_speed is None:
+            return None
+        return fan_mode, resolved_speed
+
     async def async_set_fan_modes(
         self,
         fan_mode: Optional[FanMode] = None,
         fan_speed_pct: Optional[int] = None,
+        refresh: bool = True,
     ) -> bool:
-        """Set the fan mode and speed."""
+        """Set the fan mode and speed.
+
+        With refresh=False, an update accepted with a partial response is
+        not followed by a fetch of the fan; awaiting_refresh is set instead,
+        for a caller that refreshes many fans at once. The update is also
+        sent at once, without coalescing.
+        """
 
         _LOGGER.debug(
             (
@@ -245,23 +389,15 @@ class Fan:
             str(fan_speed_pct),
         )
 
-        if fan_mode is None and fan_speed_pct is None:
-            _LOGGER.debug(
-                "async_set_fan_modes must provide a value for fan_mode and/or"
-                " fan_speed"
-            )
+        target = self.resolve_target(fan_mode, fan_speed_pct)
+        if target is None:
             return False
-
-        if fan_mode is None:
-            fan_mode = derive_mode_from_speed(self.mode_enum, fan_speed_pct)
+        fan_mode, fan_speed_pct = target
 
         # Update fan mode if changed
         if self.mode_enum != fan_mode:
             self._mode = fan_mode.value
-
-        fan_speed_pct = resolve_speed(self.speed_pct, fan_mode, fan_speed_pct)
-        if fan_speed_pct is None:
-            return False
+            self._fingerprint = None
 
         # Update power if changed
         if self.speed_pct != fan_speed_pct and not self.set_speed_pct(
@@ -269,13 +405,65 @@ class Fan:
         ):
             return False
 
+        if self._coalesce_delay is not None and refresh:
+            return await self._async_coalesce_set_fan(fan_mode)
+
         # Attempt to update the fan via API
-        success = await self._async_set_fan(fan_mode)
+        success = await self._async_set_fan(fan_mode, refresh)
         return success
 
     # helpers moved to fan_helpers.py
 
-    async def _async_set_fan(self, fan_mode: Optional[FanMode] = None) -> bool:
+    async def _async_coalesce_set_fan(self, fan_mode: FanMode) -> bool:
+        """Join the pending update, starting one if there is none.
+
+        Every caller in the same window gets the result of the one update
+        that is actually sent.
+        """
+        if self._mode is not None:
+            self._pending_target = (fan_mode, self._mode, self.power)
+
+        if self._pending_result is None:
+            self._pending_result = asyncio.get_running_loop().create_future()
+            self._pending_task = asyncio.create_task(
+                self._async_send_pending()
+            )
+        else:
+            _LOGGER.debug(
+                "Fan ID: %s - Coalescing update into pending command",
+                self.fan_id,
+            )
+
+        # Shielded so one caller being cancelled does not cancel the update
+        # the other callers are waiting on.
+        return await asyncio.shield(self._pending_result)
+
+    async def _async_send_pending(self) -> None:
+        """Wait out the coalescing window, then send the latest target."""
+        await asyncio.sleep(self._coalesce_delay or 0)
+
+        result = self._pending_result
+        target = self._pending_target
+        # Cleared before sending, so a change made while this update is in
+        # flight starts a new window instead of being lost.
+        self._pending_result = None
+        self._pending_target = None
+        self._pending_task = None
+        if result is None:
+            return
+
+        fan_mode: Optional[FanMode] = None
+        if target is not None:
+            fan_mode, self._mode, self._power = target
+            self._fingerprint = None
+        try:
+            result.set_result(await self._async_set_fan(fan_mode))
+        except Exception as err:  # pylint: disable=broad-except
+            result.set_exception(err)
+
+    async def _async_set_fan(
+        self, fan_mode: Optional[FanMode] = None, refresh: bool = True
+    ) -> bool:
         """Call the API to update the fan mode and speed."""
 
         # Check if we have the required data to make the API call
@@ -292,6 +480,24 @@ class Fan:
             )
             return False
 
+        # A local transport, when attached, skips the cloud entirely. It
+        # only succeeds once the fan's state messages confirm the change, so
+        # nothing is fetched after.
+        if self._transport is not None and (
+            await self._transport.async_send_command(
+                self, self.mode, self.power
+            )
+        ):
+            _LOGGER.debug(
+                "Fan ID: %s - Fan Mode was set to %s, speed to %s over MQTT",
+                self.fan_id,
+                self.mode,
+                self.speed_pct,
+            )
+            self._update_fan_on(fan_mode)
+            return True
+
+        self._unconfirmed_command = True
         # Make the API call. async_request returns None for a response it
         # could not use, without raising, so the result has to be checked --
         # otherwise a rejected update is reported as a successful one and the
@@ -319,8 +525,22 @@ class Fan:
             self.speed_pct,
         )
 
-        await self._async_update_fan()
+        # The update's response is normally the fan itself. Applying it
+        # directly saves a second round trip; only a response that is not a
+        # complete payload needs the fan fetched again to confirm the change.
+        if not self.missing_api_fields(response):
+            await self.async_update_api_data(response)
+        elif not refresh:
+            self._awaiting_refresh = True
+        elif self._refresh_on_partial_response:
+            await self._async_update_fan()
+
+        self._update_fan_on(fan_mode)
+        return True
 
+    def _update_fan_on(self, fan_mode: Optional[FanMode]) -> None:
+        """Reflect a mode just sent in fan_on before the fan reports it."""
+        self._fingerprint = None
         if fan_mode == FanMode.ON and not self.fan_on:
             _LOGGER.debug(
                 "Fan ID: %s - Changing fan_on to 'True'", self.fan_id
@@ -332,7 +552,86 @@ class Fan:
             )
             self._fan_on = False
 
-        return True
+    @property
+    def awaiting_refresh(self) -> bool:
+        """Return whether an accepted update still awaits a fresh payload.
+
+        Only set by async_set_fan_modes with refresh=False.
+        """
+        return self._awaiting_refresh
+
+    @property
+    def has_unconfirmed_command(self) -> bool:
+        """Return whether a command sent through the API awaits a payload.
+
+        Set whether or not the cloud accepted it, so the next payload is
+        applied even if it is one applied before, undoing a rejected one.
+        Commands the fan confirmed over MQTT do not count.
+        """
+        return self._unconfirmed_command
+
+    def set_transport(self, transport: Optional["MqttFanTransport"]) -> None:
+        """Send commands through transport first, falling back to the API.
+
+        None removes the transport, so every command uses the API again.
+        """
+        self._transport = transport
+
+    #: Fields a pushed state message may carry, with the types each may
+    #: have. Anything else in the message is ignored.
+    PUSH_STATE_FIELDS: dict[str, tuple[type, ...]] = {
+        "mode": (str,),
+        "fan_on": (bool,),
+        "power": (int,),
+        "connected": (bool,),
+        "is_room_estimating": (bool,),
+        "predicted_room_temperature": (int, float, type(None)),
+    }
+
+    def apply_state(
+        self, data: dict[str, Any]
+    ) -> Optional[dict[str, tuple[Any, Any]]]:
+        """Apply a partial state update, returning the changed fields.
+
+        Unlike update_api_data this accepts any subset of
+        PUSH_STATE_FIELDS, since pushed messages only carry what changed.
+        Returns None, changing nothing, if any of them has the wrong type
+        or the mode is not one the fan knows.
+        """
+        fields = {
+            field: data[field]
+            for field in self.PUSH_STATE_FIELDS
+            if field in data
+        }
+        invalid = [
+            field
+            for field, value in fields.items()
+            if not _has_type(value, self.PUSH_STATE_FIELDS[field])
+        ]
+        if (
+            isinstance(fields.get("mode"), str)
+            and fields["mode"] not in _MODES
+        ):
+            invalid.append("mode")
+        if invalid:
+            _LOGGER.warning(
+                "Fan ID: %s - Ignoring pushed state with invalid field(s): %s",
+                self.fan_id,
+                ", ".join(invalid),
+            )
+            return None
+
+        old = self.state
+        self._fingerprint = None
+        for field, value in fields.items():
+            setattr(self, f"_{field}", value)
+
+        # As in update_api_data, mode is more reliable than fan_on.
+        if self._mode == FanMode.ON.value:
+            self._fan_on = True
+        elif self._mode == FanMode.OFF.value:
+            self._fan_on = False
+        return diff_state(old, self.state)
 
     #: Fields the API is expected to send for every fan. Anything absent here
     #: means the payload is not one this can safely apply.
@@ -351,6 +650,64 @@ class Fan:
         "mqtt_password",
     )
 
+    # Reads every required field in one call, raising KeyError if any is
+    # missing; the result, with the optional fields, is the fingerprint.
+    _read_api_fields = itemgetter(*REQUIRED_API_FIELDS)
+
+    def as_api_data(self) -> dict[str, Any]:
+        """Return the fan as an API payload async_update_api_data accepts.
+
+        Used to persist a fan and restore it later without a fetch.
+        """
+        return {
+            "id": self._identifier,
+            "fan_id": self._fan_id,
+            "mode": self._mode,
+            "fan_on": self._fan_on,
+            "firmware_version": self._firmware_version,
+            "is_room_estimating": self._is_room_estimating,
+            "connected": self._connected,
+            "last_connection": (
+                self._last_connection.isoformat()
+                if self._last_connection
+                else None
+            ),
+            "power": self._power,
+            "predicted_room_temperature": self._predicted_room_temperature,
+            "room_id": self._room_id,
+            "thermostat_vendor": self._thermostat_vendor,
+            "mqtt_username": self._mqtt_username,
+            "mqtt_password": self._mqtt_password,
+        }
+
+    @property
+    def state(self) -> dict[str, Any]:
+        """Return the fan's fields, for detecting changes.
+
+        The MQTT credentials are left out: they are not state to render.
+        """
+        return {
+            "identifier": self._identifier,
+            "mode": self._mode,
+            "fan_on": self._fan_on,
+            "firmware_version": self._firmware_version,
+            "is_room_estimating": self._is_room_estimating,
+            "connected": self._connected,
+            "last_connection": self._last_connection,
+            "power": self._power,
+            "predicted_room_temperature": self._predicted_room_temperature,
+            "room_id": self._room_id,
+            "room_name": self._room_name,
+            "thermostat_vendor": self._thermostat_vendor,
+        }
+
+    @classmethod
+    def missing_api_fields(cls, data: dict[str, Any]) -> list[str]:
+        """Return the required fields absent from an API payload."""
+        return [
+            field for field in cls.REQUIRED_API_FIELDS if field not in data
+        ]
+
     async def async_update_api_data(
         self,
         data: dict[str, Any],
@@ -361,114 +718,143 @@ class Fan:
         fields. Applying it field by field would otherwise raise partway
         through and leave the fan holding a mix of old and new values.
         """
+        return self.update_api_data(data)
 
-        missing = [
-            field for field in self.REQUIRED_API_FIELDS if field not in data
-        ]
-        if missing:
+    def update_api_data(self, data: dict[str, Any]) -> bool:
+        """Update the fan attributes with API data, without awaiting.
+
+        The same as async_update_api_data, for applying many fans in one
+        batch.
+        """
+        return self.apply_api_data(data) is not None
+
+    def apply_api_data(
+        self, data: dict[str, Any]
+    ) -> Optional[dict[str, tuple[Any, Any]]]:
+        """Apply API data, returning the changed fields.
+
+        Returns None, changing nothing, if the payload is missing fields. A
+        payload identical to the last one applied is not applied again;
+        only the connection is checked for having gone stale since.
+        """
+        try:
+            fingerprint = (
+                self._read_api_fields(data),
+                data.get("fan_id"),
+                data.get("last_connection"),
+            )
+        except KeyError:
             _LOGGER.error(
                 "Fan ID: %s - Ignoring API payload missing required "
                 "field(s): %s",
                 self.fan_id,
-                ", ".join(missing),
+                ", ".join(self.missing_api_fields(data)),
             )
-            return False
-
+            return None
+
+        self._awaiting_refresh = False
+        self._unconfirmed_command = False
+        if fingerprint == self._fingerprint:
+            if self._check_stale_connection():
+                return {"connected": (True, False)}
+            return {}
+
+        old = self.state
+        self._apply_fingerprint(fingerprint)
+        return diff_state(old, self.state)
+
+    def _apply_fingerprint(self, fingerprint: tuple[Any, ...]) -> None:
+        """Set the fan's attributes from a payload's fields."""
+        (
+            (
+                identifier,
+                mode,
+                fan_on,
+                self._firmware_version,
+                self._is_room_estimating,
+                connected,
+                self._power,
+                self._predicted_room_temperature,
+                self._room_id,
+                self._thermostat_vendor,
+                self._mqtt_username,
+                self._mqtt_password,
+            ),
+            fan_id,
+            last_connection,
+        ) = fingerprint
         _LOGGER.debug(
-            "Fan ID: %s - In async_update_api_data",
-            data.get("fan_id", self._fan_id),
+            "Fan ID: %s - In async_update_api_data", fan_id or self._fan_id
         )
 
-        self._identifier = data["id"]
-        self._fan_id = (
-            data["fan_id"] if data.get("fan_id") is not None else self._fan_id
-        )
-
-        # Fan attributes from SmartCocoon
-        self._mode = data["mode"]
+        self._fingerprint = fingerprint
+        self._identifier = identifier
+        if fan_id is not None:
+            self._fan_id = fan_id
 
         # fan_on does not always reflect the current mode, mode is more
         # accurate if set to always_on or always_off
-
-        if self._mode == FanMode.ON.value:
+        self._mode = mode
+        if mode == FanMode.ON.value:
             self._fan_on = True
-        elif self._mode == FanMode.OFF.value:
+        elif mode == FanMode.OFF.value:
             self._fan_on = False
         else:
-            self._fan_on = data["fan_on"]
+            self._fan_on = fan_on
 
-        self._firmware_version = data["firmware_version"]
-        self._is_room_estimating = data["is_room_estimating"]
-        # Log raw connected value from API for debugging
-        raw_connected = data.get("connected")
-        _LOGGER.debug(
-            "Fan ID: %s - Raw API 'connected' value: %s (type: %s)",
-            self.fan_id,
-            raw_connected,
-            type(raw_connected).__name__,
-        )
-
-        # Parse last_connection to datetime when provided as string. This one
-        # is NotRequired in FanPayload, so it is fetched with a default rather
-        # than being treated as guaranteed.
-        last_conn = data.get("last_connection")
-        if isinstance(last_conn, str):
+        # last_connection is NotRequired in FanPayload, and is normally an
+        # ISO 8601 string.
+        if isinstance(last_connection, str):
             try:
-                iso_str = last_conn.replace("Z", "+00:00")
-                self._last_connection = datetime.fromisoformat(iso_str)
-            except Exception:  # pylint: disable=broad-except
+                self._last_connection = datetime.fromisoformat(
+                    last_connection.replace("Z", "+00:00")
+                )
+            except ValueError:
                 _LOGGER.debug(
                     "Fan ID: %s - Unable to parse last_connection: %s",
                     self.fan_id,
-                    last_conn,
+                    last_connection,
                 )
                 self._last_connection = None
         else:
-            self._last_connection = last_conn
-
-        # Correct stale connection status from API
-        # If API says connected=True but last_connection is > 15 minutes ago,
-        # the fan is actually disconnected (API has stale data)
-        api_connected = data["connected"]
-        if api_connected and self._last_connection:
-            time_since_connection = (
-                datetime.now(self._last_connection.tzinfo)
-                - self._last_connection
+            self._last_connection = last_connection
+
+        # The API keeps saying connected for a while after a fan drops off,
+        # so a fan not seen for too long is taken to be disconnected. The
+        # deadline is kept so an unchanged payload need not be parsed again.
+        self._connected = connected
+        self._stale_at = None
+        if connected and self._last_connection is not None:
+            self._stale_at = (
+                self._last_connection.timestamp() + STALE_CONNECTION_AFTER
             )
-            minutes_since_connection = (
-                time_since_connection.total_seconds() / 60
-            )
-
-            # If fan hasn't been seen in 15+ minutes, it's disconnected
-            if minutes_since_connection > 15:
-                _LOGGER.warning(
-                    "Fan ID: %s - API reports connected=True but "
-                    "last_connection was %.1f minutes ago. "
-                    "Overriding to connected=False",
-                    self.fan_id,
-                    minutes_since_connection,
-                )
-                self._connected = False
-            else:
-                self._connected = api_connected
-        elif api_connected and self._last_connection is None:
-            # API says connected but no last_connection timestamp - trust API
+            self._check_stale_connection()
+        elif connected:
             _LOGGER.debug(
                 "Fan ID: %s - API reports connected=True but no "
                 "last_connection timestamp available",
                 self.fan_id,
             )
-            self._connected = api_connected
-        else:
-            # API says connected=False, trust it
-            self._connected = api_connected
-        self._power = data["power"]
-        self._predicted_room_temperature = data["predicted_room_temperature"]
-        self._room_id = data["room_id"]
-        self._thermostat_vendor = data["thermostat_vendor"]
-        self._mqtt_username = data["mqtt_username"]
-        self._mqtt_password = data["mqtt_password"]
 
+    def _check_stale_connection(self) -> bool:
+        """Mark the fan disconnected if its deadline has passed.
+
+        Returns whether it was marked disconnected.
+        """
+        if self._stale_at is None:
+            return False
+        now = time.time()
+        if now <= self._stale_at:
+            return False
+        _LOGGER.warning(
+            "Fan ID: %s - API reports connected=True but "
+            "last_connection was %.1f minutes ago. "
+            "Overriding to connected=False",
+            self.fan_id,
+            (now - self._stale_at + STALE_CONNECTION_AFTER) / 60,
+        )
+        self._connected = False
+        self._stale_at = None
         return True
 
     async def _async_update_fan(self) -> bool:
@@ -0,0 +1,252 @@
+"""Define a fleet that runs many SmartCocoon accounts over one session.
+
+Each SmartCocoonManager normally ends up with its own aiohttp session, and so
+its own connection pool. With hundreds of accounts in one process that means
+hundreds of pools, each paying for its own sockets and TLS handshakes against
+the same host. The fleet creates one session with a bounded connector and
+hands it to every account's SmartCocoonAPI instead.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+from typing import Optional
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import (
+    DEFAULT_FLEET_CONCURRENCY,
+    DEFAULT_FLEET_CONNECTION_LIMIT,
+    DEFAULT_FLEET_CONNECTIONS_PER_HOST,
+    DEFAULT_TIMEOUT,
+)
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.metrics import RequestObserver
+from pysmartcocoon.ratelimit import TokenBucket
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FleetRefreshStats:
+    """Latency of one refresh across every account in the fleet."""
+
+    #: Wall-clock time for the whole refresh, in seconds.
+    wall_time: float = 0.0
+    #: Time each account's refresh took, in seconds, keyed by account id.
+    latencies: dict[str, float] = field(default_factory=dict)
+    #: Accounts whose refresh raised rather than completed.
+    failures: tuple[str, ...] = ()
+
+    @property
+    def mean_latency(self) -> float:
+        """Return the mean per-account latency in seconds."""
+        if not self.latencies:
+            return 0.0
+        return sum(self.latencies.values()) / len(self.latencies)
+
+    @property
+    def max_latency(self) -> float:
+        """Return the slowest per-account latency in seconds."""
+        return max(self.latencies.values(), default=0.0)
+
+
+# pylint: disable=too-many-instance-attributes
+class SmartCocoonFleet:
+    """Run many SmartCocoon accounts from one process.
+
+    Accounts share a single aiohttp session whose connector caps the number
+    of open connections, and refreshes run concurrently up to
+    ``max_concurrency`` accounts at a time.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        session: Optional[ClientSession] = None,
+        request_timeout: int = DEFAULT_TIMEOUT,
+        max_concurrency: int = DEFAULT_FLEET_CONCURRENCY,
+        connection_limit: int = DEFAULT_FLEET_CONNECTION_LIMIT,
+        connection_limit_per_host: int = DEFAULT_FLEET_CONNECTIONS_PER_HOST,
+        rate_limiter: Optional[TokenBucket] = None,
+        account_rate_limit: Optional[float] = None,
+        observers: Sequence[RequestObserver] = (),
+    ) -> None:
+        """Initialize.
+
+        rate_limiter, if given, is shared by every account and so caps the
+        fleet's total request rate. account_rate_limit, in requests per
+        second, additionally gives each account a bucket of its own.
+        observers are given to every account, so one RequestMetrics can
+        count the requests of the whole fleet.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        # Same ownership rule as SmartCocoonAPI: a session passed in belongs
+        # to the caller and is never closed here.
+        self._session = session
+        self._owns_session = False
+        self._request_timeout = request_timeout
+        self._max_concurrency = max_concurrency
+        self._connection_limit = connection_limit
+        self._connection_limit_per_host = connection_limit_per_host
+        self._rate_limiter = rate_limiter
+        self._account_rate_limit = account_rate_limit
+        self._observers = tuple(observers)
+
+        self._managers: dict[str, SmartCocoonManager] = {}
+        self._credentials: dict[str, tuple[str, str]] = {}
+        self._last_refresh = FleetRefreshStats()
+
+    async def __aenter__(self) -> "SmartCocoonFleet":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.close()
+
+    @property
+    def managers(self) -> dict[str, SmartCocoonManager]:
+        """Return the managers in the fleet, keyed by account id."""
+        return self._managers
+
+    @property
+    def last_refresh(self) -> FleetRefreshStats:
+        """Return latency statistics for the most recent refresh."""
+        return self._last_refresh
+
+    def _ensure_session(self) -> ClientSession:
+        """Return the shared session, creating it on first use.
+
+        Created lazily for the same reason as in SmartCocoonAPI: aiohttp
+        needs a running event loop to build a session.
+        """
+        if self._session is None or (
+            self._owns_session and self._session.closed
+        ):
+            self._session = ClientSession(
+                connector=TCPConnector(
+                    limit=self._connection_limit,
+                    limit_per_host=self._connection_limit_per_host,
+                ),
+                timeout=ClientTimeout(total=self._request_timeout),
+            )
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """Close every account, then the shared session.
+
+        The session is only closed if the fleet created it.
+        """
+        managers = list(self._managers.values())
+        self._managers.clear()
+        self._credentials.clear()
+        await asyncio.gather(*(manager.async_close() for manager in managers))
+        if self._owns_session and self._session is not None:
+            if not self._session.closed:
+                await self._session.close()
+            self._session = None
+            self._owns_session = False
+
+    async def async_add_account(
+        self, account_id: str, username: str, password: str
+    ) -> SmartCocoonManager:
+        """Add an account to the fleet and return its manager.
+
+        The account is not authenticated until async_start_services runs.
+        Adding an account id that is already present replaces it, closing
+        the manager it had.
+        """
+        await self.async_remove_account(account_id)
+        limiters: list[TokenBucket] = []
+        if self._account_rate_limit is not None:
+            limiters.append(TokenBucket(self._account_rate_limit))
+        if self._rate_limiter is not None:
+            limiters.append(self._rate_limiter)
+
+        api = SmartCocoonAPI(
+            self._ensure_session(),
+            self._request_timeout,
+            rate_limiters=limiters,
+            observers=self._observers,
+        )
+        manager = SmartCocoonManager(api=api)
+        self._managers[account_id] = manager
+        self._credentials[account_id] = (username, password)
+        return manager
+
+    async def async_remove_account(self, account_id: str) -> None:
+        """Remove an account from the fleet and close its manager.
+
+        Closing it stops its polling and its token refresh, which would
+        otherwise carry on signing in for an account no longer used.
+        """
+        manager = self._managers.pop(account_id, None)
+        self._credentials.pop(account_id, None)
+        if manager is not None:
+            await manager.async_close()
+
+    async def async_start_services(self) -> dict[str, bool]:
+        """Authenticate every account and load its initial data.
+
+        Returns whether each account connected. One account failing does not
+        stop the others from starting.
+        """
+
+        async def _start(account_id: str) -> bool:
+            username, password = self._credentials[account_id]
+            return await self._managers[account_id].async_start_services(
+                username, password
+            )
+
+        results, _ = await self._async_run_all(_start)
+        return results
+
+    async def async_update_data(self) -> FleetRefreshStats:
+        """Refresh every account and return the refresh's latency stats."""
+
+        async def _update(account_id: str) -> bool:
+            await self._managers[account_id].async_update_data()
+            return True
+
+        _, self._last_refresh = await self._async_run_all(_update)
+        return self._last_refresh
+
+    async def _async_run_all(
+        self, func: Callable[[str], Awaitable[bool]]
+    ) -> tuple[dict[str, bool], FleetRefreshStats]:
+        """Run func for every account, at most max_concurrency at a time.
+
+        An account whose func raises is logged and reported as False.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        results: dict[str, bool] = {}
+        latencies: dict[str, float] = {}
+        failures: list[str] = []
+
+        async def _run(account_id: str) -> None:
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    results[account_id] = await func(account_id)
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception(
+                        "Fleet account %s failed to refresh", account_id
+                    )
+                    results[account_id] = False
+                    failures.append(account_id)
+                latencies[account_id] = time.monotonic() - started
+
+        started = time.monotonic()
+        await asyncio.gather(
+            *(_run(account) for account in list(self._managers))
+        )
+        return results, FleetRefreshStats(
+            wall_time=time.monotonic() - started,
+            latencies=latencies,
+            failures=tuple(failures),
+        )
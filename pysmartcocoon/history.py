@@ -0,0 +1,227 @@
+"""Define a bounded, in-memory history of each fan's state.
+
+A Fan only holds its latest state, so every "speed over the last day" went
+to an external database. FanHistory records each fan's mode, power,
+connection and predicted room temperature whenever they change, in fixed
+size records packed into one buffer per tier:
+
+* the most recent changes are kept as they happened, and
+* older changes are folded into buckets of a fixed duration, each holding
+  the averages over the changes in it and the last mode seen.
+
+When either tier is full its oldest record is dropped, so memory per fan
+never exceeds max_bytes_per_fan however often the fan changes.
+"""
+
+import math
+import struct
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from pysmartcocoon.const import (
+    DEFAULT_HISTORY_BUCKET_SECONDS,
+    DEFAULT_HISTORY_BUCKETS,
+    DEFAULT_HISTORY_POINTS,
+    FanMode,
+)
+
+if TYPE_CHECKING:
+    from pysmartcocoon.fan import Fan
+
+# timestamp, mode, power, connected, predicted room temperature, samples.
+# Values are kept as 32-bit floats, which is plenty for what they measure.
+_RECORD = struct.Struct("<dBfffI")
+_Record = tuple[float, int, float, float, float, int]
+
+# Modes are stored by their index here; anything else as _NO_MODE.
+_MODES = tuple(mode.value for mode in FanMode)
+_NO_MODE = 255
+
+
+@dataclass(frozen=True)
+class HistoryPoint:
+    """A fan's state at one change, or averaged over one bucket."""
+
+    #: When the change happened, or when the bucket starts.
+    timestamp: float
+    #: The mode, or the last mode seen in the bucket.
+    mode: Optional[str]
+    power: float
+    #: 1.0 or 0.0 for a change; the fraction connected for a bucket.
+    connected: float
+    predicted_room_temperature: Optional[float]
+    #: How many changes the point stands for.
+    samples: int = 1
+
+
+class _Ring:
+    """Fixed size records in one buffer, overwriting the oldest when full.
+
+    The buffer grows as records arrive, up to capacity, so a fan that
+    rarely changes costs little.
+    """
+
+    __slots__ = ("_buffer", "_capacity", "_start", "_count")
+
+    def __init__(self, capacity: int) -> None:
+        self._buffer = bytearray()
+        self._capacity = capacity
+        self._start = 0
+        self._count = 0
+
+    def append(self, record: _Record) -> Optional[_Record]:
+        """Add a record, returning the one it displaced, if any."""
+        if self._count < self._capacity:
+            self._buffer += _RECORD.pack(*record)
+            self._count += 1
+            return None
+        offset = self._start * _RECORD.size
+        evicted = _RECORD.unpack_from(self._buffer, offset)
+        _RECORD.pack_into(self._buffer, offset, *record)
+        self._start = (self._start + 1) % self._capacity
+        return evicted
+
+    def __iter__(self) -> Iterator[_Record]:
+        for index in range(self._count):
+            offset = (self._start + index) % self._capacity * _RECORD.size
+            yield _RECORD.unpack_from(self._buffer, offset)
+
+
+class _FanSeries:
+    """One fan's recent changes and older buckets."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = ("recent", "buckets", "open_bucket")
+
+    def __init__(self, points: int, buckets: int) -> None:
+        self.recent = _Ring(points)
+        self.buckets = _Ring(buckets)
+        # The bucket changes are still being folded into, as [start, mode,
+        # power sum, connected sum, temperature sum, temperatures, samples].
+        self.open_bucket: Optional[list[float]] = None
+
+
+class FanHistory:
+    """A bounded history of every fan's state changes.
+
+    points changes are kept per fan as they happened. Older ones are
+    averaged into buckets of bucket_seconds, of which buckets are kept.
+    """
+
+    def __init__(
+        self,
+        points: int = DEFAULT_HISTORY_POINTS,
+        buckets: int = DEFAULT_HISTORY_BUCKETS,
+        bucket_seconds: float = DEFAULT_HISTORY_BUCKET_SECONDS,
+    ) -> None:
+        if points < 1 or buckets < 1:
+            raise ValueError("points and buckets must be at least 1")
+        if bucket_seconds <= 0:
+            raise ValueError("bucket_seconds must be positive")
+
+        self._points = points
+        self._buckets = buckets
+        self._bucket_seconds = bucket_seconds
+        self._series: dict[str, _FanSeries] = {}
+
+    @property
+    def max_bytes_per_fan(self) -> int:
+        """Return the most record storage one fan can use, in bytes."""
+        return (self._points + self._buckets) * _RECORD.size
+
+    def __contains__(self, fan_id: object) -> bool:
+        return fan_id in self._series
+
+    def record(self, fan: "Fan", timestamp: Optional[float] = None) -> None:
+        """Record a fan's current state, at timestamp or now."""
+        series = self._series.get(fan.fan_id)
+        if series is None:
+            series = self._series[fan.fan_id] = _FanSeries(
+                self._points, self._buckets
+            )
+
+        temperature = fan.predicted_room_temperature
+        evicted = series.recent.append(
+            (
+                time.time() if timestamp is None else timestamp,
+                _MODES.index(fan.mode) if fan.mode in _MODES else _NO_MODE,
+                fan.power,
+                1.0 if fan.connected else 0.0,
+                math.nan if temperature is None else temperature,
+                1,
+            )
+        )
+        if evicted is not None:
+            self._fold(series, evicted)
+
+    def _fold(self, series: _FanSeries, record: _Record) -> None:
+        """Fold a change that has aged out into its bucket."""
+        timestamp, mode, power, connected, temperature, _ = record
+        start = timestamp - timestamp % self._bucket_seconds
+        bucket = series.open_bucket
+        if bucket is None or bucket[0] != start:
+            if bucket is not None:
+                series.buckets.append(_close(bucket))
+            bucket = series.open_bucket = [start, 0, 0.0, 0.0, 0.0, 0, 0]
+        bucket[1] = mode
+        bucket[2] += power
+        bucket[3] += connected
+        if not math.isnan(temperature):
+            bucket[4] += temperature
+            bucket[5] += 1
+        bucket[6] += 1
+
+    def points(
+        self, fan_id: str, since: Optional[float] = None
+    ) -> list[HistoryPoint]:
+        """Return a fan's history, oldest first.
+
+        Buckets come first, then the changes kept as they happened. With
+        since, a timestamp, only points at or after it are returned; a
+        bucket counts as at its start.
+        """
+        series = self._series.get(fan_id)
+        if series is None:
+            return []
+        records = list(series.buckets)
+        if series.open_bucket is not None:
+            records.append(_close(series.open_bucket))
+        records += series.recent
+        return [
+            _point(record)
+            for record in records
+            if since is None or record[0] >= since
+        ]
+
+    def forget(self, fan_id: str) -> None:
+        """Drop a fan's history."""
+        self._series.pop(fan_id, None)
+
+
+def _close(bucket: list[float]) -> _Record:
+    start, mode, power, connected, temperature, known, samples = bucket
+    return (
+        start,
+        int(mode),
+        power / samples,
+        connected / samples,
+        temperature / known if known else math.nan,
+        int(samples),
+    )
+
+
+def _point(record: _Record) -> HistoryPoint:
+    timestamp, mode, power, connected, temperature, samples = record
+    return HistoryPoint(
+        timestamp=timestamp,
+        mode=None if mode == _NO_MODE else _MODES[mode],
+        power=power,
+        connected=connected,
+        predicted_room_temperature=(
+            None if math.isnan(temperature) else temperature
+        ),
+        samples=samples,
+    )
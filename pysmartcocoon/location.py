@@ -4,14 +4,37 @@
 
 from typing import Any
 
+from pysmartcocoon.entity import RecordEntity
 
-class Location:  # pylint: disable=too-many-instance-attributes
+
+class Location(RecordEntity):  # pylint: disable=too-many-instance-attributes
     """Define the location."""
 
-    def __init__(self, data: dict[str, Any]) -> None:
-        """Initialize."""
-        self._identifier: int = data["id"]
-        self._postal_code: str = data["location"]["postal_code"]
+    __slots__ = ("_identifier", "_postal_code")
+
+    @staticmethod
+    def _read(data: dict[str, Any], /) -> tuple[Any, ...]:
+        # Both values are read before either is assigned, so a payload
+        # missing one raises without leaving the location half-updated.
+        return data["id"], data["location"]["postal_code"]
+
+    _identifier: int
+    _postal_code: str
+
+    def _apply(self, values: tuple[Any, ...]) -> None:
+        self._identifier, self._postal_code = values
+
+    @property
+    def state(self) -> dict[str, Any]:
+        """Return the location's fields, for detecting changes."""
+        return {"postal_code": self._postal_code}
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the location as the API payload __init__ accepts."""
+        return {
+            "id": self._identifier,
+            "location": {"postal_code": self._postal_code},
+        }
 
     @property
     def identifier(self) -> int:
@@ -1,33 +1,80 @@
 """Define a manager to interact with SmartCocoon"""
 
 import asyncio
+import contextlib
 import logging
+from collections.abc import Callable, Collection, Iterable
 from typing import Any, Optional
 
 from aiohttp import ClientSession
 
 from pysmartcocoon.api import SmartCocoonAPI
-from pysmartcocoon.const import API_URL, DEFAULT_TIMEOUT, EntityType, FanMode
+from pysmartcocoon.changes import (
+    ChangeKind,
+    ChangeSet,
+    EntityChange,
+    Subscription,
+    diff_state,
+)
+from pysmartcocoon.const import (
+    API_URL,
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_TIMEOUT,
+    DEFAULT_UPDATE_INTERVAL,
+    EntityType,
+    FanMode,
+)
 from pysmartcocoon.errors import RequestError, UnauthorizedError
 from pysmartcocoon.fan import Fan
+from pysmartcocoon.history import FanHistory, HistoryPoint
 from pysmartcocoon.location import Location
+from pysmartcocoon.mqtt import MqttFanTransport
 from pysmartcocoon.room import Room
+from pysmartcocoon.scheduler import PollScheduler
+from pysmartcocoon.snapshot import SnapshotPath, read_snapshot, write_snapshot
 from pysmartcocoon.thermostat import Thermostat
 
 _LOGGER: logging.Logger = logging.getLogger(__name__)
 
+# A change to any of these fan fields is recorded in the fan's history.
+_HISTORY_FIELDS = frozenset(
+    ("mode", "power", "connected", "predicted_room_temperature")
+)
 
+
+# pylint: disable=too-many-instance-attributes,too-many-public-methods
 class SmartCocoonManager:
     """Define the main controller class to communicate with the
     SmartCocoon cloud API
     """
 
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
     def __init__(
         self,
         session: Optional[ClientSession] = None,
         request_timeout: int = DEFAULT_TIMEOUT,
+        api: Optional[SmartCocoonAPI] = None,
+        command_coalesce_delay: Optional[float] = None,
+        refresh_on_partial_response: bool = True,
+        stream_fans: bool = False,
+        fan_history: Optional[FanHistory] = None,
     ) -> None:
-        self._api = SmartCocoonAPI(session, request_timeout)
+        # A pre-built API lets a caller configure it (or share its session
+        # with other accounts, as SmartCocoonFleet does) before the manager
+        # starts using it. session and request_timeout are ignored then.
+        self._api = (
+            api
+            if api is not None
+            else SmartCocoonAPI(session, request_timeout)
+        )
+        # Passed to each Fan; see Fan for what these do.
+        self._command_coalesce_delay = command_coalesce_delay
+        self._refresh_on_partial_response = refresh_on_partial_response
+        # Parse the fans response as it arrives instead of decoding it
+        # whole, for accounts whose fan list is too large to hold at once.
+        self._stream_fans = stream_fans
+        # Off unless supplied: records each fan's state as it changes.
+        self._fan_history = fan_history
 
         self._api_connected: bool = False
 
@@ -37,6 +84,24 @@ class SmartCocoonManager:
         self._rooms: dict[int, Room] = {}
         self._fans: dict[str, Fan] = {}
 
+        self._revalidation: Optional[asyncio.Task[bool]] = None
+        # The last response applied for each type. The API hands back the
+        # same object when the server answers 304, or the cache answers.
+        # Fans are applied again if a command sent through the API changed
+        # one since, as only the payload undoes a command the cloud
+        # rejected. State a fan pushed over MQTT is newer than any payload
+        # served again, so it is left alone.
+        self._applied: dict[EntityType, dict[str, Any]] = {}
+        # The collections whose last fetch failed and kept their entities.
+        self._failed_fetches: set[EntityType] = set()
+        self._listeners: list[Subscription] = []
+        self._update_task: Optional[asyncio.Task[None]] = None
+        self._update_wakeup = asyncio.Event()
+        self._scheduler: Optional[PollScheduler] = None
+        self._remove_rate_limit_listener: Optional[Callable[[], None]] = None
+        self._mqtt: Optional[MqttFanTransport] = None
+        self._mqtt_unsubscribe: Optional[Callable[[], None]] = None
+
     @property
     def locations(self) -> dict[int, Any]:
         """Return list of Locations."""
@@ -73,110 +138,677 @@ class SmartCocoonManager:
 
         return self._api_connected
 
-    async def async_update_data(self) -> None:
-        """Update data from SmartCocoon API"""
-        tasks: list[Any] = []
-        tasks.append(self.async_update_locations())
-        tasks.append(self.async_update_thermostats())
-        tasks.append(self.async_update_rooms())
-        await asyncio.gather(*tasks)
-        await self.async_update_fans()
+    @property
+    def revalidation(self) -> Optional[asyncio.Task[bool]]:
+        """Return the background refresh started from a snapshot, if any.
+
+        It resolves to whether the manager signed in and fetched every
+        collection; False leaves the snapshot's entities in place.
+        """
+        return self._revalidation
+
+    def build_snapshot(self, include_auth: bool = False) -> dict[str, Any]:
+        """Return the manager's entities in a form that can be persisted.
+
+        The auth triple is only included when include_auth is set, since it
+        is enough to act on the account without its password.
+        """
+        snapshot: dict[str, Any] = {
+            EntityType.LOCATIONS.value: [
+                location.as_dict() for location in self._locations.values()
+            ],
+            EntityType.THERMOSTATS.value: [
+                thermostat.as_dict()
+                for thermostat in self._thermostats.values()
+            ],
+            EntityType.ROOMS.value: [
+                room.as_dict() for room in self._rooms.values()
+            ],
+            EntityType.FANS.value: [
+                fan.as_api_data() for fan in self._fans.values()
+            ],
+        }
+        if include_auth and (auth := self._api.auth_state) is not None:
+            snapshot["auth"] = auth
+        return snapshot
+
+    async def async_save_snapshot(
+        self, path: SnapshotPath, include_auth: bool = False
+    ) -> None:
+        """Persist the manager's entities for a later warm start."""
+        await asyncio.to_thread(
+            write_snapshot,
+            path,
+            self.build_snapshot(include_auth),
+            self._api.codec,
+        )
 
-    async def async_update_locations(self) -> dict[int, Location]:
-        """Update location data"""
-        entity = EntityType.LOCATIONS.value
+    async def async_restore_snapshot(self, snapshot: dict[str, Any]) -> bool:
+        """Replace the manager's entities with those from a snapshot.
+
+        Returns False, leaving the current entities alone, if the snapshot
+        cannot be applied.
+        """
         try:
-            response = await self._api.async_request(
-                "GET", f"{API_URL}{entity}"
+            locations = {
+                item["id"]: Location(data=item)
+                for item in snapshot[EntityType.LOCATIONS.value]
+            }
+            thermostats = {
+                item["id"]: Thermostat(data=item)
+                for item in snapshot[EntityType.THERMOSTATS.value]
+            }
+            rooms = {
+                item["id"]: Room(data=item)
+                for item in snapshot[EntityType.ROOMS.value]
+            }
+            fan_payloads = list(snapshot[EntityType.FANS.value])
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Ignoring unusable snapshot: %r", err)
+            return False
+
+        self._locations = locations
+        self._thermostats = thermostats
+        self._rooms = rooms
+        self._fans = {}
+        self._apply_fans(fan_payloads)
+        return True
+
+    async def async_start_from_snapshot(
+        self, path: SnapshotPath, username: str, password: str
+    ) -> bool:
+        """Start services from a snapshot and revalidate in the background.
+
+        When the snapshot is usable its entities are available as soon as
+        this returns, and a background refresh (see revalidation) signs in
+        -- unless the snapshot carried a still-valid token -- and brings them
+        up to date. Without a usable snapshot this falls back to
+        async_start_services, and so waits on the cloud as before.
+        """
+        snapshot = await asyncio.to_thread(
+            read_snapshot, path, self._api.codec
+        )
+        if snapshot is None or not await self.async_restore_snapshot(snapshot):
+            return await self.async_start_services(username, password)
+
+        auth = snapshot.get("auth")
+        restored = isinstance(auth, dict) and self._api.restore_auth(
+            auth, username, password
+        )
+        self._api_connected = restored
+        self._revalidation = asyncio.create_task(
+            self._async_revalidate(username, password, restored)
+        )
+        return True
+
+    async def _async_revalidate(
+        self, username: str, password: str, restored: bool
+    ) -> bool:
+        """Sign in if needed, then refresh everything from the cloud.
+
+        Returns whether every collection was fetched.
+        """
+        if not restored:
+            self._api_connected = await self._api.async_authenticate(
+                username, password
             )
-        except (UnauthorizedError, RequestError) as err:
-            _LOGGER.debug("Failed to update locations: %s", err)
-            return self._locations
+            if not self._api_connected:
+                _LOGGER.warning(
+                    "Unable to sign in while revalidating the snapshot"
+                )
+                return False
+
+        await self.async_update_data()
+        if self._failed_fetches:
+            _LOGGER.warning(
+                "Unable to refresh %s while revalidating the snapshot",
+                ", ".join(sorted(t.value for t in self._failed_fetches)),
+            )
+            return False
+        return True
 
-        if response and entity in response:
-            for item in response[entity]:
-                location = Location(data=item)
-                self._locations[location.identifier] = location
+    def subscribe(
+        self,
+        callback: Callable[[ChangeSet], None],
+        entity_type: Optional[EntityType] = None,
+        identifier: Any = None,
+    ) -> Callable[[], None]:
+        """Call callback with the changes it is interested in.
+
+        With no entity type, callback receives every non-empty change set.
+        Given an entity type, it only hears about that type, and given an
+        identifier as well (a fan_id for fans, the id for the rest), only
+        about that one entity. Change sets with nothing for it are not
+        delivered.
+
+        Returns a function that unsubscribes it again.
+        """
+        if identifier is not None and entity_type is None:
+            raise ValueError("identifier needs an entity_type")
+        subscription = Subscription(callback, entity_type, identifier)
+        self._listeners.append(subscription)
+
+        def _unsubscribe() -> None:
+            if subscription in self._listeners:
+                self._listeners.remove(subscription)
+
+        return _unsubscribe
+
+    def subscribe_fan(
+        self, fan_id: str, callback: Callable[[ChangeSet], None]
+    ) -> Callable[[], None]:
+        """Call callback with the changes to one fan."""
+        return self.subscribe(callback, EntityType.FANS, fan_id)
+
+    def _dispatch(self, changes: list[EntityChange]) -> ChangeSet:
+        """Hand a refresh's changes to every subscriber that wants them."""
+        change_set = ChangeSet(tuple(changes))
+        if not change_set:
+            return change_set
+        if self._fan_history is not None:
+            self._record_history(self._fan_history, change_set)
+        for subscription in list(self._listeners):
+            selected = subscription.select(change_set)
+            if not selected:
+                continue
+            try:
+                subscription.callback(selected)
+            except Exception:  # pylint: disable=broad-except
+                # One broken subscriber must not keep the rest from hearing
+                # about the change, or abort the refresh that produced it.
+                _LOGGER.exception("Change subscriber failed")
+        return change_set
+
+    def _record_history(
+        self, history: FanHistory, change_set: ChangeSet
+    ) -> None:
+        """Record the fans whose history fields changed."""
+        for change in change_set.of_type(EntityType.FANS):
+            if change.kind is ChangeKind.REMOVED:
+                history.forget(change.identifier)
+            elif not _HISTORY_FIELDS.isdisjoint(change.fields):
+                fan = self._fans.get(change.identifier)
+                if fan is not None:
+                    history.record(fan)
+
+    def fan_history(
+        self, fan_id: str, since: Optional[float] = None
+    ) -> list[HistoryPoint]:
+        """Return a fan's recorded history, oldest first.
+
+        Empty unless the manager was given a FanHistory. With since, a
+        timestamp, only points at or after it. See FanHistory.points.
+        """
+        if self._fan_history is None:
+            return []
+        return self._fan_history.points(fan_id, since)
+
+    def start_updates(
+        self,
+        interval: float = DEFAULT_UPDATE_INTERVAL,
+        scheduler: Optional[PollScheduler] = None,
+    ) -> None:
+        """Poll for subscribers in the background until stopped.
+
+        Each poll fetches only the entity types somebody has subscribed to,
+        once however many subscribers share them, and nothing at all while
+        there are none. Polls follow a PollScheduler: every interval
+        seconds, faster for a short while after a command sent through the
+        manager, and backing off while nothing changes or the cloud answers
+        429. Pass a scheduler to tune it. With MQTT enabled, fan state also
+        arrives between polls.
+
+        Calling this again replaces the schedule from the next poll on.
+        """
+        self._scheduler = (
+            scheduler if scheduler is not None else PollScheduler(interval)
+        )
+        self._update_wakeup.set()
+        if self._update_task is None or self._update_task.done():
+            self._remove_rate_limit_listener = (
+                self._api.add_rate_limit_listener(self._on_rate_limited)
+            )
+            self._update_task = asyncio.get_running_loop().create_task(
+                self._async_update_loop()
+            )
 
-        return self._locations
+    async def async_stop_updates(self) -> None:
+        """Stop the polling started by start_updates."""
+        if self._remove_rate_limit_listener is not None:
+            self._remove_rate_limit_listener()
+            self._remove_rate_limit_listener = None
+        task, self._update_task = self._update_task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def async_close(self) -> None:
+        """Stop everything the manager runs in the background.
+
+        Polling, MQTT and a snapshot's revalidation are stopped, and the API
+        is closed, which ends its token refresh. The entities are kept.
+        """
+        await self.async_stop_updates()
+        await self.async_disable_mqtt()
+        revalidation = self._revalidation
+        if revalidation is not None and not revalidation.done():
+            revalidation.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await revalidation
+        await self._api.close()
 
-    async def async_update_thermostats(self) -> dict[int, Thermostat]:
-        """Update thermostate data"""
-        entity = EntityType.THERMOSTATS.value
+    @property
+    def scheduler(self) -> Optional[PollScheduler]:
+        """Return the schedule background polls follow, once started."""
+        return self._scheduler
+
+    @property
+    def poll_interval(self) -> Optional[float]:
+        """Return the current seconds between background polls."""
+        return self._scheduler.interval if self._scheduler else None
+
+    def _on_rate_limited(self, retry_after: Optional[float]) -> None:
+        if self._scheduler is not None:
+            self._scheduler.on_rate_limited(retry_after)
+
+    async def _async_update_loop(self) -> None:
+        while self._scheduler is not None:
+            # Woken early when a command or a new schedule may have brought
+            # the next poll forward, to work out the delay again.
+            self._update_wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._update_wakeup.wait(), self._scheduler.next_delay()
+                )
+                continue
+            except asyncio.TimeoutError:
+                pass
+            change_set = await self._async_poll_subscribed()
+            self._scheduler.on_poll(bool(change_set))
+
+    async def _async_poll_subscribed(self) -> ChangeSet:
+        """Fetch what the current subscribers want, once."""
+        wanted = {subscription.entity_type for subscription in self._listeners}
+        if not wanted:
+            return ChangeSet()
         try:
-            response = await self._api.async_request(
-                "GET", f"{API_URL}{entity}"
+            return await self._async_update(
+                list(EntityType)
+                if None in wanted
+                else [t for t in wanted if t is not None]
+            )
+        except Exception:  # pylint: disable=broad-except
+            # The next poll may well succeed; a failure must not end them.
+            _LOGGER.exception("Polling for subscribers failed")
+            return ChangeSet()
+
+    async def async_enable_mqtt(self, transport: MqttFanTransport) -> None:
+        """Control fans over MQTT where they allow it.
+
+        Every fan with MQTT credentials is connected, now and as refreshes
+        discover them, and falls back to the REST API on its own whenever
+        MQTT fails. State pushed over MQTT reaches subscribers as a change
+        set, just like a refresh.
+        """
+        await self.async_disable_mqtt()
+        self._mqtt = transport
+        self._mqtt_unsubscribe = transport.add_state_listener(
+            self._on_mqtt_state
+        )
+        await self._async_sync_mqtt()
+
+    async def async_disable_mqtt(self) -> None:
+        """Disconnect every fan from MQTT and go back to the REST API."""
+        if self._mqtt_unsubscribe is not None:
+            self._mqtt_unsubscribe()
+            self._mqtt_unsubscribe = None
+        if self._mqtt is not None:
+            for fan in self._fans.values():
+                fan.set_transport(None)
+            await self._mqtt.async_close()
+            self._mqtt = None
+
+    async def _async_sync_mqtt(self) -> None:
+        """Connect fans that are new and disconnect those that are gone."""
+        if self._mqtt is None:
+            return
+        for fan_id in self._mqtt.fan_ids - set(self._fans):
+            await self._mqtt.async_detach(fan_id)
+        for fan in self._fans.values():
+            if not self._mqtt.is_attached(fan):
+                await self._mqtt.async_attach(fan)
+
+    def _on_mqtt_state(
+        self, fan: Fan, fields: dict[str, tuple[Any, Any]]
+    ) -> None:
+        """Report state pushed over MQTT as a change to that fan."""
+        if self._fans.get(fan.fan_id) is fan:
+            self._dispatch(
+                [
+                    EntityChange(
+                        EntityType.FANS, fan.fan_id, ChangeKind.CHANGED, fields
+                    )
+                ]
             )
-        except (UnauthorizedError, RequestError) as err:
-            _LOGGER.debug("Failed to update thermostats: %s", err)
-            return self._thermostats
 
-        if response and entity in response:
-            for item in response[entity]:
-                thermostat = Thermostat(data=item)
-                self._thermostats[thermostat.identifier] = thermostat
+    async def async_update_data(self) -> ChangeSet:
+        """Update data from SmartCocoon API
+
+        All four collections are fetched at once. Fans used to wait for the
+        other three to finish first; their room names only need the rooms
+        response, which is applied before them.
+
+        Returns what the refresh changed, as also sent to subscribers.
+        """
+        return await self._async_update(list(EntityType))
+
+    async def _async_update(
+        self, entity_types: Collection[EntityType]
+    ) -> ChangeSet:
+        """Fetch some collections at once, then apply them in order."""
+        ordered = [t for t in EntityType if t in entity_types]
+        streamed: Optional[asyncio.Future[list[EntityChange]]] = None
+        rooms_applied = asyncio.Event()
+        if self._stream_fans and EntityType.FANS in ordered:
+            ordered.remove(EntityType.FANS)
+            # Started with the others, but applied only after the rooms.
+            streamed = asyncio.ensure_future(
+                self._async_stream_fans(rooms_applied)
+            )
+
+        changes: list[EntityChange] = []
+        try:
+            results = await asyncio.gather(*map(self._async_fetch, ordered))
+            for entity_type, items in zip(ordered, results):
+                changes += self._apply(entity_type, items)
+        except BaseException:
+            if streamed is not None:
+                streamed.cancel()
+            raise
+        rooms_applied.set()
+        if streamed is not None:
+            changes += await streamed
+
+        change_set = self._dispatch(changes)
+        if EntityType.FANS in entity_types:
+            await self._async_sync_mqtt()
+        return change_set
+
+    def _apply(
+        self,
+        entity_type: EntityType,
+        items: Optional[list[dict[str, Any]]],
+    ) -> list[EntityChange]:
+        """Apply one fetched collection to the entities of its type."""
+        if entity_type is EntityType.FANS:
+            return self._apply_fans(items)
+        if entity_type is EntityType.LOCATIONS:
+            return self._apply_entities(
+                entity_type, items, self._locations, Location
+            )
+        if entity_type is EntityType.THERMOSTATS:
+            return self._apply_entities(
+                entity_type, items, self._thermostats, Thermostat
+            )
+        return self._apply_entities(entity_type, items, self._rooms, Room)
+
+    async def async_update_locations(self) -> dict[int, Location]:
+        """Update location data"""
+        self._dispatch(
+            self._apply_entities(
+                EntityType.LOCATIONS,
+                await self._async_fetch(EntityType.LOCATIONS),
+                self._locations,
+                Location,
+            )
+        )
+        return self._locations
 
+    async def async_update_thermostats(self) -> dict[int, Thermostat]:
+        """Update thermostate data"""
+        self._dispatch(
+            self._apply_entities(
+                EntityType.THERMOSTATS,
+                await self._async_fetch(EntityType.THERMOSTATS),
+                self._thermostats,
+                Thermostat,
+            )
+        )
         return self._thermostats
 
     async def async_update_rooms(self) -> dict[int, Room]:
         """Update rooms data"""
-        entity = EntityType.ROOMS.value
-        try:
-            response = await self._api.async_request(
-                "GET", f"{API_URL}{entity}"
+        self._dispatch(
+            self._apply_entities(
+                EntityType.ROOMS,
+                await self._async_fetch(EntityType.ROOMS),
+                self._rooms,
+                Room,
             )
-        except (UnauthorizedError, RequestError) as err:
-            _LOGGER.debug("Failed to update rooms: %s", err)
-            return self._rooms
-
-        if response and entity in response:
-            for item in response[entity]:
-                room = Room(data=item)
-                self._rooms[room.identifier] = room
-
+        )
         return self._rooms
 
     async def async_update_fans(self) -> dict[str, Fan]:
         """Update fans data"""
-        entity = EntityType.FANS.value
+        if self._stream_fans:
+            self._dispatch(await self._async_stream_fans())
+        else:
+            self._dispatch(
+                self._apply_fans(await self._async_fetch(EntityType.FANS))
+            )
+        await self._async_sync_mqtt()
+        return self._fans
+
+    async def _async_fetch(
+        self, entity_type: EntityType
+    ) -> Optional[list[dict[str, Any]]]:
+        """Fetch one collection, returning its items.
+
+        A failed request is logged and returns None, so the current entities
+        of that type are left as they are rather than treated as removed.
+        A response that is the very object applied last time -- a 304 or a
+        cache hit -- returns None as well, as there is nothing to apply,
+        unless it is fans and a command has changed one since.
+        """
+        entity = entity_type.value
         try:
             response = await self._api.async_request(
                 "GET", f"{API_URL}{entity}"
             )
         except (UnauthorizedError, RequestError) as err:
-            _LOGGER.debug("Failed to update fans: %s", err)
-            return self._fans
-
+            _LOGGER.debug("Failed to update %s: %s", entity, err)
+            self._failed_fetches.add(entity_type)
+            return None
+        self._failed_fetches.discard(entity_type)
+
+        if (
+            response is not None
+            and response is self._applied.get(entity_type)
+            and not (
+                entity_type is EntityType.FANS
+                and any(
+                    fan.has_unconfirmed_command for fan in self._fans.values()
+                )
+            )
+        ):
+            _LOGGER.debug("No change to %s since the last update", entity)
+            return None
         if response and entity in response:
-            for data in response[entity]:
-                # One unusable entry must not cost every other fan its
-                # update -- previously a payload without "fan_id" raised
-                # here and the whole refresh was abandoned partway through.
-                fan_id = data.get("fan_id")
-                if not fan_id:
-                    _LOGGER.error(
-                        "Skipping fan entry with no fan_id in API response"
+            self._applied[entity_type] = response
+            return list(response[entity])
+        return None
+
+    @staticmethod
+    def _apply_entities(
+        entity_type: EntityType,
+        items: Optional[list[dict[str, Any]]],
+        entities: dict[int, Any],
+        factory: Callable[[dict[str, Any]], Any],
+    ) -> list[EntityChange]:
+        """Update entities in place from a collection and return the changes.
+
+        Existing objects are kept and updated, so references held by callers
+        stay current. Entities missing from the collection are removed.
+        """
+        if items is None:
+            return []
+
+        changes: list[EntityChange] = []
+        seen: set[int] = set()
+        for item in items:
+            identifier = item["id"]
+            seen.add(identifier)
+            existing = entities.get(identifier)
+            if existing is None:
+                entities[identifier] = entity = factory(item)
+                changes.append(
+                    EntityChange(
+                        entity_type,
+                        identifier,
+                        ChangeKind.ADDED,
+                        diff_state({}, entity.state),
                     )
-                    continue
-
-                if fan_id not in self._fans:
-                    fan = Fan(fan_id=fan_id, api=self._api)
-                    self._fans[fan_id] = fan
+                )
+            elif fields := existing.update(item):
+                changes.append(
+                    EntityChange(
+                        entity_type, identifier, ChangeKind.CHANGED, fields
+                    )
+                )
 
-                if not await self._fans[fan_id].async_update_api_data(data):
-                    # async_update_api_data has already logged the reason and
-                    # left the fan's previous values in place.
-                    continue
+        for identifier in [i for i in entities if i not in seen]:
+            del entities[identifier]
+            changes.append(
+                EntityChange(entity_type, identifier, ChangeKind.REMOVED)
+            )
+        return changes
+
+    def _apply_fans(
+        self, payloads: Optional[list[dict[str, Any]]]
+    ) -> list[EntityChange]:
+        """Apply fan payloads, creating fans that are new.
+
+        Runs as one batch with nothing awaited per fan, and returns the
+        changes in the same form as _apply_entities.
+        """
+        if payloads is None:
+            return []
+
+        changes: list[EntityChange] = []
+        seen: set[str] = set()
+        for data in payloads:
+            self._apply_fan(data, seen, changes)
+        self._remove_fans_not_in(seen, changes)
+        return changes
+
+    def _apply_fan(
+        self,
+        data: dict[str, Any],
+        seen: set[str],
+        changes: list[EntityChange],
+    ) -> None:
+        """Apply one fan payload, noting its fan_id and any change."""
+        # One unusable entry must not cost every other fan its
+        # update -- previously a payload without "fan_id" raised
+        # here and the whole refresh was abandoned partway through.
+        fan_id = data.get("fan_id")
+        if not fan_id:
+            _LOGGER.error("Skipping fan entry with no fan_id in API response")
+            return
+
+        seen.add(fan_id)
+        is_new = fan_id not in self._fans
+        fan = self._get_or_create_fan(fan_id)
+        fields = fan.apply_api_data(data)
+        if fields is None:
+            # apply_api_data has already logged the reason and left
+            # the fan's previous values in place. A fan that has never
+            # had a usable payload is not kept at all.
+            if is_new:
+                del self._fans[fan_id]
+            return
+
+        # Rooms are applied first, so a room renamed since the fan was
+        # last seen shows up here even when the fan itself is unchanged.
+        room_id = fan.room_id
+        if room_id is not None:
+            room_name = self._room_name(room_id)
+            if room_name != fan.room_name:
+                fields["room_name"] = (fan.room_name, room_name)
+                fan.set_room_name(room_name)
+
+        if is_new:
+            changes.append(
+                EntityChange(
+                    EntityType.FANS,
+                    fan_id,
+                    ChangeKind.ADDED,
+                    diff_state({}, fan.state),
+                )
+            )
+        elif fields:
+            changes.append(
+                EntityChange(
+                    EntityType.FANS, fan_id, ChangeKind.CHANGED, fields
+                )
+            )
 
-                room_id = self._fans[fan_id].room_id
-                if room_id is not None:
-                    room_name = await self.async_get_room_name(room_id)
-                    self._fans[fan_id].set_room_name(room_name)
+    def _remove_fans_not_in(
+        self, seen: set[str], changes: list[EntityChange]
+    ) -> None:
+        for fan_id in [i for i in self._fans if i not in seen]:
+            del self._fans[fan_id]
+            changes.append(
+                EntityChange(EntityType.FANS, fan_id, ChangeKind.REMOVED)
+            )
 
-        return self._fans
+    async def _async_stream_fans(
+        self, rooms_applied: Optional[asyncio.Event] = None
+    ) -> list[EntityChange]:
+        """Apply fans one at a time as the fans response is parsed.
+
+        With rooms_applied, each fan waits for the rooms so its room name
+        resolves; reading stops meanwhile, so the rest of the response
+        waits in the connection rather than in memory. A request that fails
+        partway keeps the fans already applied and removes none.
+        """
+        changes: list[EntityChange] = []
+        seen: set[str] = set()
+        stream = self._api.async_stream_items(
+            f"{API_URL}{EntityType.FANS.value}", EntityType.FANS.value
+        )
+        try:
+            async with contextlib.aclosing(stream):
+                async for data in stream:
+                    if rooms_applied is not None:
+                        await rooms_applied.wait()
+                    self._apply_fan(data, seen, changes)
+        except (UnauthorizedError, RequestError) as err:
+            _LOGGER.debug("Failed to stream fans: %s", err)
+            self._failed_fetches.add(EntityType.FANS)
+            return changes
+
+        self._failed_fetches.discard(EntityType.FANS)
+        self._remove_fans_not_in(seen, changes)
+        return changes
+
+    def _get_or_create_fan(self, fan_id: str) -> Fan:
+        """Return the fan with this id, creating it if it is new."""
+        if fan_id not in self._fans:
+            self._fans[fan_id] = Fan(
+                fan_id=fan_id,
+                api=self._api,
+                coalesce_delay=self._command_coalesce_delay,
+                refresh_on_partial_response=self._refresh_on_partial_response,
+            )
+        return self._fans[fan_id]
 
     async def async_get_room_name(self, room_id: int) -> str:
         """Get room name from room"""
+        return self._room_name(room_id)
+
+    def _room_name(self, room_id: int) -> str:
         if room_id in self._rooms:
             room_name = self._rooms[room_id].name
 
@@ -191,6 +823,89 @@ class SmartCocoonManager:
         _LOGGER.debug(msg)
         return "Unknown"
 
+    async def _async_command(
+        self,
+        fan_id: str,
+        fan_mode: Optional[FanMode] = None,
+        fan_speed_pct: Optional[int] = None,
+    ) -> bool:
+        """Send a change to a fan, then poll quickly while it settles."""
+        result = await self._fans[fan_id].async_set_fan_modes(
+            fan_mode=fan_mode, fan_speed_pct=fan_speed_pct
+        )
+        self._poll_soon()
+        return result
+
+    def _poll_soon(self) -> None:
+        """Switch background polling to fast, a command having been sent."""
+        if self._scheduler is not None:
+            self._scheduler.on_command()
+            self._update_wakeup.set()
+
+    async def async_set_fans(
+        self,
+        targets: Iterable[tuple[str, Optional[FanMode], Optional[int]]],
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    ) -> dict[str, bool]:
+        """Set many fans at once, as for a whole-home scene.
+
+        targets are (fan_id, fan_mode, fan_speed_pct), either of the last
+        two may be None as for async_set_fan_modes, and a later target for
+        the same fan replaces an earlier one. Up to max_concurrency updates
+        are in flight together. A fan already at its target is not sent
+        anything, and fans whose update responses were partial are fetched
+        with one refresh at the end rather than one request each.
+
+        Returns whether each fan is now at its target, by fan_id. An
+        unknown fan_id or an invalid target is False.
+        """
+        wanted = {fan_id: (mode, speed) for fan_id, mode, speed in targets}
+        results: dict[str, bool] = {}
+        to_send: list[tuple[Fan, FanMode, int]] = []
+        for fan_id, (fan_mode, fan_speed_pct) in wanted.items():
+            fan = self._fans.get(fan_id)
+            if fan is None:
+                _LOGGER.warning("Fan ID: %s - Unknown fan in batch", fan_id)
+                results[fan_id] = False
+                continue
+            target = fan.resolve_target(fan_mode, fan_speed_pct)
+            if target is None:
+                results[fan_id] = False
+            elif target == (fan.mode_enum, fan.speed_pct):
+                _LOGGER.debug("Fan ID: %s - Already at target", fan_id)
+                results[fan_id] = True
+            else:
+                to_send.append((fan, *target))
+
+        if not to_send:
+            return results
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _async_send(fan: Fan, fan_mode: FanMode, speed: int) -> bool:
+            async with semaphore:
+                return await fan.async_set_fan_modes(
+                    fan_mode, speed, refresh=False
+                )
+
+        sent = await asyncio.gather(
+            *(_async_send(*target) for target in to_send),
+            return_exceptions=True,
+        )
+        for (fan, _, _), result in zip(to_send, sent):
+            if isinstance(result, BaseException):
+                _LOGGER.warning(
+                    "Fan ID: %s - Batch update failed: %s",
+                    fan.fan_id,
+                    result,
+                )
+            results[fan.fan_id] = result is True
+
+        if any(fan.awaiting_refresh for fan, _, _ in to_send):
+            await self.async_update_fans()
+        self._poll_soon()
+        return results
+
     # These return whether the fan actually accepted the change. They
     # previously returned None, which discarded the result and left callers
     # unable to tell a rejected update from an applied one. Existing callers
@@ -199,38 +914,30 @@ class SmartCocoonManager:
     async def async_fan_turn_on(self, fan_id: str) -> bool:
         """Turn on fan. Returns False if the fan did not accept it."""
 
-        return await self._fans[fan_id].async_set_fan_modes(
-            fan_mode=FanMode.ON
-        )
+        return await self._async_command(fan_id, fan_mode=FanMode.ON)
 
     async def async_fan_turn_off(self, fan_id: str) -> bool:
         """Turn off fan. Returns False if the fan did not accept it."""
 
-        return await self._fans[fan_id].async_set_fan_modes(
-            fan_mode=FanMode.OFF
-        )
+        return await self._async_command(fan_id, fan_mode=FanMode.OFF)
 
     async def async_set_fan_auto(self, fan_id: str) -> bool:
         """Enable auto mode on fan. Returns False if not accepted."""
 
-        return await self._fans[fan_id].async_set_fan_modes(
-            fan_mode=FanMode.AUTO
-        )
+        return await self._async_command(fan_id, fan_mode=FanMode.AUTO)
 
     async def async_set_fan_eco(self, fan_id: str) -> bool:
         """Enable eco mode on fan. Returns False if not accepted."""
 
-        return await self._fans[fan_id].async_set_fan_modes(
-            fan_mode=FanMode.ECO
-        )
+        return await self._async_command(fan_id, fan_mode=FanMode.ECO)
 
     async def async_set_fan_modes(
         self, fan_id: str, fan_mode: FanMode, fan_speed_pct: int
     ) -> bool:
         """Set fan mode and speed. Returns False if not accepted."""
 
-        return await self._fans[fan_id].async_set_fan_modes(
-            fan_mode=fan_mode, fan_speed_pct=fan_speed_pct
+        return await self._async_command(
+            fan_id, fan_mode=fan_mode, fan_speed_pct=fan_speed_pct
         )
 
     async def async_set_fan_speed(
@@ -238,6 +945,4 @@ class SmartCocoonManager:
     ) -> bool:
         """Set fan speed. Returns False if not accepted."""
 
-        return await self._fans[fan_id].async_set_fan_modes(
-            fan_speed_pct=fan_speed_pct
-        )
+        return await self._async_command(fan_id, fan_speed_pct=fan_speed_pct)
@@ -0,0 +1,190 @@
+"""Define request instrumentation for SmartCocoonAPI.
+
+The only view into requests used to be DEBUG logging, which is expensive to
+produce and not something to leave on in production. An observer passed to
+SmartCocoonAPI is told about every attempt and every sign-in instead, and
+RequestMetrics aggregates those into counters and latency histograms that
+an exporter can read. Without an observer nothing is measured at all.
+"""
+
+import bisect
+import math
+import re
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Optional
+
+from pysmartcocoon.const import API_URL, DEFAULT_LATENCY_BUCKETS
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_for_url(url: str) -> str:
+    """Return the endpoint a request URL belongs to.
+
+    Numeric ids are replaced by {id}, so "fans/41" is "fans/{id}" and the
+    number of endpoints does not grow with the number of fans.
+    """
+    path = url.removeprefix(API_URL).split("?", 1)[0]
+    return _ID_SEGMENT.sub("/{id}", f"/{path}")[1:]
+
+
+@dataclass(frozen=True)
+class RequestRecord:
+    """One attempt at a request, as made by SmartCocoonAPI."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    method: str
+    endpoint: str
+    #: HTTP status, or None if no response arrived (timeout, lost
+    #: connection).
+    status: Optional[int]
+    #: Seconds from sending the request to having its body.
+    duration: float
+    #: 1 for the first attempt, 2 for the first retry, and so on.
+    attempt: int
+    #: Whether another attempt follows this one.
+    will_retry: bool
+    #: Size of the JSON request body, if there was one.
+    bytes_sent: int = 0
+    #: Content-Length of the response, where the server sent one.
+    bytes_received: int = 0
+
+    @property
+    def succeeded(self) -> bool:
+        """Return whether the attempt got a successful response."""
+        return self.status is not None and self.status < 400
+
+
+class RequestObserver:
+    """Receive instrumentation from SmartCocoonAPI.
+
+    Override whichever methods are needed; each does nothing by default.
+    They are called inline on the event loop, so must be quick and must not
+    raise. Forwarding to Prometheus or OpenTelemetry instruments is usually
+    one line per method.
+    """
+
+    def on_request(self, record: RequestRecord) -> None:
+        """Handle one attempt at a request, after it finished."""
+
+    def on_sign_in(self, succeeded: bool, refresh: bool) -> None:
+        """Handle a sign-in; refresh when it replaced an earlier token."""
+
+
+class LatencyHistogram:
+    """Count durations into buckets with fixed upper bounds."""
+
+    def __init__(
+        self, bounds: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> None:
+        self._bounds = tuple(sorted(bounds))
+        # One count per bound, and one for everything above the last.
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Count one duration, in seconds."""
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._sum += value
+
+    @property
+    def count(self) -> int:
+        """Return how many durations were observed."""
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        """Return the total of the observed durations."""
+        return self._sum
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Return (upper bound, count at or below it) pairs.
+
+        This is the shape Prometheus histograms export; the last bound is
+        infinity and its count is the total.
+        """
+        result = []
+        running = 0
+        for bound, count in zip(self._bounds + (math.inf,), self._counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+
+@dataclass
+class EndpointMetrics:
+    """Totals for one method and endpoint."""
+
+    # pylint: disable=too-many-instance-attributes
+
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    #: Attempts, including retries.
+    requests: int = 0
+    #: Attempts that got no response or an error status.
+    errors: int = 0
+    retries: int = 0
+    #: Attempts answered with 429 Too Many Requests.
+    rate_limited: int = 0
+    #: Attempts answered with a 5xx status.
+    server_errors: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+
+class RequestMetrics(RequestObserver):
+    """Aggregate requests and sign-ins into counters and histograms.
+
+    Read endpoints from an exporter's collection callback; nothing here
+    is reset unless reset is called.
+    """
+
+    def __init__(
+        self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> None:
+        self._latency_buckets = tuple(latency_buckets)
+        self._endpoints: dict[tuple[str, str], EndpointMetrics] = {}
+        self.sign_ins = 0
+        self.sign_in_failures = 0
+        self.token_refreshes = 0
+
+    @property
+    def endpoints(self) -> Mapping[tuple[str, str], EndpointMetrics]:
+        """Return the totals for each (method, endpoint) seen so far."""
+        return self._endpoints
+
+    def reset(self) -> None:
+        """Forget everything counted so far."""
+        self._endpoints.clear()
+        self.sign_ins = self.sign_in_failures = self.token_refreshes = 0
+
+    def on_request(self, record: RequestRecord) -> None:
+        key = (record.method, record.endpoint)
+        metrics = self._endpoints.get(key)
+        if metrics is None:
+            metrics = self._endpoints[key] = EndpointMetrics(
+                LatencyHistogram(self._latency_buckets)
+            )
+
+        metrics.requests += 1
+        metrics.latency.observe(record.duration)
+        metrics.bytes_sent += record.bytes_sent
+        metrics.bytes_received += record.bytes_received
+        if record.attempt > 1:
+            metrics.retries += 1
+        if not record.succeeded:
+            metrics.errors += 1
+        if record.status == 429:
+            metrics.rate_limited += 1
+        elif record.status is not None and 500 <= record.status < 600:
+            metrics.server_errors += 1
+
+    def on_sign_in(self, succeeded: bool, refresh: bool) -> None:
+        self.sign_ins += 1
+        if not succeeded:
+            self.sign_in_failures += 1
+        elif refresh:
+            self.token_refreshes += 1
@@ -0,0 +1,384 @@
+"""Define an optional MQTT transport for fan commands and state.
+
+Every fan payload carries MQTT credentials (mqtt_username/mqtt_password),
+yet every command went through the cloud REST API and state was only learned
+by polling. With a transport attached, commands are published over MQTT and
+state messages are applied as they arrive. The REST API remains the fallback
+whenever a fan is not connected over MQTT, a publish fails, or the fan does
+not report the state a command asked for in time.
+
+No MQTT library is required by this package. A transport is given a client
+factory: aiomqtt_client_factory adapts aiomqtt when it is installed (the
+``mqtt`` extra), and anything else implementing MqttClient works too, which
+is how the tests use an in-memory broker.
+
+SmartCocoon does not publish its topic layout, so the topics are templates
+formatted with the fan's ``fan_id`` and ``identifier``.
+"""
+
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
+from typing import Any, Optional, Protocol
+
+import async_timeout
+
+from pysmartcocoon.const import (
+    DEFAULT_MQTT_COMMAND_TOPIC,
+    DEFAULT_MQTT_CONFIRM_TIMEOUT,
+    DEFAULT_MQTT_STATE_TOPIC,
+    DEFAULT_MQTT_TIMEOUT,
+)
+from pysmartcocoon.errors import SmartCocoonError
+from pysmartcocoon.fan import Fan
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+#: Called with the topic and raw payload of every message received.
+MessageHandler = Callable[[str, bytes], None]
+
+#: Called once if the connection is lost, with the error if there was one.
+DisconnectHandler = Callable[[Optional[BaseException]], None]
+
+#: Called with the fan and its changed fields after a state message.
+StateListener = Callable[[Fan, dict[str, tuple[Any, Any]]], None]
+
+
+class MqttClient(Protocol):
+    """The connection a transport needs for one fan."""
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Publish a message."""
+
+    async def subscribe(self, topic: str) -> None:
+        """Subscribe to a topic; messages go to the factory's handler."""
+
+    async def disconnect(self) -> None:
+        """Close the connection."""
+
+
+#: Connects with a fan's MQTT username and password, delivering received
+#: messages to the message handler and a lost connection to the disconnect
+#: handler.
+MqttClientFactory = Callable[
+    [str, str, MessageHandler, DisconnectHandler], Awaitable[MqttClient]
+]
+
+
+# pylint: disable=too-many-instance-attributes
+class MqttFanTransport:
+    """Send fan commands and receive fan state over MQTT."""
+
+    def __init__(
+        self,
+        client_factory: MqttClientFactory,
+        command_topic: str = DEFAULT_MQTT_COMMAND_TOPIC,
+        state_topic: str = DEFAULT_MQTT_STATE_TOPIC,
+        publish_timeout: float = DEFAULT_MQTT_TIMEOUT,
+        confirm_timeout: float = DEFAULT_MQTT_CONFIRM_TIMEOUT,
+    ) -> None:
+        self._client_factory = client_factory
+        self._command_topic = command_topic
+        self._state_topic = state_topic
+        self._publish_timeout = publish_timeout
+        self._confirm_timeout = confirm_timeout
+        self._clients: dict[str, MqttClient] = {}
+        # Disconnects of lost connections still running, kept referenced.
+        self._disconnecting: set[asyncio.Task[None]] = set()
+        self._listeners: list[StateListener] = []
+        # Commands published but not yet confirmed, by fan_id, as the mode
+        # and power sent and the future a matching state message resolves.
+        self._unconfirmed: dict[
+            str, list[tuple[str, int, asyncio.Future[None]]]
+        ] = {}
+
+    @property
+    def fan_ids(self) -> set[str]:
+        """Return the ids of the fans connected through this transport."""
+        return set(self._clients)
+
+    def is_attached(self, fan: Fan) -> bool:
+        """Return whether a fan is connected through this transport."""
+        return fan.fan_id in self._clients
+
+    def add_state_listener(
+        self, listener: StateListener
+    ) -> Callable[[], None]:
+        """Call listener whenever a state message changes a fan.
+
+        Returns a function that removes it again.
+        """
+        self._listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove
+
+    @staticmethod
+    def _topic(template: str, fan: Fan) -> str:
+        return template.format(fan_id=fan.fan_id, identifier=fan.identifier)
+
+    async def async_attach(self, fan: Fan) -> bool:
+        """Connect a fan and route its commands through this transport.
+
+        Returns False, leaving the fan on the REST API, if the fan has no
+        MQTT credentials or the connection fails.
+        """
+        if self.is_attached(fan):
+            return True
+        if not fan.mqtt_username or not fan.mqtt_password:
+            _LOGGER.debug(
+                "Fan ID: %s - No MQTT credentials, staying on REST",
+                fan.fan_id,
+            )
+            return False
+
+        def _on_message(topic: str, payload: bytes) -> None:
+            self._on_message(fan, topic, payload)
+
+        def _on_disconnect(err: Optional[BaseException]) -> None:
+            self._on_disconnect(fan.fan_id, client, err)
+
+        try:
+            client = await self._client_factory(
+                fan.mqtt_username,
+                fan.mqtt_password,
+                _on_message,
+                _on_disconnect,
+            )
+            await client.subscribe(self._topic(self._state_topic, fan))
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                "Fan ID: %s - Unable to connect over MQTT, staying on "
+                "REST: %s",
+                fan.fan_id,
+                err,
+            )
+            return False
+
+        self._clients[fan.fan_id] = client
+        fan.set_transport(self)
+        return True
+
+    async def async_detach(self, fan_id: str) -> None:
+        """Disconnect a fan, returning its commands to the REST API.
+
+        Takes the id rather than the fan, so a fan the cloud no longer
+        lists can still be disconnected.
+        """
+        client = self._clients.pop(fan_id, None)
+        if client is not None:
+            await self._async_disconnect(fan_id, client)
+
+    async def async_close(self) -> None:
+        """Disconnect every fan.
+
+        Fans keep a reference to the transport, but with no connection
+        every command falls back to the REST API. The same holds for a
+        single fan after async_detach.
+        """
+        clients, self._clients = self._clients, {}
+        for fan_id, client in clients.items():
+            await self._async_disconnect(fan_id, client)
+
+    def _on_disconnect(
+        self, fan_id: str, client: MqttClient, err: Optional[BaseException]
+    ) -> None:
+        """Detach a fan whose connection was lost.
+
+        Otherwise it would stay attached, every command failing to publish
+        before falling back to the REST API; detached, the next refresh
+        connects it again.
+        """
+        if self._clients.get(fan_id) is not client:
+            return
+        _LOGGER.warning(
+            "Fan ID: %s - MQTT connection lost, using REST until the next "
+            "refresh reconnects: %s",
+            fan_id,
+            err,
+        )
+        # As async_detach, but the fan is detached at once.
+        del self._clients[fan_id]
+        task = asyncio.create_task(self._async_disconnect(fan_id, client))
+        self._disconnecting.add(task)
+        task.add_done_callback(self._disconnecting.discard)
+
+    @staticmethod
+    async def _async_disconnect(fan_id: str, client: MqttClient) -> None:
+        try:
+            await client.disconnect()
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug(
+                "Fan ID: %s - Error disconnecting MQTT: %s", fan_id, err
+            )
+
+    async def async_send_command(
+        self, fan: Fan, mode: str, power: int
+    ) -> bool:
+        """Publish a mode and power command and wait for the fan to apply it.
+
+        The command only counts once the fan reports that mode and power
+        in a state message. Returns False if the fan is not connected, the
+        publish fails, or no such message arrives within confirm_timeout
+        -- as when the topics are wrong -- in which case the caller falls
+        back to the REST API.
+        """
+        client = self._clients.get(fan.fan_id)
+        if client is None:
+            return False
+
+        # Registered before publishing, as the fan may answer before the
+        # publish returns.
+        confirmed = asyncio.get_running_loop().create_future()
+        waiter = (mode, power, confirmed)
+        self._unconfirmed.setdefault(fan.fan_id, []).append(waiter)
+        payload = json.dumps({"mode": mode, "power": power}).encode()
+        try:
+            async with async_timeout.timeout(self._publish_timeout):
+                await client.publish(
+                    self._topic(self._command_topic, fan), payload
+                )
+            async with async_timeout.timeout(self._confirm_timeout):
+                await confirmed
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                "Fan ID: %s - MQTT command not confirmed, falling back to "
+                "REST",
+                fan.fan_id,
+            )
+            return False
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning(
+                "Fan ID: %s - MQTT publish failed, falling back to REST: %s",
+                fan.fan_id,
+                err,
+            )
+            return False
+        finally:
+            waiters = self._unconfirmed[fan.fan_id]
+            waiters.remove(waiter)
+            if not waiters:
+                del self._unconfirmed[fan.fan_id]
+        return True
+
+    def _confirm(self, fan_id: str, data: dict[str, Any]) -> None:
+        """Resolve the commands a state message shows were applied."""
+        if "mode" not in data and "power" not in data:
+            return
+        for mode, power, confirmed in self._unconfirmed.get(fan_id, ()):
+            if (
+                data.get("mode", mode) == mode
+                and data.get("power", power) == power
+                and not confirmed.done()
+            ):
+                confirmed.set_result(None)
+
+    def _on_message(self, fan: Fan, topic: str, payload: bytes) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            _LOGGER.debug(
+                "Fan ID: %s - Ignoring non-JSON message on %s",
+                fan.fan_id,
+                topic,
+            )
+            return
+        if not isinstance(data, dict):
+            return
+
+        changed = fan.apply_state(data)
+        if changed is None:
+            return
+        self._confirm(fan.fan_id, data)
+        if not changed:
+            return
+        for listener in list(self._listeners):
+            try:
+                listener(fan, changed)
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("MQTT state listener failed")
+
+
+class _AiomqttClient:
+    """Adapt an aiomqtt client to MqttClient."""
+
+    def __init__(
+        self,
+        client: Any,
+        stack: AsyncExitStack,
+        on_message: MessageHandler,
+        on_disconnect: DisconnectHandler,
+    ) -> None:
+        self._client = client
+        self._stack = stack
+        self._on_disconnect = on_disconnect
+        self._listener = asyncio.create_task(self._async_listen(on_message))
+        self._listener.add_done_callback(self._on_listener_done)
+
+    async def _async_listen(self, on_message: MessageHandler) -> None:
+        async for message in self._client.messages:
+            payload = message.payload
+            if not isinstance(payload, (bytes, bytearray)):
+                payload = str(payload).encode()
+            on_message(str(message.topic), bytes(payload))
+
+    def _on_listener_done(self, listener: "asyncio.Task[None]") -> None:
+        """Report the connection lost unless disconnect stopped listening."""
+        if not listener.cancelled():
+            self._on_disconnect(listener.exception())
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Publish a message."""
+        await self._client.publish(topic, payload)
+
+    async def subscribe(self, topic: str) -> None:
+        """Subscribe to a topic."""
+        await self._client.subscribe(topic)
+
+    async def disconnect(self) -> None:
+        """Stop listening and close the connection."""
+        self._listener.cancel()
+        await self._stack.aclose()
+
+
+def aiomqtt_client_factory(
+    hostname: str, port: int = 8883, tls: bool = True
+) -> MqttClientFactory:
+    """Return a client factory that connects to a broker with aiomqtt.
+
+    aiomqtt is only imported when a fan connects, and is installed with
+    ``pip install pysmartcocoon[mqtt]``.
+    """
+
+    async def _connect(
+        username: str,
+        password: str,
+        on_message: MessageHandler,
+        on_disconnect: DisconnectHandler,
+    ) -> MqttClient:
+        try:
+            # pylint: disable-next=import-outside-toplevel
+            import aiomqtt  # type: ignore[import-not-found]
+        except ImportError as err:
+            raise SmartCocoonError(
+                "MQTT support needs aiomqtt: "
+                "pip install pysmartcocoon[mqtt]"
+            ) from err
+
+        client = aiomqtt.Client(
+            hostname=hostname,
+            port=port,
+            username=username,
+            password=password,
+            tls_params=aiomqtt.TLSParameters() if tls else None,
+        )
+        stack = AsyncExitStack()
+        await stack.enter_async_context(client)
+        return _AiomqttClient(client, stack, on_message, on_disconnect)
+
+    return _connect
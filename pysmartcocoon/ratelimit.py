@@ -0,0 +1,119 @@
+"""Define a client-side rate limiter for SmartCocoon requests.
+
+Reacting to 429 only after the fact means requests arrive in bursts, get
+rejected together, and retry together. A token bucket paces requests before
+they are sent instead, and slows itself down when the cloud says it is being
+asked too often.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from typing import Optional
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Pace requests to a rate, allowing short bursts.
+
+    After a 429 the rate is halved (down to min_rate) and requests are held
+    until the Retry-After time has passed. Each successful request then
+    restores a fraction of the configured rate, so the limiter settles just
+    under the cloud's limit rather than oscillating around it.
+
+    Waiters are served in arrival order. One bucket may be shared between
+    several SmartCocoonAPI instances to apply a global limit.
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        min_rate: Optional[float] = None,
+        recovery: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize.
+
+        rate is in requests per second and burst is how many may be sent
+        back to back. recovery is the fraction of rate restored by each
+        successful request after a slowdown.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+
+        self._max_rate = rate
+        self._min_rate = min_rate if min_rate is not None else rate / 16
+        self._rate = rate
+        self._burst = burst
+        self._recovery = recovery
+        self._clock = clock
+
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Return the current rate in requests per second."""
+        return self._rate
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of requests waiting to be sent."""
+        return self._waiting
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._updated) * self._rate
+        )
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._refill()
+                    wait = self._paused_until - self._clock()
+                    if wait <= 0:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            return
+                        wait = (1 - self._tokens) / self._rate
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting -= 1
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Slow down after the cloud answered 429."""
+        self._refill()
+        self._rate = max(self._min_rate, self._rate / 2)
+        self._tokens = 0.0
+        if retry_after:
+            self._paused_until = max(
+                self._paused_until, self._clock() + retry_after
+            )
+        _LOGGER.debug(
+            "Rate limited by SmartCocoon, slowing to %.2f requests/s",
+            self._rate,
+        )
+
+    def on_success(self) -> None:
+        """Recover towards the configured rate after a request succeeded."""
+        if self._rate < self._max_rate:
+            self._refill()
+            self._rate = min(
+                self._max_rate,
+                self._rate + self._max_rate * self._recovery,
+            )
@@ -9,7 +9,9 @@ Everything here is about what reaches a log file. None of it changes what is
 sent to the API.
 """
 
-from typing import Any
+import json
+from collections.abc import Mapping
+from typing import Any, Optional
 
 REDACTED = "**REDACTED**"
 
@@ -84,3 +86,48 @@ def redact(obj: Any) -> Any:
         return type(obj)(redacted) if isinstance(obj, tuple) else redacted
 
     return obj
+
+
+class RedactedLog:  # pylint: disable=too-few-public-methods
+    """Redact and format a value only when a log record is emitted.
+
+    logging formats a message's arguments only once a handler emits the
+    record, so passing one of these instead of the formatted string costs
+    nothing when no handler wants DEBUG. The result is kept, in case several
+    handlers emit the same record.
+
+    Values are written as indented JSON, or with str() when as_json is
+    False, and cut to max_length characters if that is given.
+    """
+
+    __slots__ = ("_value", "_as_json", "_max_length", "_rendered")
+
+    def __init__(
+        self,
+        value: Any,
+        as_json: bool = True,
+        max_length: Optional[int] = None,
+    ) -> None:
+        self._value = value
+        self._as_json = as_json
+        self._max_length = max_length
+        self._rendered: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._rendered is None:
+            value = self._value
+            # Response headers are a multidict, not a dict.
+            if isinstance(value, Mapping) and not isinstance(value, dict):
+                value = dict(value)
+            if self._as_json:
+                rendered = json.dumps(redact(value), indent=2, default=str)
+            else:
+                rendered = str(redact(value))
+            limit = self._max_length
+            if limit is not None and len(rendered) > limit:
+                rendered = (
+                    f"{rendered[:limit]}... "
+                    f"({len(rendered) - limit} more characters)"
+                )
+            self._rendered = rendered
+        return self._rendered
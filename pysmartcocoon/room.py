@@ -2,24 +2,96 @@
 
 # pylint: disable=too-few-public-methods,too-many-instance-attributes
 
+from operator import itemgetter
 from typing import Any
 
+from pysmartcocoon.entity import RecordEntity
 
-class Room:  # pylint: disable=too-many-instance-attributes
+
+class Room(RecordEntity):  # pylint: disable=too-many-instance-attributes
     """Define the room."""
 
-    def __init__(self, data: dict[str, Any]) -> None:
-        """Initialize."""
-        self._identifier: int = data["id"]
-        self._name: str = data["name"]
-        self._desired_temperature: float = data["desired_temperature"]
-        self._hvac_mode: str = data["hvac_mode"]
-        self._hvac_state: str = data["hvac_state"]
-        self._is_estimating: bool = data["is_estimating"]
-        self._predicted_temperature: float = data["predicted_temperature"]
-        self._target_temperature: float = data["target_temperature"]
-        self._temperature: float = data["temperature"]
-        self._thermostat_id: int = data["thermostat_id"]
+    __slots__ = (
+        "_identifier",
+        "_name",
+        "_desired_temperature",
+        "_hvac_mode",
+        "_hvac_state",
+        "_is_estimating",
+        "_predicted_temperature",
+        "_target_temperature",
+        "_temperature",
+        "_thermostat_id",
+    )
+
+    # A record's fields, in the order of __slots__.
+    _read = itemgetter(
+        "id",
+        "name",
+        "desired_temperature",
+        "hvac_mode",
+        "hvac_state",
+        "is_estimating",
+        "predicted_temperature",
+        "target_temperature",
+        "temperature",
+        "thermostat_id",
+    )
+
+    _identifier: int
+    _name: str
+    _desired_temperature: float
+    _hvac_mode: str
+    _hvac_state: str
+    _is_estimating: bool
+    _predicted_temperature: float
+    _target_temperature: float
+    _temperature: float
+    _thermostat_id: int
+
+    def _apply(self, values: tuple[Any, ...]) -> None:
+        (
+            self._identifier,
+            self._name,
+            self._desired_temperature,
+            self._hvac_mode,
+            self._hvac_state,
+            self._is_estimating,
+            self._predicted_temperature,
+            self._target_temperature,
+            self._temperature,
+            self._thermostat_id,
+        ) = values
+
+    @property
+    def state(self) -> dict[str, Any]:
+        """Return the room's fields, for detecting changes."""
+        return {
+            "name": self._name,
+            "desired_temperature": self._desired_temperature,
+            "hvac_mode": self._hvac_mode,
+            "hvac_state": self._hvac_state,
+            "is_estimating": self._is_estimating,
+            "predicted_temperature": self._predicted_temperature,
+            "target_temperature": self._target_temperature,
+            "temperature": self._temperature,
+            "thermostat_id": self._thermostat_id,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the room as the API payload __init__ accepts."""
+        return {
+            "id": self._identifier,
+            "name": self._name,
+            "desired_temperature": self._desired_temperature,
+            "hvac_mode": self._hvac_mode,
+            "hvac_state": self._hvac_state,
+            "is_estimating": self._is_estimating,
+            "predicted_temperature": self._predicted_temperature,
+            "target_temperature": self._target_temperature,
+            "temperature": self._temperature,
+            "thermostat_id": self._thermostat_id,
+        }
 
     @property
     def identifier(self) -> int:
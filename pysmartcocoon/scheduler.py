@@ -0,0 +1,107 @@
+"""Define the adaptive schedule SmartCocoonManager polls on.
+
+A fixed interval is too slow just after somebody changes a fan, when the
+change is still settling, and wasteful overnight, when nothing changes for
+hours. The schedule polls quickly for a short window after each command,
+and backs off while polls keep finding nothing new.
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from pysmartcocoon.const import (
+    DEFAULT_FAST_POLL_INTERVAL,
+    DEFAULT_FAST_POLL_WINDOW,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_UPDATE_INTERVAL,
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """Decide when the next poll is due.
+
+    Polls run every interval seconds. For fast_window seconds after a
+    command they run every fast_interval instead. Each poll that finds no
+    change multiplies the interval by backoff, up to max_interval; a poll
+    that finds one returns it to the configured interval. A 429 from the
+    cloud ends any fast window, backs off, and holds polling for the
+    Retry-After time.
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    # pylint: disable=too-many-positional-arguments
+    def __init__(
+        self,
+        interval: float = DEFAULT_UPDATE_INTERVAL,
+        fast_interval: float = DEFAULT_FAST_POLL_INTERVAL,
+        fast_window: float = DEFAULT_FAST_POLL_WINDOW,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        backoff: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if interval <= 0 or fast_interval <= 0:
+            raise ValueError("intervals must be positive")
+        if backoff < 1:
+            raise ValueError("backoff must be at least 1")
+
+        # An interval outside the defaults' range moves them with it, so
+        # PollScheduler(1) polls every second rather than raising.
+        self._base_interval = interval
+        self._fast_interval = min(fast_interval, interval)
+        self._fast_window = fast_window
+        self._max_interval = max(max_interval, interval)
+        self._backoff = backoff
+        self._clock = clock
+
+        self._interval = float(interval)
+        self._last_poll = clock()
+        self._fast_until = 0.0
+        self._paused_until = 0.0
+
+    @property
+    def interval(self) -> float:
+        """Return the current interval between polls, in seconds."""
+        if self._clock() < self._fast_until:
+            return self._fast_interval
+        return self._interval
+
+    def next_delay(self) -> float:
+        """Return the seconds until the next poll is due."""
+        due = max(self._last_poll + self.interval, self._paused_until)
+        return max(0.0, due - self._clock())
+
+    def on_command(self) -> None:
+        """Poll quickly for a while, a command having just been sent."""
+        self._fast_until = self._clock() + self._fast_window
+        self._interval = float(self._base_interval)
+
+    def on_poll(self, changed: bool) -> None:
+        """Record a poll and whether it found anything new."""
+        now = self._clock()
+        self._last_poll = now
+        if changed:
+            self._interval = float(self._base_interval)
+        elif now >= self._fast_until:
+            # Fast polls finding nothing yet are expected while a command
+            # settles; only back off once the window is over.
+            self._interval = min(
+                self._max_interval, self._interval * self._backoff
+            )
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Slow down after the cloud answered 429."""
+        now = self._clock()
+        self._fast_until = 0.0
+        self._interval = min(
+            self._max_interval, self._interval * self._backoff
+        )
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        _LOGGER.debug(
+            "Rate limited by SmartCocoon, polling every %.0f seconds",
+            self._interval,
+        )
@@ -0,0 +1,97 @@
+"""Read and write manager snapshots for a warm start.
+
+A snapshot holds the locations, thermostats, rooms and fans a manager last
+saw, and optionally the auth triple, so a restart can serve entities at once
+and revalidate against the cloud in the background.
+
+Snapshots always contain credentials -- thermostat tokens and each fan's MQTT
+password come back from the API with the entities -- so the file is written
+readable by its owner only.
+"""
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from pysmartcocoon.codec import STDLIB_CODEC, JsonCodec
+
+_LOGGER: logging.Logger = logging.getLogger(__name__)
+
+#: Bumped whenever the layout changes. A snapshot with any other version is
+#: ignored rather than guessed at.
+SNAPSHOT_VERSION = 1
+
+SnapshotPath = Union[str, "os.PathLike[str]"]
+
+
+def encode_snapshot(
+    snapshot: dict[str, Any], codec: JsonCodec = STDLIB_CODEC
+) -> bytes:
+    """Encode a snapshot compactly."""
+    return codec.dumps({"version": SNAPSHOT_VERSION, **snapshot})
+
+
+def decode_snapshot(
+    raw: bytes, codec: JsonCodec = STDLIB_CODEC
+) -> Optional[dict[str, Any]]:
+    """Decode a snapshot, returning None if it is unusable."""
+    try:
+        snapshot = codec.loads(raw)
+    except ValueError:
+        _LOGGER.warning("Ignoring snapshot that is not valid JSON")
+        return None
+
+    if not isinstance(snapshot, dict):
+        _LOGGER.warning("Ignoring snapshot that is not an object")
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        _LOGGER.warning(
+            "Ignoring snapshot with version %s, expected %s",
+            snapshot.get("version"),
+            SNAPSHOT_VERSION,
+        )
+        return None
+    return snapshot
+
+
+def write_snapshot(
+    path: SnapshotPath,
+    snapshot: dict[str, Any],
+    codec: JsonCodec = STDLIB_CODEC,
+) -> None:
+    """Write a snapshot atomically, readable by its owner only.
+
+    Written to a temporary file and renamed over the target, so a crash
+    mid-write leaves the previous snapshot in place rather than a truncated
+    one. This blocks; call it from an executor in async code.
+    """
+    target = Path(path)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(encode_snapshot(snapshot, codec))
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def read_snapshot(
+    path: SnapshotPath, codec: JsonCodec = STDLIB_CODEC
+) -> Optional[dict[str, Any]]:
+    """Read a snapshot, returning None if it is missing or unusable.
+
+    This blocks; call it from an executor in async code.
+    """
+    try:
+        raw = Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+    except OSError as err:
+        _LOGGER.warning("Unable to read snapshot %s: %s", path, err)
+        return None
+    return decode_snapshot(raw, codec)
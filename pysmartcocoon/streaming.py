@@ -0,0 +1,178 @@
+"""Define an incremental parser for one array in a JSON response.
+
+A collection response is a JSON object holding one large array, such as
+{"fans": [...]}. Decoding it whole means holding the entire body and the
+entire tree of dicts before the first item can be used. This parser is fed
+the body as it arrives and hands back each item of the array as soon as it
+is complete, so only the item being parsed is held at a time.
+"""
+
+import codecs
+import json
+from typing import Any
+
+_WHITESPACE = " \t\n\r"
+# What may follow a key, or a value inside an object or array.
+_AFTER_VALUE = frozenset(_WHITESPACE + ":,]}")
+
+# Where the parser is in the response's top-level object.
+_OPEN = "open"  # before "{"
+_KEY = "key"  # before a key, or "}" if the object is empty
+_COLON = "colon"  # between a key and its value
+_VALUE = "value"  # before a value
+_FIRST_ITEM = "first_item"  # after "[", before the first item or "]"
+_ITEM = "item"  # before an item
+_NEXT_ITEM = "next_item"  # after an item, before "," or "]"
+_NEXT_KEY = "next_key"  # after a value, before "," or "}"
+_DONE = "done"  # after the closing "}"
+
+
+class JsonArrayStream:
+    """Parse the items of one array in a JSON object as its bytes arrive.
+
+    Other members of the object are parsed and discarded. Any JSON value
+    can be an item, though collections only ever hold objects.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, key: str) -> None:
+        self._key = key
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = _OPEN
+        self._current: Any = None
+        self._found = False
+
+    @property
+    def found(self) -> bool:
+        """Return whether the array has been found in the object."""
+        return self._found
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Add the next bytes of the body, returning the items completed.
+
+        Raises ValueError if the body is not the JSON object expected.
+        """
+        # Whatever has been parsed is dropped, so the buffer only ever
+        # holds the item, or skipped value, that is still incomplete.
+        self._buffer = self._buffer[self._pos :] + self._text.decode(chunk)
+        self._pos = 0
+        items: list[Any] = []
+        while self._step(items):
+            pass
+        return items
+
+    def close(self) -> list[Any]:
+        """Finish the body, returning any last items.
+
+        Raises ValueError if the body ended before the object did, or the
+        object has no array under the key.
+        """
+        self._buffer = self._buffer[self._pos :] + self._text.decode(
+            b"", final=True
+        )
+        self._pos = 0
+        items: list[Any] = []
+        while self._step(items):
+            pass
+        if self._state != _DONE:
+            raise ValueError("Response ended before its JSON object did")
+        if not self._found:
+            raise ValueError(f"Response has no {self._key!r} array")
+        return items
+
+    def _skip_whitespace(self) -> bool:
+        """Move past whitespace, returning whether anything follows."""
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buffer)
+
+    def _decode(self) -> tuple[bool, Any]:
+        """Decode the value at the current position, if it is complete.
+
+        A value is only taken as complete once a delimiter follows it; until
+        then "12" might yet become "12.5". An error is taken to mean the
+        value is incomplete, which close reports if more never arrives.
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            return False, None
+        if end >= len(self._buffer) or self._buffer[end] not in _AFTER_VALUE:
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _expect(self, char: str) -> None:
+        if self._buffer[self._pos] != char:
+            raise ValueError(
+                f"Expected {char!r} in response, found "
+                f"{self._buffer[self._pos]!r}"
+            )
+        self._pos += 1
+
+    # pylint: disable-next=too-many-branches,too-many-return-statements
+    def _step(self, items: list[Any]) -> bool:
+        """Parse one token, returning False when more data is needed."""
+        if not self._skip_whitespace():
+            return False
+        char = self._buffer[self._pos]
+        state = self._state
+
+        if state == _OPEN:
+            self._expect("{")
+            self._state = _KEY
+        elif state == _KEY:
+            if char == "}":
+                self._pos += 1
+                self._state = _DONE
+                return True
+            complete, self._current = self._decode()
+            if not complete:
+                return False
+            if not isinstance(self._current, str):
+                raise ValueError("Expected a key in response")
+            self._state = _COLON
+        elif state == _COLON:
+            self._expect(":")
+            self._state = _VALUE
+        elif state == _VALUE:
+            if self._current == self._key and not self._found:
+                self._expect("[")
+                self._found = True
+                self._state = _FIRST_ITEM
+                return True
+            complete, _ = self._decode()
+            if not complete:
+                return False
+            self._state = _NEXT_KEY
+        elif state in (_FIRST_ITEM, _NEXT_ITEM):
+            if char == "]":
+                self._pos += 1
+                self._state = _NEXT_KEY
+                return True
+            if state == _NEXT_ITEM:
+                self._expect(",")
+            self._state = _ITEM
+        elif state == _ITEM:
+            complete, item = self._decode()
+            if not complete:
+                return False
+            items.append(item)
+            self._state = _NEXT_ITEM
+        elif state == _NEXT_KEY:
+            if char == "}":
+                self._pos += 1
+                self._state = _DONE
+                return True
+            self._expect(",")
+            self._state = _KEY
+        else:
+            raise ValueError("Unexpected data after the response's object")
+        return True
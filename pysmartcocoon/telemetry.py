@@ -0,0 +1,377 @@
+"""Define a columnar store of the fleet's fan telemetry.
+
+Trending power, fan_on, connected and predicted room temperature across
+thousands of fans meant walking manager.fans and reading properties one fan
+at a time. FleetTelemetry keeps each of those fields in a typed array, one
+row per fan, and is kept current from the manager's change events, so only
+the fans that changed are touched. Aggregates over the fleet then run over
+the arrays rather than over Fan objects.
+
+The arrays are the standard library's, so nothing extra is needed. column
+returns a copy that NumPy can wrap without copying again, for example
+``numpy.frombuffer(telemetry.column("power"), dtype=numpy.int32)``.
+"""
+
+import math
+import time
+from array import array
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+from pysmartcocoon.changes import ChangeKind, ChangeSet
+from pysmartcocoon.const import DEFAULT_TELEMETRY_HISTORY, EntityType
+
+if TYPE_CHECKING:
+    from pysmartcocoon.manager import SmartCocoonManager
+
+#: The columns kept for every fan, and their array type codes.
+COLUMNS: dict[str, str] = {
+    "power": "i",
+    "fan_on": "B",
+    "connected": "B",
+    "predicted_room_temperature": "d",
+}
+
+# Stored for a fan with no room, since the column cannot hold None.
+_NO_ROOM = -1
+
+
+@dataclass(frozen=True)
+class TelemetrySample:
+    """The fleet's aggregates at one moment."""
+
+    timestamp: float
+    fans: int
+    fraction_connected: float
+    fraction_on: float
+    mean_power: float
+    #: NaN when no fan has a predicted room temperature.
+    mean_predicted_room_temperature: float
+
+
+class _Totals:
+    """Running totals over a group of fans, kept as fans change."""
+
+    # pylint: disable=too-few-public-methods
+
+    __slots__ = (
+        "fans",
+        "power",
+        "fan_on",
+        "connected",
+        "temperature",
+        "known",
+    )
+
+    def __init__(self) -> None:
+        self.fans = 0
+        self.power = 0
+        self.fan_on = 0
+        self.connected = 0
+        #: The sum of the predicted temperatures known, and how many are.
+        self.temperature = 0.0
+        self.known = 0
+
+    # pylint: disable-next=too-many-arguments,too-many-positional-arguments
+    def add(
+        self,
+        sign: int,
+        power: int,
+        fan_on: int,
+        connected: int,
+        temperature: float,
+    ) -> None:
+        """Add a fan's values, or with a sign of -1 take them away."""
+        self.fans += sign
+        self.power += sign * power
+        self.fan_on += sign * fan_on
+        self.connected += sign * connected
+        if not math.isnan(temperature):
+            self.temperature += sign * temperature
+            self.known += sign
+
+
+class FleetTelemetry:
+    """The latest telemetry of every fan, one array per field.
+
+    Rows are kept dense: a removed fan's row is filled by the last fan's, so
+    every row belongs to a fan. Totals for the fleet and for each room are
+    adjusted as fans change, so aggregates cost the same however many fans
+    there are. A sample of the aggregates is kept in a ring of fixed size
+    each time the fleet changes.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, history: int = DEFAULT_TELEMETRY_HISTORY) -> None:
+        if history < 1:
+            raise ValueError("history must be at least 1")
+
+        self._fan_ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._power: "array[int]" = array(COLUMNS["power"])
+        self._fan_on: "array[int]" = array(COLUMNS["fan_on"])
+        self._connected: "array[int]" = array(COLUMNS["connected"])
+        self._temperature: "array[float]" = array(
+            COLUMNS["predicted_room_temperature"]
+        )
+        # Each fan's room_id, or _NO_ROOM.
+        self._room: "array[int]" = array("q")
+        self._fleet = _Totals()
+        self._rooms: dict[int, _Totals] = {}
+
+        # The history ring, one preallocated array per aggregate. _next is
+        # where the next sample goes, and _samples how many are held.
+        self._history = history
+        self._next = 0
+        self._samples = 0
+        self._ring: "dict[str, array[float]]" = {
+            name: array("d", bytes(8 * history))
+            for name in (
+                "timestamp",
+                "fans",
+                "fraction_connected",
+                "fraction_on",
+                "mean_power",
+                "mean_predicted_room_temperature",
+            )
+        }
+
+    def __len__(self) -> int:
+        return len(self._fan_ids)
+
+    def __contains__(self, fan_id: object) -> bool:
+        return fan_id in self._rows
+
+    @property
+    def fan_ids(self) -> tuple[str, ...]:
+        """Return the fan_id of each row, in row order."""
+        return tuple(self._fan_ids)
+
+    def column(self, name: str) -> "array[Any]":
+        """Return a copy of one column, aligned with fan_ids.
+
+        Raises KeyError for a name not in COLUMNS.
+        """
+        return self._columns()[name][:]
+
+    def attach(self, manager: "SmartCocoonManager") -> Callable[[], None]:
+        """Load the manager's fans and follow its changes to them.
+
+        Returns a function that stops following them.
+        """
+        for fan_id, fan in manager.fans.items():
+            self._set(fan_id, fan.state)
+        self.record()
+        return manager.subscribe(self.apply, EntityType.FANS)
+
+    def apply(self, changes: ChangeSet) -> None:
+        """Apply a manager's fan changes, then record a sample."""
+        for change in changes.of_type(EntityType.FANS):
+            if change.kind is ChangeKind.REMOVED:
+                self._remove(change.identifier)
+            else:
+                self._set(
+                    change.identifier,
+                    {name: new for name, (_, new) in change.fields.items()},
+                )
+        self.record()
+
+    def _columns(self) -> "dict[str, array[Any]]":
+        return {
+            "power": self._power,
+            "fan_on": self._fan_on,
+            "connected": self._connected,
+            "predicted_room_temperature": self._temperature,
+        }
+
+    def _set(self, fan_id: str, fields: dict[str, Any]) -> None:
+        """Write a fan's fields, adding a row for it if it is new.
+
+        A value the columns cannot hold raises, leaving the row and the
+        totals as they were; a new fan gets no row.
+        """
+        row = self._rows.get(fan_id)
+        if row is None:
+            row = len(self._fan_ids)
+            self._fan_ids.append(fan_id)
+            self._power.append(0)
+            self._fan_on.append(0)
+            self._connected.append(0)
+            self._temperature.append(math.nan)
+            self._room.append(_NO_ROOM)
+            try:
+                self._write(row, fields)
+            except (TypeError, ValueError, OverflowError):
+                self._fan_ids.pop()
+                for column in (*self._columns().values(), self._room):
+                    column.pop()
+                raise
+            self._rows[fan_id] = row
+            self._count(row, 1)
+            return
+
+        previous = self._row(row)
+        self._count(row, -1)
+        try:
+            self._write(row, fields)
+        except (TypeError, ValueError, OverflowError):
+            self._write(row, previous)
+            raise
+        finally:
+            self._count(row, 1)
+
+    def _row(self, row: int) -> dict[str, Any]:
+        """Return a row's values, as fields _write takes."""
+        room = self._room[row]
+        return {
+            "power": self._power[row],
+            "fan_on": self._fan_on[row],
+            "connected": self._connected[row],
+            "predicted_room_temperature": self._temperature[row],
+            "room_id": None if room == _NO_ROOM else room,
+        }
+
+    def _write(self, row: int, fields: dict[str, Any]) -> None:
+        """Write the fields given to a row, leaving the totals alone."""
+        if "power" in fields:
+            self._power[row] = fields["power"] or 0
+        if "fan_on" in fields:
+            self._fan_on[row] = bool(fields["fan_on"])
+        if "connected" in fields:
+            self._connected[row] = bool(fields["connected"])
+        if "predicted_room_temperature" in fields:
+            temperature = fields["predicted_room_temperature"]
+            self._temperature[row] = (
+                math.nan if temperature is None else temperature
+            )
+        if "room_id" in fields:
+            room = fields["room_id"]
+            self._room[row] = _NO_ROOM if room is None else room
+
+    def _count(self, row: int, sign: int) -> None:
+        """Add a row to the totals, or with a sign of -1 take it away."""
+        values = (
+            self._power[row],
+            self._fan_on[row],
+            self._connected[row],
+            self._temperature[row],
+        )
+        self._fleet.add(sign, *values)
+        room = self._room[row]
+        totals = self._rooms.get(room)
+        if totals is None:
+            totals = self._rooms[room] = _Totals()
+        totals.add(sign, *values)
+        if not totals.fans:
+            del self._rooms[room]
+
+    def _remove(self, fan_id: str) -> None:
+        """Drop a fan's row, moving the last row into its place."""
+        row = self._rows.pop(fan_id, None)
+        if row is None:
+            return
+        self._count(row, -1)
+        last = len(self._fan_ids) - 1
+        if row != last:
+            moved = self._fan_ids[last]
+            self._fan_ids[row] = moved
+            self._rows[moved] = row
+            for column in (*self._columns().values(), self._room):
+                column[row] = column[last]
+        self._fan_ids.pop()
+        for column in (*self._columns().values(), self._room):
+            column.pop()
+
+    def fraction_connected(self) -> float:
+        """Return the fraction of fans that are connected."""
+        return _fraction(self._fleet.connected, self._fleet.fans)
+
+    def fraction_on(self) -> float:
+        """Return the fraction of fans that are on."""
+        return _fraction(self._fleet.fan_on, self._fleet.fans)
+
+    def mean_power(self) -> float:
+        """Return the mean power of the fleet, 0-10000."""
+        return _fraction(self._fleet.power, self._fleet.fans)
+
+    def mean_predicted_room_temperature(self) -> float:
+        """Return the mean predicted room temperature.
+
+        Fans without one are left out; NaN if none has one.
+        """
+        fleet = self._fleet
+        return fleet.temperature / fleet.known if fleet.known else math.nan
+
+    def mean_power_by_room(self) -> dict[Optional[int], float]:
+        """Return the mean power of the fans in each room.
+
+        Fans with no room are under None.
+        """
+        return {
+            (None if room == _NO_ROOM else room): totals.power / totals.fans
+            for room, totals in self._rooms.items()
+        }
+
+    def fraction_connected_by_room(self) -> dict[Optional[int], float]:
+        """Return the fraction of the fans in each room that are connected.
+
+        Fans with no room are under None.
+        """
+        return {
+            (None if room == _NO_ROOM else room): totals.connected
+            / totals.fans
+            for room, totals in self._rooms.items()
+        }
+
+    def sample(self) -> TelemetrySample:
+        """Return the fleet's aggregates now."""
+        return TelemetrySample(
+            timestamp=time.time(),
+            fans=len(self),
+            fraction_connected=self.fraction_connected(),
+            fraction_on=self.fraction_on(),
+            mean_power=self.mean_power(),
+            mean_predicted_room_temperature=(
+                self.mean_predicted_room_temperature()
+            ),
+        )
+
+    def record(self) -> TelemetrySample:
+        """Add a sample to the history, overwriting the oldest when full."""
+        sample = self.sample()
+        for name, ring in self._ring.items():
+            ring[self._next] = getattr(sample, name)
+        self._next = (self._next + 1) % self._history
+        self._samples = min(self._samples + 1, self._history)
+        return sample
+
+    def history(self, since: Optional[float] = None) -> list[TelemetrySample]:
+        """Return the samples held, oldest first.
+
+        With since, a timestamp, only samples taken at or after it.
+        """
+        start = (self._next - self._samples) % self._history
+        samples = []
+        for offset in range(self._samples):
+            index = (start + offset) % self._history
+            if since is not None and self._ring["timestamp"][index] < since:
+                continue
+            samples.append(
+                TelemetrySample(
+                    timestamp=self._ring["timestamp"][index],
+                    fans=int(self._ring["fans"][index]),
+                    fraction_connected=self._ring["fraction_connected"][index],
+                    fraction_on=self._ring["fraction_on"][index],
+                    mean_power=self._ring["mean_power"][index],
+                    mean_predicted_room_temperature=self._ring[
+                        "mean_predicted_room_temperature"
+                    ][index],
+                )
+            )
+        return samples
+
+
+def _fraction(part: float, whole: int) -> float:
+    return part / whole if whole else 0.0
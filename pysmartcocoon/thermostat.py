@@ -2,23 +2,92 @@
 
 # pylint: disable=too-few-public-methods,too-many-instance-attributes
 
+from operator import itemgetter
 from typing import Any
 
+from pysmartcocoon.entity import RecordEntity
 
-class Thermostat:  # pylint: disable=too-many-instance-attributes
+
+class Thermostat(RecordEntity):  # pylint: disable=too-many-instance-attributes
     """Define the thermostat."""
 
-    def __init__(self, data: dict[str, Any]) -> None:
-        """Initialize."""
-        self._identifier: int = data["id"]
-        self._name: str = data["name"]
-        self._thermostat_id: int = data["thermostat_id"]
-        self._token: str = data["token"]
-        self._hvac_mode: str = data["hvac_mode"]
-        self._hvac_state: str = data["hvac_state"]
-        self._temperature: float = data["temperature"]
-        self._target_temperature: float = data["target_temperature"]
-        self._vendor: str = data["vendor"]
+    __slots__ = (
+        "_identifier",
+        "_name",
+        "_thermostat_id",
+        "_token",
+        "_hvac_mode",
+        "_hvac_state",
+        "_temperature",
+        "_target_temperature",
+        "_vendor",
+    )
+
+    # A record's fields, in the order of __slots__.
+    _read = itemgetter(
+        "id",
+        "name",
+        "thermostat_id",
+        "token",
+        "hvac_mode",
+        "hvac_state",
+        "temperature",
+        "target_temperature",
+        "vendor",
+    )
+
+    _identifier: int
+    _name: str
+    _thermostat_id: int
+    _token: str
+    _hvac_mode: str
+    _hvac_state: str
+    _temperature: float
+    _target_temperature: float
+    _vendor: str
+
+    def _apply(self, values: tuple[Any, ...]) -> None:
+        (
+            self._identifier,
+            self._name,
+            self._thermostat_id,
+            self._token,
+            self._hvac_mode,
+            self._hvac_state,
+            self._temperature,
+            self._target_temperature,
+            self._vendor,
+        ) = values
+
+    @property
+    def state(self) -> dict[str, Any]:
+        """Return the thermostat's fields, for detecting changes.
+
+        The token is left out: it is a credential, not state to render.
+        """
+        return {
+            "name": self._name,
+            "thermostat_id": self._thermostat_id,
+            "hvac_mode": self._hvac_mode,
+            "hvac_state": self._hvac_state,
+            "temperature": self._temperature,
+            "target_temperature": self._target_temperature,
+            "vendor": self._vendor,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the thermostat as the API payload __init__ accepts."""
+        return {
+            "id": self._identifier,
+            "name": self._name,
+            "thermostat_id": self._thermostat_id,
+            "token": self._token,
+            "hvac_mode": self._hvac_mode,
+            "hvac_state": self._hvac_state,
+            "temperature": self._temperature,
+            "target_temperature": self._target_temperature,
+            "vendor": self._vendor,
+        }
 
     @property
     def identifier(self) -> int:
@@ -0,0 +1,109 @@
+"""Fakes shared by the tests that drive the API without a network.
+
+Test modules import these directly (``from conftest import ...``), as
+pytest puts this directory on sys.path when it loads this file.
+"""
+
+from typing import Any, Optional
+
+from aiohttp import ClientResponseError, RequestInfo
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from pysmartcocoon.const import API_URL
+
+
+def fan_payload(**overrides: Any) -> dict[str, Any]:
+    """Return a fan as the cloud lists it, with any fields overridden."""
+    return {
+        "id": 41,
+        "fan_id": "fan-a",
+        "mode": "auto",
+        "fan_on": True,
+        "firmware_version": "1.0.0",
+        "is_room_estimating": False,
+        "connected": True,
+        "last_connection": None,
+        "power": 3300,
+        "predicted_room_temperature": 21.0,
+        "room_id": None,
+        "thermostat_vendor": None,
+        "mqtt_username": "u",
+        "mqtt_password": "p",
+        **overrides,
+    }
+
+
+class FakeResponse:
+    """Just enough of aiohttp's response for async_request."""
+
+    def __init__(
+        self,
+        body: Any = None,
+        status: int = 200,
+        headers: Optional[dict[str, str]] = None,
+        url: str = API_URL,
+        content_length: Optional[int] = None,
+    ) -> None:
+        self.body = body
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers or {}))
+        self.url = url
+        self.content_length = content_length
+        self.decoded = False
+        self.released = False
+
+    def raise_for_status(self) -> None:
+        """Raise as aiohttp would for an error status."""
+        if self.status >= 400:
+            raise ClientResponseError(
+                RequestInfo(
+                    URL(self.url),
+                    "GET",
+                    CIMultiDictProxy(CIMultiDict()),
+                    URL(self.url),
+                ),
+                (),
+                status=self.status,
+                headers=self.headers,
+            )
+
+    async def json(self, **_: Any) -> Any:
+        """Return the body, noting that it was decoded."""
+        self.decoded = True
+        return self.body
+
+    def release(self) -> None:
+        """Note that the connection was given back."""
+        self.released = True
+
+
+class FakeSession:
+    """Serves collections by name, recording every request.
+
+    A collection not given is served empty. Tests needing anything else
+    override respond.
+    """
+
+    def __init__(self, **collections: list[Any]) -> None:
+        self.closed = False
+        self.collections = collections
+        self.requests: list[tuple[str, str]] = []
+        self.responses: list[FakeResponse] = []
+
+    async def request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Record the request and answer it."""
+        self.requests.append((method, url))
+        response = await self.respond(method, url, **kwargs)
+        self.responses.append(response)
+        return response
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Answer a collection GET."""
+        del method, kwargs
+        key = url.removeprefix(API_URL)
+        return FakeResponse({key: self.collections.get(key, [])}, url=url)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Tests for setting many fans in one batch.
+
+A scene across twenty fans used to mean twenty async_set_fan_modes calls,
+each with its own update and follow-up fetch. A batch skips fans already at
+their target, sends the rest concurrently and refreshes once at the end.
+"""
+
+import asyncio
+import copy
+from typing import Any, Optional
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.const import API_URL, FanMode
+from pysmartcocoon.manager import SmartCocoonManager
+
+
+def _fan(fan_id: str, identifier: int, mode: str = "auto") -> dict[str, Any]:
+    return fan_payload(id=identifier, fan_id=fan_id, mode=mode, power=5000)
+
+
+class _CloudAPI:
+    """Serves a fan list and tracks updates in flight."""
+
+    def __init__(self, count: int, partial: bool = False) -> None:
+        self.fans = {
+            i: _fan(f"fan-{i}", i, mode="always_off") for i in range(count)
+        }
+        self.partial = partial
+        self.updates: list[int] = []
+        self.fan_gets = 0
+        self.list_gets = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Answer collection GETs."""
+        del method, kwargs
+        key = url.removeprefix(API_URL)
+        if key == "fans":
+            self.list_gets += 1
+            return {"fans": copy.deepcopy(list(self.fans.values()))}
+        return {key: []}
+
+    async def async_update_fan(
+        self, fan_identifier: int, mode: str, power: int
+    ) -> Optional[dict[str, Any]]:
+        """Apply the update after a short delay."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+
+        self.updates.append(fan_identifier)
+        fan = self.fans[fan_identifier]
+        fan.update(mode=mode, power=power)
+        return {"ok": True} if self.partial else copy.deepcopy(fan)
+
+    async def async_get_fan(self, fan_identifier: int) -> dict[str, Any]:
+        """Return one fan, counting the request."""
+        self.fan_gets += 1
+        return copy.deepcopy(self.fans[fan_identifier])
+
+
+async def _manager(api: _CloudAPI) -> SmartCocoonManager:
+    manager = SmartCocoonManager(api=api)  # type: ignore[arg-type]
+    await manager.async_update_data()
+    api.list_gets = 0
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_batch_skips_no_ops_and_reports_each_fan() -> None:
+    """Fans already at target are not sent anything."""
+    api = _CloudAPI(3)
+    manager = await _manager(api)
+
+    results = await manager.async_set_fans(
+        [
+            ("fan-0", FanMode.ON, 30),
+            ("fan-1", FanMode.OFF, None),
+            ("fan-2", FanMode.AUTO, 150),
+            ("fan-9", FanMode.ON, 50),
+        ]
+    )
+
+    assert results == {
+        "fan-0": True,
+        "fan-1": True,
+        "fan-2": False,
+        "fan-9": False,
+    }
+    assert api.updates == [0]
+    assert manager.fans["fan-0"].speed_pct == 30
+    assert api.list_gets == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_bounds_concurrency() -> None:
+    """No more than max_concurrency updates are in flight together."""
+    api = _CloudAPI(10)
+    manager = await _manager(api)
+
+    results = await manager.async_set_fans(
+        [(f"fan-{i}", FanMode.ON, 40) for i in range(10)], max_concurrency=3
+    )
+
+    assert all(results.values())
+    assert sorted(api.updates) == list(range(10))
+    assert api.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_partial_responses_share_one_refresh() -> None:
+    """Partial responses cost one list fetch, not a fetch per fan."""
+    api = _CloudAPI(5, partial=True)
+    manager = await _manager(api)
+
+    await manager.async_set_fans(
+        [(f"fan-{i}", FanMode.ON, 60) for i in range(5)]
+    )
+
+    assert api.fan_gets == 0
+    assert api.list_gets == 1
+    assert not any(fan.awaiting_refresh for fan in manager.fans.values())
+    assert {fan.speed_pct for fan in manager.fans.values()} == {60}
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Smoke tests for the benchmark suite.
+
+There was no way to measure the refresh and command paths without a real
+account. benchmarks/ runs them against an in-process fake cloud; these tests
+keep it working as the library changes.
+"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.fake_server import FakeServerConfig, FakeSmartCocoonServer
+from benchmarks.run_benchmarks import _async_measure, async_run_benchmarks
+
+
+@pytest.mark.asyncio
+async def test_every_scenario_runs_against_the_fake_cloud() -> None:
+    """Each scenario completes and its requests reach the fake server."""
+    results = await async_run_benchmarks(
+        FakeServerConfig(fans=5), iterations=3, concurrency=2
+    )
+
+    assert [r.name for r in results] == [
+        "update_data",
+        "update_fans",
+        "set_fan_modes",
+    ]
+    for result in results:
+        assert result.operations == 3
+        assert len(result.latencies) == 3
+        # Overlapping identical GETs share one request, so there may be
+        # fewer requests than operations, but never none.
+        assert result.requests > 0
+        assert result.percentile(0.5) <= result.percentile(0.99)
+        assert result.peak_bytes_per_op > 0
+
+
+@pytest.mark.asyncio
+async def test_scenarios_can_be_selected() -> None:
+    """Only the requested scenarios run, here with ETags turned on."""
+    results = await async_run_benchmarks(
+        FakeServerConfig(fans=5, etags=True),
+        iterations=2,
+        scenarios=["update_data"],
+    )
+
+    # Four collections per refresh, whatever the server answered.
+    assert results[0].requests == 8
+
+
+@pytest.mark.asyncio
+async def test_peak_memory_is_that_of_one_operation() -> None:
+    """An operation holding 1 MiB reports about 1 MiB, however many run."""
+
+    async def _hold(_: int) -> object:
+        held = bytearray(1 << 20)
+        await asyncio.sleep(0)
+        return len(held)
+
+    result = await _async_measure(
+        "hold", FakeSmartCocoonServer(), _hold, iterations=20, concurrency=1
+    )
+
+    assert 1 << 20 <= result.peak_bytes_per_op < 1.1 * (1 << 20)
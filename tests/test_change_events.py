@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Tests for reporting what each refresh actually changed.
+
+Refreshes used to rebuild every location, thermostat and room whether or not
+anything had changed, leaving consumers to re-render everything. Entities are
+now updated in place and subscribers receive only the differences.
+"""
+
+import copy
+from typing import Any
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.changes import ChangeKind, ChangeSet
+from pysmartcocoon.const import API_URL, EntityType
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.room import Room
+
+# pylint: disable=protected-access
+
+
+def _fan(fan_id: str, power: int = 3300) -> dict[str, Any]:
+    return fan_payload(
+        id=40 + len(fan_id), fan_id=fan_id, power=power, room_id=7
+    )
+
+
+def _room(room_id: int = 7, temperature: float = 19.5) -> dict[str, Any]:
+    return {
+        "id": room_id,
+        "name": "Office",
+        "desired_temperature": 21.0,
+        "hvac_mode": "heat",
+        "hvac_state": "idle",
+        "is_estimating": False,
+        "predicted_temperature": 20.0,
+        "target_temperature": 21.0,
+        "temperature": temperature,
+        "thermostat_id": 3,
+    }
+
+
+class _CloudAPI:
+    """Serves whatever collections the test has put in responses."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self) -> None:
+        self.responses: dict[str, Any] = {
+            "client_systems": {
+                "client_systems": [{"id": 1, "location": {"postal_code": "A"}}]
+            },
+            "thermostats": {"thermostats": []},
+            "rooms": {"rooms": [_room()]},
+            "fans": {"fans": [_fan("fan-a"), _fan("fan-b")]},
+        }
+
+    async def async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Return a copy, as a real response would be a fresh object."""
+        del method, kwargs
+        return copy.deepcopy(self.responses[url.removeprefix(API_URL)])
+
+
+async def _started() -> tuple[SmartCocoonManager, _CloudAPI, list[ChangeSet]]:
+    api = _CloudAPI()
+    manager = SmartCocoonManager()
+    manager._api = api  # type: ignore[assignment]
+    received: list[ChangeSet] = []
+    manager.subscribe(received.append)
+    await manager.async_update_data()
+    return manager, api, received
+
+
+@pytest.mark.asyncio
+async def test_first_refresh_reports_everything_added() -> None:
+    """Every entity is new the first time."""
+    _, _, received = await _started()
+
+    assert len(received) == 1
+    added = {(c.entity_type, c.identifier) for c in received[0].added}
+    assert added == {
+        (EntityType.LOCATIONS, 1),
+        (EntityType.ROOMS, 7),
+        (EntityType.FANS, "fan-a"),
+        (EntityType.FANS, "fan-b"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_unchanged_refresh_reports_nothing() -> None:
+    """Subscribers are not called when nothing changed."""
+    manager, _, received = await _started()
+
+    change_set = await manager.async_update_data()
+
+    assert not change_set
+    assert len(received) == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_fields_are_reported_and_objects_reused() -> None:
+    """Only the fields that moved are listed, on the same objects."""
+    manager, api, received = await _started()
+    room = manager.rooms[7]
+    fan = manager.fans["fan-a"]
+
+    api.responses["rooms"] = {"rooms": [_room(temperature=22.0)]}
+    api.responses["fans"] = {"fans": [_fan("fan-a", 5000), _fan("fan-b")]}
+    await manager.async_update_data()
+
+    assert manager.rooms[7] is room
+    assert manager.fans["fan-a"] is fan
+    assert [(c.entity_type, c.identifier, c.fields) for c in received[1]] == [
+        (EntityType.ROOMS, 7, {"temperature": (19.5, 22.0)}),
+        (EntityType.FANS, "fan-a", {"power": (3300, 5000)}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_missing_entities_are_removed() -> None:
+    """An entity absent from a successful response is gone."""
+    manager, api, received = await _started()
+
+    api.responses["fans"] = {"fans": [_fan("fan-a")]}
+    await manager.async_update_fans()
+
+    assert "fan-b" not in manager.fans
+    assert [(c.kind, c.identifier) for c in received[1]] == [
+        (ChangeKind.REMOVED, "fan-b")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_fetch_removes_nothing() -> None:
+    """A request that failed says nothing about what exists."""
+    manager, api, _ = await _started()
+
+    api.responses["fans"] = {}
+    await manager.async_update_fans()
+
+    assert set(manager.fans) == {"fan-a", "fan-b"}
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_and_broken_subscribers() -> None:
+    """A failing subscriber does not stop the others or the refresh."""
+    manager, api, received = await _started()
+
+    def _broken(_: ChangeSet) -> None:
+        raise RuntimeError("boom")
+
+    manager.subscribe(_broken)
+    later: list[ChangeSet] = []
+    unsubscribe = manager.subscribe(later.append)
+
+    api.responses["rooms"] = {"rooms": [_room(temperature=25.0)]}
+    await manager.async_update_rooms()
+    unsubscribe()
+    api.responses["rooms"] = {"rooms": [_room(temperature=26.0)]}
+    await manager.async_update_rooms()
+
+    assert len(later) == 1
+    assert len(received) == 3
+    assert manager.rooms[7].temperature == 26.0
+
+
+def test_room_update_is_all_or_nothing() -> None:
+    """A payload missing a field leaves the room untouched."""
+    room = Room(_room())
+    broken = _room(temperature=30.0)
+    del broken["thermostat_id"]
+
+    with pytest.raises(KeyError):
+        room.update(broken)
+    assert room.temperature == 19.5
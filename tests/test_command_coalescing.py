@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Tests for coalescing rapid fan changes into a single update.
+
+Dragging a speed slider in Home Assistant calls async_set_fan_modes many
+times a second. With coalescing on, a burst of changes is sent as one update
+carrying the last value, and every caller gets that update's result.
+"""
+
+import asyncio
+from typing import Any, Optional
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.const import FanMode
+from pysmartcocoon.fan import Fan
+
+FAN_ID = "abc123"
+
+
+def _api_payload(power: int = 3300, mode: str = "always_on") -> dict[str, Any]:
+    """A fan payload shaped like the API's, for seeding state."""
+    return fan_payload(id=42, fan_id=FAN_ID, mode=mode, power=power, room_id=7)
+
+
+class _RecordingAPI:
+    """Records each update and echoes the fan back as the API would."""
+
+    # pylint: disable=unused-argument
+
+    def __init__(
+        self, update_result: Optional[dict[str, Any]] = None, delay: float = 0
+    ) -> None:
+        self.updates: list[tuple[str, int]] = []
+        self._update_result = update_result
+        self._delay = delay
+        self._state = _api_payload()
+
+    async def async_update_fan(
+        self, fan_identifier: int, mode: str, power: int
+    ) -> Optional[dict[str, Any]]:
+        """Record the update; the server state follows it."""
+        self.updates.append((mode, power))
+        await asyncio.sleep(self._delay)
+        self._state = _api_payload(power=power, mode=mode)
+        return self._update_result or self._state
+
+    async def async_get_fan(self, fan_identifier: int) -> dict[str, Any]:
+        """Return the server's current view of the fan."""
+        return self._state
+
+
+async def _seeded_fan(api: Any, coalesce_delay: Optional[float]) -> Fan:
+    fan = Fan(FAN_ID, api, coalesce_delay=coalesce_delay)
+    await fan.async_update_api_data(_api_payload())
+    return fan
+
+
+@pytest.mark.asyncio
+async def test_burst_is_sent_as_one_update_with_last_value() -> None:
+    """Five changes inside the window become one PUT with the last speed."""
+    api = _RecordingAPI()
+    fan = await _seeded_fan(api, coalesce_delay=0.05)
+
+    results = await asyncio.gather(
+        *(
+            fan.async_set_fan_modes(fan_speed_pct=speed)
+            for speed in range(10, 60, 10)
+        )
+    )
+
+    assert api.updates == [("always_on", 5000)]
+    assert results == [True] * 5
+    assert fan.speed_pct == 50
+
+
+@pytest.mark.asyncio
+async def test_every_caller_gets_the_failure() -> None:
+    """A rejected update is reported to every caller that joined it."""
+    api = _RecordingAPI()
+    fan = await _seeded_fan(api, coalesce_delay=0.01)
+
+    async def _rejected(**_: Any) -> None:
+        return None
+
+    api.async_update_fan = _rejected  # type: ignore[assignment]
+
+    results = await asyncio.gather(
+        fan.async_set_fan_modes(fan_speed_pct=20),
+        fan.async_set_fan_modes(fan_speed_pct=30),
+    )
+
+    assert list(results) == [False, False]
+
+
+@pytest.mark.asyncio
+async def test_change_during_inflight_update_is_not_lost() -> None:
+    """A change made while an update is in flight is sent afterwards.
+
+    The refresh after the first update overwrites the local values, so the
+    second window must send the value it was given, not whatever the
+    refresh left behind.
+    """
+    api = _RecordingAPI(delay=0.05)
+    fan = await _seeded_fan(api, coalesce_delay=0.01)
+
+    first = asyncio.create_task(fan.async_set_fan_modes(fan_speed_pct=20))
+    await asyncio.sleep(0.03)  # first update is now in flight
+    second = await fan.async_set_fan_modes(fan_speed_pct=80)
+
+    assert await first is True
+    assert second is True
+    assert api.updates == [("always_on", 2000), ("always_on", 8000)]
+    assert fan.speed_pct == 80
+
+
+@pytest.mark.asyncio
+async def test_mode_and_speed_changes_are_merged() -> None:
+    """A mode change and a speed change in one window are both sent."""
+    api = _RecordingAPI()
+    fan = await _seeded_fan(api, coalesce_delay=0.01)
+
+    await asyncio.gather(
+        fan.async_set_fan_modes(fan_mode=FanMode.ECO),
+        fan.async_set_fan_modes(fan_speed_pct=70),
+    )
+
+    assert api.updates == [("eco", 7000)]
+
+
+@pytest.mark.asyncio
+async def test_without_coalescing_every_change_is_sent() -> None:
+    """The default is unchanged: one update per call."""
+    api = _RecordingAPI()
+    fan = await _seeded_fan(api, coalesce_delay=None)
+
+    await fan.async_set_fan_modes(fan_speed_pct=20)
+    await fan.async_set_fan_modes(fan_speed_pct=30)
+
+    assert api.updates == [("always_on", 2000), ("always_on", 3000)]
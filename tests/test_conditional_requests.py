@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Tests for conditional GETs with ETag and Last-Modified.
+
+Every poll used to download and decode the full collections even when
+nothing had changed. GETs now send the validators from the last response,
+and a 304 hands back the body already decoded, which the manager then skips
+applying, unless a command has since changed a fan.
+"""
+
+from typing import Any
+
+import pytest
+from conftest import FakeResponse, FakeSession, fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_URL, EntityType
+from pysmartcocoon.manager import SmartCocoonManager
+
+# pylint: disable=protected-access
+
+
+class _FakeSession(FakeSession):
+    """Serves one version of every URL, honouring its validators."""
+
+    def __init__(self, last_modified: bool = False) -> None:
+        super().__init__()
+        self.version = 1
+        self.last_modified = last_modified
+        self.sent: list[dict[str, str]] = []
+
+    def _validators(self) -> dict[str, str]:
+        if self.last_modified:
+            return {"Last-Modified": f"Mon, 0{self.version} Jun 2026"}
+        return {"ETag": f'"v{self.version}"'}
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Answer 304 when the caller already has this version.
+
+        A PUT is rejected with an empty body, as the cloud sometimes does.
+        """
+        if method == "PUT":
+            return FakeResponse()
+        headers = kwargs["headers"]
+        self.sent.append(headers)
+        validators = self._validators()
+        not_modified = any(
+            headers.get(sent) == validators[header]
+            for sent, header in (
+                ("If-None-Match", "ETag"),
+                ("If-Modified-Since", "Last-Modified"),
+            )
+            if header in validators
+        )
+        key = url.removeprefix(API_URL)
+        fans = [fan_payload(power=1000 * self.version)]
+        return FakeResponse(
+            {key: fans if key == "fans" else []},
+            304 if not_modified else 200,
+            validators,
+        )
+
+
+def _api(session: _FakeSession, **kwargs: Any) -> SmartCocoonAPI:
+    return SmartCocoonAPI(session, **kwargs)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("last_modified", [False, True])
+@pytest.mark.asyncio
+async def test_not_modified_returns_the_same_body(
+    last_modified: bool,
+) -> None:
+    """A 304 is answered with the earlier body, without decoding."""
+    session = _FakeSession(last_modified)
+    api = _api(session)
+    url = f"{API_URL}fans"
+
+    first = await api.async_request("GET", url)
+    assert not api.is_unchanged(url, first)
+    second = await api.async_request("GET", url)
+
+    assert second is first
+    assert api.is_unchanged(url, second)
+    assert [r.status for r in session.responses] == [200, 304]
+    assert not session.responses[1].decoded
+    header = "If-Modified-Since" if last_modified else "If-None-Match"
+    assert header not in session.sent[0]
+    assert header in session.sent[1]
+
+
+@pytest.mark.asyncio
+async def test_modified_body_replaces_validators() -> None:
+    """A new version is decoded and its validators used from then on."""
+    session = _FakeSession()
+    api = _api(session)
+    url = f"{API_URL}fans"
+
+    first = await api.async_request("GET", url)
+    session.version = 2
+    second = await api.async_request("GET", url)
+    assert not api.is_unchanged(url, second)
+    third = await api.async_request("GET", url)
+
+    assert second is not first and not api.is_unchanged(url, first)
+    assert third is second and api.is_unchanged(url, third)
+    assert session.sent[2]["If-None-Match"] == '"v2"'
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests_can_be_turned_off() -> None:
+    """With conditional_requests=False no validators are sent."""
+    session = _FakeSession()
+    api = _api(session, conditional_requests=False)
+
+    for _ in range(2):
+        await api.async_request("GET", f"{API_URL}fans")
+
+    assert "If-None-Match" not in session.sent[1]
+    assert [r.status for r in session.responses] == [200, 200]
+
+
+@pytest.mark.asyncio
+async def test_manager_skips_applying_unchanged_collections() -> None:
+    """An unchanged collection is not re-applied, a changed one is."""
+    session = _FakeSession()
+    manager = SmartCocoonManager(api=_api(session))
+    await manager.async_update_data()
+    fan = manager.fans["fan-a"]
+
+    applied: list[tuple[EntityType, Any]] = []
+    apply = manager._apply
+
+    def _record(entity_type: EntityType, items: Any) -> Any:
+        applied.append((entity_type, items))
+        return apply(entity_type, items)
+
+    manager._apply = _record  # type: ignore[method-assign]
+    assert not await manager.async_update_data()
+    assert [(t, items is None) for t, items in applied] == [
+        (EntityType.LOCATIONS, True),
+        (EntityType.THERMOSTATS, True),
+        (EntityType.ROOMS, True),
+        (EntityType.FANS, True),
+    ]
+
+    session.version = 2
+    changes = await manager.async_update_data()
+    assert [c.fields for c in changes] == [{"power": (1000, 2000)}]
+    assert manager.fans["fan-a"] is fan
+
+
+@pytest.mark.asyncio
+async def test_rejected_command_is_undone_by_a_not_modified_refresh() -> None:
+    """A fan keeps no change the cloud refused, even when nothing changed."""
+    session = _FakeSession()
+    manager = SmartCocoonManager(api=_api(session))
+    await manager.async_update_data()
+
+    assert not await manager.async_set_fan_speed("fan-a", 80)
+    assert manager.fans["fan-a"].power == 8000
+
+    await manager.async_update_data()
+    assert {r.status for r in session.responses[-4:]} == {304}
+    assert manager.fans["fan-a"].power == 1000
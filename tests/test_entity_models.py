@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Tests for the slotted entity models.
+
+Fans, rooms, thermostats and locations each carried a per-instance __dict__,
+which adds up across tens of thousands of fans in one process. They now use
+__slots__, and compare equal when their data is equal.
+"""
+
+from typing import Any
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.fan import Fan
+from pysmartcocoon.location import Location
+from pysmartcocoon.room import Room
+from pysmartcocoon.thermostat import Thermostat
+
+
+def _fan_payload(power: int = 3300) -> dict[str, Any]:
+    return fan_payload(power=power, room_id=7)
+
+
+def _fan(power: int = 3300, api: Any = None) -> Fan:
+    fan = Fan("fan-a", api)
+    assert fan.update_api_data(_fan_payload(power))
+    return fan
+
+
+def _room(temperature: float = 19.5) -> Room:
+    return Room(
+        {
+            "id": 7,
+            "name": "Office",
+            "desired_temperature": 21.0,
+            "hvac_mode": "heat",
+            "hvac_state": "idle",
+            "is_estimating": False,
+            "predicted_temperature": 20.0,
+            "target_temperature": 21.0,
+            "temperature": temperature,
+            "thermostat_id": 3,
+        }
+    )
+
+
+def _thermostat(temperature: float = 20.0) -> Thermostat:
+    return Thermostat(
+        {
+            "id": 3,
+            "name": "Hall",
+            "thermostat_id": 3,
+            "token": "t",
+            "hvac_mode": "heat",
+            "hvac_state": "idle",
+            "temperature": temperature,
+            "target_temperature": 21.0,
+            "vendor": "ecobee",
+        }
+    )
+
+
+def _location(postal_code: str = "A1A") -> Location:
+    return Location({"id": 1, "location": {"postal_code": postal_code}})
+
+
+@pytest.mark.parametrize(
+    "factory", [_fan, _room, _thermostat, _location], ids=lambda f: f.__name__
+)
+def test_entities_have_no_instance_dict(factory: Any) -> None:
+    """Attributes live in slots, so no __dict__ is allocated."""
+    entity = factory()
+    assert not hasattr(entity, "__dict__")
+    with pytest.raises(AttributeError):
+        entity.unexpected = 1
+
+
+@pytest.mark.parametrize(
+    ("factory", "changed"),
+    [
+        (_fan, 5000),
+        (_room, 22.0),
+        (_thermostat, 18.0),
+        (_location, "B2B"),
+    ],
+    ids=["fan", "room", "thermostat", "location"],
+)
+def test_equality_follows_data(factory: Any, changed: Any) -> None:
+    """Equal data compares equal and hashes alike; changed data does not."""
+    first, second = factory(), factory()
+    assert first is not second
+    assert first == second
+    assert hash(first) == hash(second)
+    assert first != factory(changed)
+
+
+def test_fan_equality_ignores_its_api() -> None:
+    """Two fans with the same data are equal whatever they talk through."""
+    assert _fan(api=object()) == _fan(api=object())
+    assert _fan() != "fan-a"
+
+
+def test_fan_properties_and_pushed_state_still_work() -> None:
+    """The property API and partial updates are unchanged by slots."""
+    fan = _fan()
+    assert fan.apply_state({"mode": "always_off", "power": 0}) == {
+        "mode": ("auto", "always_off"),
+        "fan_on": (True, False),
+        "power": (3300, 0),
+    }
+    assert (fan.mode, fan.fan_on, fan.speed_pct) == ("always_off", False, 0)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Tests for the per-fan history.
+
+A Fan only held its latest state. With a FanHistory the manager now records
+each fan's mode, power, connection and predicted room temperature whenever
+they change, keeps recent changes as they happened and averages older ones
+into buckets, within a fixed amount of memory per fan.
+"""
+
+from typing import Any
+
+import pytest
+from conftest import FakeSession, fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.fan import Fan
+from pysmartcocoon.history import FanHistory
+from pysmartcocoon.manager import SmartCocoonManager
+
+
+def _payload(**overrides: Any) -> dict[str, Any]:
+    return fan_payload(predicted_room_temperature=20.5, **overrides)
+
+
+def _fan(power: int) -> Fan:
+    fan = Fan("fan-a", None)  # type: ignore[arg-type]
+    assert fan.update_api_data(_payload(power=power))
+    return fan
+
+
+def test_old_changes_are_averaged_into_buckets() -> None:
+    """Changes that age out are folded into the bucket they fall in."""
+    history = FanHistory(points=3, buckets=2, bucket_seconds=60)
+    for timestamp, power in [
+        (0, 1000),
+        (10, 2000),
+        (20, 3000),
+        (70, 4000),
+        (80, 5000),
+        (130, 6000),
+        (140, 7000),
+    ]:
+        history.record(_fan(power), timestamp)
+
+    points = history.points("fan-a")
+    assert [(p.timestamp, p.power, p.samples) for p in points] == [
+        (0, 2000, 3),
+        (60, 4000, 1),
+        (80, 5000, 1),
+        (130, 6000, 1),
+        (140, 7000, 1),
+    ]
+    assert points[0].mode == "auto" and points[0].connected == 1.0
+    assert points[0].predicted_room_temperature == 20.5
+    assert [p.timestamp for p in history.points("fan-a", since=80)] == [
+        80,
+        130,
+        140,
+    ]
+
+
+def test_memory_per_fan_is_capped() -> None:
+    """However many changes arrive, only the configured records are kept."""
+    history = FanHistory(points=4, buckets=3, bucket_seconds=10)
+    fan = _fan(3300)
+    for timestamp in range(10_000):
+        history.record(fan, float(timestamp))
+
+    points = history.points("fan-a")
+    # Three closed buckets, the open one and four recent changes.
+    assert len(points) == 8
+    assert history.max_bytes_per_fan == 7 * 25
+    assert points[-1].timestamp == 9_999
+
+    history.forget("fan-a")
+    assert "fan-a" not in history and not history.points("fan-a")
+
+    with pytest.raises(ValueError):
+        FanHistory(points=0)
+
+
+@pytest.mark.asyncio
+async def test_manager_records_changes() -> None:
+    """Changes to tracked fields are recorded; others are not."""
+    session = FakeSession(fans=[_payload()])
+    manager = SmartCocoonManager(
+        api=SmartCocoonAPI(session),  # type: ignore[arg-type]
+        fan_history=FanHistory(),
+    )
+
+    await manager.async_update_fans()
+    session.collections["fans"] = [_payload(power=6600)]
+    await manager.async_update_fans()
+    session.collections["fans"] = [
+        _payload(power=6600, firmware_version="1.0.1")
+    ]
+    await manager.async_update_fans()
+
+    assert [p.power for p in manager.fan_history("fan-a")] == [3300, 6600]
+
+    session.collections["fans"] = []
+    await manager.async_update_fans()
+    assert not manager.fan_history("fan-a")
+    assert not SmartCocoonManager().fan_history("fan-a")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Tests for applying fan payloads in one pass.
+
+Every fan on every poll had its required fields checked one by one, its
+fields copied one at a time, its last connection parsed and the time since
+then worked out, even when nothing had changed. The fields are now read in
+one call, and a payload identical to the last one only has its connection
+checked against a deadline worked out when it was first applied.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon import fan as fan_module
+from pysmartcocoon.fan import Fan
+
+
+def _payload(power: int = 3300, minutes_ago: float = 10) -> dict[str, Any]:
+    seen = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return fan_payload(
+        last_connection=seen.isoformat().replace("+00:00", "Z"),
+        power=power,
+        predicted_room_temperature=-1.0,
+        room_id=7,
+    )
+
+
+@pytest.fixture(name="applied")
+def fixture_applied(monkeypatch: pytest.MonkeyPatch) -> list[Any]:
+    """Record every payload that is actually applied."""
+    seen: list[Any] = []
+    original = Fan._apply_fingerprint  # pylint: disable=protected-access
+
+    def _counting(fan: Fan, fingerprint: tuple[Any, ...]) -> None:
+        seen.append(fingerprint)
+        original(fan, fingerprint)
+
+    monkeypatch.setattr(Fan, "_apply_fingerprint", _counting)
+    return seen
+
+
+def test_identical_payloads_are_not_applied_again(applied: list[Any]) -> None:
+    """Only payloads that differ are applied, and report their changes."""
+    fan = Fan("fan-a", None)  # type: ignore[arg-type]
+    payload = _payload()
+
+    assert fan.apply_api_data(payload)
+    assert fan.apply_api_data(dict(payload)) == {}
+    assert len(applied) == 1
+
+    # Python hashes -1 and -2 alike; the fields are compared, not hashed.
+    payload["predicted_room_temperature"] = -2.0
+    assert fan.apply_api_data(payload) == {
+        "predicted_room_temperature": (-1.0, -2.0)
+    }
+    assert len(applied) == 2 and fan.connected is True
+
+
+def test_unchanged_fan_still_goes_stale(
+    monkeypatch: pytest.MonkeyPatch, applied: list[Any]
+) -> None:
+    """A repeated payload is marked disconnected once its deadline passes."""
+    fan = Fan("fan-a", None)  # type: ignore[arg-type]
+    payload = _payload(minutes_ago=10)
+    fan.update_api_data(payload)
+    assert fan.connected is True
+
+    later = time.time() + 6 * 60
+    monkeypatch.setattr(fan_module.time, "time", lambda: later)
+
+    assert fan.apply_api_data(payload) == {"connected": (True, False)}
+    assert fan.apply_api_data(payload) == {}
+    assert fan.connected is False and len(applied) == 1
+
+
+def test_old_last_connection_is_disconnected() -> None:
+    """A fan last seen over 15 minutes ago is disconnected at once."""
+    fan = Fan("fan-a", None)  # type: ignore[arg-type]
+    assert fan.update_api_data(_payload(minutes_ago=20))
+    assert fan.connected is False
+
+
+def test_local_changes_are_overwritten_by_the_same_payload() -> None:
+    """A fan changed locally applies the payload it last saw again."""
+    fan = Fan("fan-a", None)  # type: ignore[arg-type]
+    payload = _payload(power=3300)
+    fan.update_api_data(payload)
+
+    fan.set_speed_pct(80)
+    assert fan.apply_api_data(payload) == {"power": (8000, 3300)}
+    assert fan.speed_pct == 33
+
+
+def test_incomplete_payloads_change_nothing() -> None:
+    """A payload missing a field is refused and the fan is untouched."""
+    fan = Fan("fan-a", None)  # type: ignore[arg-type]
+    fan.update_api_data(_payload(power=3300))
+
+    broken = _payload(power=9000)
+    del broken["mqtt_password"]
+    assert fan.apply_api_data(broken) is None
+    assert fan.power == 3300
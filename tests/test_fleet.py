@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Tests for running many accounts through SmartCocoonFleet.
+
+The point of the fleet is that accounts share one connection pool instead
+of each opening its own, and that refreshes run concurrently but bounded.
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import ClientSession
+
+from pysmartcocoon.fleet import SmartCocoonFleet
+
+# pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_accounts_share_one_session() -> None:
+    """Every account's API uses the fleet's session, not its own."""
+    async with SmartCocoonFleet() as fleet:
+        first = await fleet.async_add_account("a", "a@example.com", "pw")
+        second = await fleet.async_add_account("b", "b@example.com", "pw")
+
+        session = first._api._ensure_session()
+        assert second._api._ensure_session() is session
+        assert session is fleet._ensure_session()
+
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_caller_supplied_session_is_not_closed() -> None:
+    """As with SmartCocoonAPI, a session passed in is left open."""
+    session = ClientSession()
+    try:
+        async with SmartCocoonFleet(session=session) as fleet:
+            manager = await fleet.async_add_account("a", "a@x.com", "pw")
+            assert manager._api._ensure_session() is session
+        assert not session.closed
+    finally:
+        await session.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_concurrency_is_bounded() -> None:
+    """No more than max_concurrency accounts refresh at once."""
+    active = 0
+    peak = 0
+
+    async def _slow_update() -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    async with SmartCocoonFleet(max_concurrency=3) as fleet:
+        for index in range(10):
+            manager = await fleet.async_add_account(str(index), "u", "p")
+            manager.async_update_data = _slow_update  # type: ignore
+
+        stats = await fleet.async_update_data()
+
+    assert peak == 3
+    assert len(stats.latencies) == 10
+    assert not stats.failures
+    assert stats.max_latency >= stats.mean_latency > 0
+    assert stats.wall_time >= stats.max_latency
+    assert fleet.last_refresh is stats
+
+
+@pytest.mark.asyncio
+async def test_one_failing_account_does_not_stop_the_others() -> None:
+    """A refresh that raises is reported, and the rest still complete."""
+    refreshed: list[str] = []
+
+    def _update_for(account_id: str):  # type: ignore[no-untyped-def]
+        async def _update() -> None:
+            if account_id == "bad":
+                raise RuntimeError("boom")
+            refreshed.append(account_id)
+
+        return _update
+
+    async with SmartCocoonFleet() as fleet:
+        for account_id in ("good-1", "bad", "good-2"):
+            manager = await fleet.async_add_account(account_id, "u", "p")
+            manager.async_update_data = _update_for(account_id)  # type: ignore
+
+        stats = await fleet.async_update_data()
+
+    assert stats.failures == ("bad",)
+    assert sorted(refreshed) == ["good-1", "good-2"]
+
+
+@pytest.mark.asyncio
+async def test_start_services_reports_each_account() -> None:
+    """Each account's start result is returned under its id."""
+
+    async def _start(username: str, password: str) -> bool:
+        del password
+        return username == "ok"
+
+    async with SmartCocoonFleet() as fleet:
+        for account_id, username in (("one", "ok"), ("two", "nope")):
+            manager = await fleet.async_add_account(account_id, username, "p")
+            manager.async_start_services = _start  # type: ignore
+
+        assert await fleet.async_start_services() == {
+            "one": True,
+            "two": False,
+        }
+
+
+@pytest.mark.asyncio
+async def test_removed_and_closed_accounts_stop_refreshing() -> None:
+    """Removing an account, or closing the fleet, stops its token refresh."""
+    auth = {
+        "access-token": "t",
+        "client": "c",
+        "uid": "u",
+        "expiry": time.time() + 3600,
+    }
+    refreshes: list[asyncio.Task[None]] = []
+    async with SmartCocoonFleet() as fleet:
+        for account_id in ("a", "b"):
+            manager = await fleet.async_add_account(account_id, "u", "p")
+            assert manager._api.restore_auth(auth, "u", "p")
+            assert manager._api._refresh_task is not None
+            refreshes.append(manager._api._refresh_task)
+
+        await fleet.async_remove_account("a")
+        assert list(fleet.managers) == ["b"]
+        await asyncio.sleep(0)
+        assert refreshes[0].cancelled() and not refreshes[1].done()
+
+    await asyncio.sleep(0)
+    assert refreshes[1].cancelled() and not fleet.managers
+
+
+def test_invalid_concurrency_is_rejected() -> None:
+    """A concurrency below one would never run anything."""
+    with pytest.raises(ValueError):
+        SmartCocoonFleet(max_concurrency=0)
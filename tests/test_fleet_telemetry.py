@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Tests for the columnar fleet telemetry store.
+
+Trending the fleet meant walking manager.fans and reading every fan's
+properties. FleetTelemetry keeps power, fan_on, connected and predicted room
+temperature in one array per field, follows the manager's change events, and
+answers fleet-wide aggregates from the arrays.
+"""
+
+import math
+from typing import Any
+
+import pytest
+from conftest import FakeSession, fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.changes import ChangeKind, ChangeSet, EntityChange
+from pysmartcocoon.const import EntityType
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.telemetry import FleetTelemetry
+
+
+def _added(fan_id: str, **fields: Any) -> EntityChange:
+    state = {
+        "power": 3300,
+        "fan_on": True,
+        "connected": True,
+        "predicted_room_temperature": 20.0,
+        "room_id": 7,
+        **fields,
+    }
+    return EntityChange(
+        EntityType.FANS,
+        fan_id,
+        ChangeKind.ADDED,
+        {name: (None, value) for name, value in state.items()},
+    )
+
+
+def _changes(*changes: EntityChange) -> ChangeSet:
+    return ChangeSet(changes)
+
+
+def test_aggregates_follow_changes() -> None:
+    """Adds, changes and removals keep every column and room in step."""
+    telemetry = FleetTelemetry()
+    telemetry.apply(
+        _changes(
+            _added("a", power=2000),
+            _added("b", power=4000, connected=False, room_id=8),
+            _added("c", power=6000, fan_on=False, room_id=None),
+        )
+    )
+
+    assert telemetry.fan_ids == ("a", "b", "c")
+    assert telemetry.fraction_connected() == pytest.approx(2 / 3)
+    assert telemetry.fraction_on() == pytest.approx(2 / 3)
+    assert telemetry.mean_power() == 4000
+    assert telemetry.mean_power_by_room() == {7: 2000, 8: 4000, None: 6000}
+
+    telemetry.apply(
+        _changes(
+            EntityChange(EntityType.FANS, "a", ChangeKind.REMOVED),
+            EntityChange(
+                EntityType.FANS,
+                "c",
+                ChangeKind.CHANGED,
+                {
+                    "room_id": (None, 8),
+                    "predicted_room_temperature": (20, None),
+                },
+            ),
+        )
+    )
+
+    # The last row moved into the removed one, keeping the columns dense.
+    assert list(telemetry.fan_ids) == ["c", "b"] and "a" not in telemetry
+    assert list(telemetry.column("power")) == [6000, 4000]
+    assert telemetry.mean_power_by_room() == {8: 5000}
+    assert telemetry.fraction_connected_by_room() == {8: 0.5}
+    assert telemetry.mean_predicted_room_temperature() == 20.0
+
+
+def test_history_is_a_fixed_ring() -> None:
+    """Only the newest samples are kept, oldest first."""
+    telemetry = FleetTelemetry(history=2)
+    for power in (1000, 2000, 3000):
+        telemetry.apply(
+            _changes(
+                EntityChange(
+                    EntityType.FANS,
+                    "a",
+                    ChangeKind.CHANGED,
+                    {"power": (None, power)},
+                )
+            )
+        )
+
+    history = telemetry.history()
+    assert [sample.mean_power for sample in history] == [2000, 3000]
+    assert history[0].timestamp <= history[1].timestamp
+    recent = telemetry.history(since=history[1].timestamp)
+    assert recent[-1].mean_power == 3000
+    assert math.isnan(history[0].mean_predicted_room_temperature)
+
+    with pytest.raises(ValueError):
+        FleetTelemetry(history=0)
+
+
+def _fans(powers: dict[str, int]) -> list[dict[str, Any]]:
+    return [
+        fan_payload(id=index, fan_id=fan_id, power=power)
+        for index, (fan_id, power) in enumerate(powers.items())
+    ]
+
+
+@pytest.mark.asyncio
+async def test_attached_store_follows_the_manager() -> None:
+    """Fans loaded before attaching and changed after are both tracked."""
+    session = FakeSession(fans=_fans({"a": 3300, "b": 6600}))
+    manager = SmartCocoonManager(
+        api=SmartCocoonAPI(session)  # type: ignore[arg-type]
+    )
+    await manager.async_update_fans()
+
+    telemetry = FleetTelemetry()
+    detach = telemetry.attach(manager)
+    assert telemetry.mean_power() == 4950
+
+    session.collections["fans"] = _fans({"b": 1000})
+    await manager.async_update_fans()
+    assert telemetry.fan_ids == ("b",) and telemetry.mean_power() == 1000
+    assert [s.fans for s in telemetry.history()] == [2, 1]
+
+    detach()
+    session.collections["fans"] = _fans({"b": 2000})
+    await manager.async_update_fans()
+    assert telemetry.mean_power() == 1000
+
+
+def test_unusable_values_leave_the_totals_alone() -> None:
+    """A value a column cannot hold raises without corrupting anything."""
+    telemetry = FleetTelemetry()
+    telemetry.apply(_changes(_added("a", power=2000)))
+
+    for change in (
+        EntityChange(
+            EntityType.FANS,
+            "a",
+            ChangeKind.CHANGED,
+            {
+                "connected": (True, False),
+                "predicted_room_temperature": (20.0, "warm"),
+            },
+        ),
+        _added("b", room_id=8, power="fast"),
+    ):
+        with pytest.raises(TypeError):
+            telemetry.apply(_changes(change))
+
+    assert telemetry.fan_ids == ("a",)
+    assert telemetry.mean_power() == 2000
+    assert telemetry.fraction_connected() == 1.0
+    assert telemetry.mean_predicted_room_temperature() == 20.0
+    assert telemetry.mean_power_by_room() == {7: 2000}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Tests for choosing the JSON codec.
+
+Every response and snapshot went through the standard library's json. A
+faster codec, orjson or msgspec, can now be given to SmartCocoonAPI, and is
+used for response bodies and the manager's snapshots.
+"""
+
+import sys
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Union
+
+import pytest
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.codec import (
+    STDLIB_CODEC,
+    JsonCodec,
+    best_available_codec,
+    msgspec_codec,
+    orjson_codec,
+)
+from pysmartcocoon.const import API_FANS_URL
+from pysmartcocoon.errors import SmartCocoonError
+from pysmartcocoon.snapshot import decode_snapshot, encode_snapshot
+
+DOCUMENT = {"fans": [{"id": 1, "name": "Salle à manger", "power": 33.5}]}
+
+
+def _codecs() -> list[JsonCodec]:
+    codecs = [STDLIB_CODEC]
+    for factory in (orjson_codec, msgspec_codec):
+        try:
+            codecs.append(factory())
+        except SmartCocoonError:
+            pass
+    return codecs
+
+
+@pytest.mark.parametrize("codec", _codecs(), ids=lambda codec: codec.name)
+def test_codecs_agree(codec: JsonCodec) -> None:
+    """Each codec reads the others' output and refuses broken JSON."""
+    for other in _codecs():
+        assert codec.loads(other.dumps(DOCUMENT)) == DOCUMENT
+    assert codec.loads(codec.dumps(DOCUMENT).decode()) == DOCUMENT
+    with pytest.raises(ValueError):
+        codec.loads(b'{"fans": [')
+
+
+def test_missing_libraries_fall_back(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Asking for a missing library fails; the best available is json."""
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    monkeypatch.setitem(sys.modules, "msgspec", None)
+
+    with pytest.raises(SmartCocoonError, match="orjson"):
+        orjson_codec()
+    with pytest.raises(SmartCocoonError, match="msgspec"):
+        msgspec_codec()
+    assert best_available_codec() is STDLIB_CODEC
+
+
+class _EncodedResponse(FakeResponse):
+    """A response that decodes its body with whatever loads it is given."""
+
+    async def json(self, **kwargs: Any) -> Any:
+        """Decode the body as aiohttp does."""
+        return kwargs["loads"]('{"fan_id": "a"}')
+
+
+class _FakeSession(FakeSession):
+    """Answers every request with the same response."""
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Return the response."""
+        del method, url, kwargs
+        return _EncodedResponse()
+
+
+@pytest.mark.asyncio
+async def test_responses_are_decoded_with_the_codec() -> None:
+    """The API hands its codec's loads to aiohttp."""
+    decoded: list[Union[str, bytes]] = []
+
+    def _loads(raw: Union[str, bytes]) -> Any:
+        decoded.append(raw)
+        return STDLIB_CODEC.loads(raw)
+
+    codec = replace(STDLIB_CODEC, name="counting", loads=_loads)
+    api = SmartCocoonAPI(_FakeSession(), codec=codec)  # type: ignore[arg-type]
+
+    assert await api.async_request("GET", f"{API_FANS_URL}1") == {
+        "fan_id": "a"
+    }
+    assert api.codec is codec and len(decoded) == 1
+    assert SmartCocoonAPI().codec is STDLIB_CODEC
+
+
+@pytest.mark.parametrize("codec", _codecs(), ids=lambda codec: codec.name)
+def test_snapshots_round_trip(codec: JsonCodec, tmp_path: Path) -> None:
+    """Snapshots written with any codec can be read with json."""
+    raw = encode_snapshot(DOCUMENT, codec)
+    path = tmp_path / "snapshot.json"
+    path.write_bytes(raw)
+
+    assert decode_snapshot(path.read_bytes()) == decode_snapshot(raw, codec)
+    assert decode_snapshot(b"not json", codec) is None
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Tests for deferred, sampled DEBUG logging of requests.
+
+With DEBUG on, every request redacted and serialised its headers and bodies
+up front, whether or not any handler wrote them. Redaction and formatting
+now happen only when a record is emitted, and bodies can be sampled and cut
+to a maximum length.
+"""
+
+import logging
+from typing import Any
+
+import pytest
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon import redact as redact_module
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_FANS_URL
+from pysmartcocoon.redact import REDACTED, RedactedLog
+
+SECRET = "hunter2-correct-horse"
+
+
+class _Collector(logging.Handler):
+    """Keep the messages of emitted records."""
+
+    def __init__(self, level: int) -> None:
+        super().__init__(level)
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture(name="redactions")
+def fixture_redactions(monkeypatch: pytest.MonkeyPatch) -> list[Any]:
+    """Record every value passed to redact."""
+    seen: list[Any] = []
+    original = redact_module.redact
+
+    def _counting(obj: Any) -> Any:
+        seen.append(obj)
+        return original(obj)
+
+    monkeypatch.setattr(redact_module, "redact", _counting)
+    return seen
+
+
+def test_nothing_is_formatted_unless_emitted(redactions: list[Any]) -> None:
+    """A handler that drops DEBUG costs no redaction; two cost one."""
+    logger = logging.getLogger("pysmartcocoon.tests.lazy")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    quiet = _Collector(logging.INFO)
+    logger.addHandler(quiet)
+    try:
+        logger.debug("%s", RedactedLog({"password": SECRET}))
+        assert not redactions and not quiet.messages
+
+        loud, louder = _Collector(logging.DEBUG), _Collector(logging.DEBUG)
+        logger.addHandler(loud)
+        logger.addHandler(louder)
+        logger.debug("%s", RedactedLog({"password": SECRET}))
+    finally:
+        logger.handlers.clear()
+
+    assert len(redactions) == 1
+    assert loud.messages == louder.messages
+    assert SECRET not in loud.messages[0] and REDACTED in loud.messages[0]
+
+
+def test_long_values_are_cut_after_redaction() -> None:
+    """The cap applies to the redacted text and says what was dropped."""
+    rendered = str(
+        RedactedLog({"password": SECRET, "fans": list(range(50))}, True, 40)
+    )
+    assert rendered.startswith('{\n  "password": "**REDACTED**"')
+    assert rendered.endswith("more characters)")
+    assert len(rendered) < 80
+    assert str(RedactedLog({"a": 1}, as_json=False)) == "{'a': 1}"
+
+
+class _FakeSession(FakeSession):
+    """Answers every request with the same response, carrying a secret."""
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Return a body with a secret in it."""
+        del method, url, kwargs
+        return FakeResponse(
+            {"mqtt_password": SECRET, "fan_id": "a"},
+            headers={"access-token": SECRET},
+        )
+
+
+@pytest.mark.asyncio
+async def test_bodies_are_sampled(caplog: pytest.LogCaptureFixture) -> None:
+    """With log_bodies_every=2 the first and third requests' bodies show."""
+    caplog.set_level(logging.DEBUG, logger="pysmartcocoon")
+    api = SmartCocoonAPI(
+        _FakeSession(),  # type: ignore[arg-type]
+        conditional_requests=False,
+        deduplicate_requests=False,
+        log_bodies_every=2,
+    )
+
+    for identifier in range(3):
+        await api.async_update_fan(identifier, "auto", 3300)
+
+    bodies = [
+        message
+        for message in caplog.messages
+        if message.startswith(("│ Request body", "│ Response body"))
+    ]
+    assert [body.split(":")[0] for body in bodies] == [
+        "│ Request body (JSON)",
+        "│ Response body",
+        "│ Request body",
+        "│ Response body",
+        "│ Request body (JSON)",
+        "│ Response body",
+    ]
+    assert "not sampled (1 in 2 logged)" in bodies[2]
+    assert '"fan_id": "a"' in bodies[1]
+    assert SECRET not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_bodies_are_cut_to_the_maximum_length(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """log_body_max_length bounds each body written to the log."""
+    caplog.set_level(logging.DEBUG, logger="pysmartcocoon")
+    api = SmartCocoonAPI(
+        _FakeSession(),  # type: ignore[arg-type]
+        log_body_max_length=10,
+    )
+
+    await api.async_request("GET", f"{API_FANS_URL}1")
+
+    body = next(m for m in caplog.messages if m.startswith("│ Response body"))
+    assert body.endswith("more characters)")
+    assert "fan_id" not in body
+
+
+def test_sampling_must_log_something() -> None:
+    """log_bodies_every below one would never log a body."""
+    with pytest.raises(ValueError):
+        SmartCocoonAPI(log_bodies_every=0)
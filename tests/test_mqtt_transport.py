@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""Tests for controlling fans over MQTT.
+
+Fans report MQTT credentials, but every command used to go through the cloud
+REST API and state was only learned by polling. With a transport enabled,
+commands are published over MQTT, pushed state updates the fan, and the REST
+API is only used when MQTT is unavailable.
+"""
+
+import asyncio
+import copy
+import json
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
+from typing import Any, Optional
+
+import pytest
+from conftest import FakeSession, fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.cache import ResponseCache
+from pysmartcocoon.changes import ChangeKind, ChangeSet
+from pysmartcocoon.const import API_FANS_URL, API_URL, EntityType
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.mqtt import (
+    DisconnectHandler,
+    MessageHandler,
+    MqttFanTransport,
+    _AiomqttClient,
+)
+
+# pylint: disable=protected-access
+
+
+def _fan(
+    fan_id: str, username: Optional[str] = "user", mode: str = "auto"
+) -> dict[str, Any]:
+    return fan_payload(
+        id=40 + len(fan_id),
+        fan_id=fan_id,
+        mode=mode,
+        mqtt_username=username,
+        mqtt_password="secret" if username else None,
+    )
+
+
+class _CloudAPI:
+    """Serves the fan list and records every other request."""
+
+    def __init__(self, fans: list[dict[str, Any]]) -> None:
+        self.fans = fans
+        self.writes: list[tuple[str, str, Any]] = []
+
+    async def async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> Optional[dict[str, Any]]:
+        """Answer GETs from the fan list; accept every write."""
+        if method == "GET":
+            key = url.removeprefix(API_URL)
+            if key == "fans":
+                return {"fans": copy.deepcopy(self.fans)}
+            return {key: []}
+        self.writes.append((method, url, kwargs.get("json")))
+        return {}
+
+    async def async_update_fan(
+        self, fan_identifier: int, mode: str, power: int
+    ) -> Optional[dict[str, Any]]:
+        """Send the PUT through async_request, as the real API does."""
+        return await self.async_request(
+            "PUT",
+            f"{API_FANS_URL}{fan_identifier}",
+            json={"mode": mode, "power": power},
+        )
+
+    async def async_get_fan(self, fan_identifier: int) -> dict[str, Any]:
+        """Return the listed fan with this identifier."""
+        return next(
+            copy.deepcopy(fan)
+            for fan in self.fans
+            if fan["id"] == fan_identifier
+        )
+
+
+class _Broker:
+    """An in-memory stand-in for the SmartCocoon MQTT broker."""
+
+    def __init__(self, fail_publish: bool = False, echo: bool = True) -> None:
+        self.fail_publish = fail_publish
+        # Whether fans report the state each command asks for, as they do
+        # when the command reached them.
+        self.echo = echo
+        self.published: list[tuple[str, dict[str, Any]]] = []
+        self.handlers: dict[str, MessageHandler] = {}
+        self.connections: list[str] = []
+        self.disconnected = 0
+
+    async def connect(
+        self,
+        username: str,
+        password: str,
+        on_message: MessageHandler,
+        on_disconnect: DisconnectHandler,
+    ) -> "_Client":
+        """Act as the transport's client factory."""
+        del on_disconnect
+        assert password == "secret"
+        self.connections.append(username)
+        return _Client(self, on_message)
+
+    def push(self, topic: str, data: Any) -> None:
+        """Deliver a message to whoever subscribed to topic."""
+        self.handlers[topic](topic, json.dumps(data).encode())
+
+
+class _Client:
+    def __init__(self, broker: _Broker, on_message: MessageHandler) -> None:
+        self._broker = broker
+        self._on_message = on_message
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Record the command, or fail like a dropped connection."""
+        if self._broker.fail_publish:
+            raise ConnectionError("broker went away")
+        self._broker.published.append((topic, json.loads(payload)))
+        if self._broker.echo:
+            self._broker.push(
+                topic.replace("/command", "/state"), json.loads(payload)
+            )
+
+    async def subscribe(self, topic: str) -> None:
+        """Route the topic's messages to this client."""
+        self._broker.handlers[topic] = self._on_message
+
+    async def disconnect(self) -> None:
+        """Count the disconnect."""
+        self._broker.disconnected += 1
+
+
+async def _started(
+    fans: list[dict[str, Any]], broker: _Broker, **kwargs: Any
+) -> tuple[SmartCocoonManager, _CloudAPI, list[ChangeSet]]:
+    api = _CloudAPI(fans)
+    manager = SmartCocoonManager(api=api)  # type: ignore[arg-type]
+    await manager.async_update_data()
+    await manager.async_enable_mqtt(MqttFanTransport(broker.connect, **kwargs))
+    received: list[ChangeSet] = []
+    manager.subscribe(received.append)
+    return manager, api, received
+
+
+@pytest.mark.asyncio
+async def test_command_goes_over_mqtt_not_rest() -> None:
+    """A connected fan is commanded without touching the cloud."""
+    broker = _Broker()
+    manager, api, _ = await _started([_fan("fan-a")], broker)
+
+    assert await manager.async_fan_turn_off("fan-a")
+
+    assert broker.published == [
+        ("smartcocoon/fan-a/command", {"mode": "always_off", "power": 3300})
+    ]
+    assert not api.writes
+    assert manager.fans["fan-a"].fan_on is False
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_falls_back_to_rest() -> None:
+    """The command still reaches the fan when MQTT is down."""
+    broker = _Broker(fail_publish=True)
+    manager, api, _ = await _started([_fan("fan-a")], broker)
+
+    assert await manager.async_fan_turn_on("fan-a")
+
+    assert not broker.published
+    assert [(method, url) for method, url, _ in api.writes] == [
+        ("PUT", f"{API_FANS_URL}{manager.fans['fan-a'].identifier}")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_command_falls_back_to_rest() -> None:
+    """A publish no fan answers, as on a wrong topic, is sent over REST."""
+    broker = _Broker(echo=False)
+    manager, api, _ = await _started(
+        [_fan("fan-a")], broker, confirm_timeout=0.01
+    )
+
+    assert await manager.async_fan_turn_off("fan-a")
+
+    assert len(broker.published) == 1
+    assert [(method, body) for method, _, body in api.writes] == [
+        ("PUT", {"mode": "always_off", "power": 3300})
+    ]
+    assert manager._mqtt is not None and not manager._mqtt._unconfirmed
+
+
+@pytest.mark.asyncio
+async def test_pushed_state_updates_fan_and_notifies() -> None:
+    """State published by the fan is applied and sent to subscribers."""
+    broker = _Broker()
+    manager, _, received = await _started([_fan("fan-a")], broker)
+
+    broker.push(
+        "smartcocoon/fan-a/state", {"mode": "always_on", "power": 5000}
+    )
+
+    fan = manager.fans["fan-a"]
+    assert (fan.mode, fan.power, fan.fan_on) == ("always_on", 5000, True)
+    assert [(c.identifier, c.kind, c.fields) for c in received[0]] == [
+        (
+            "fan-a",
+            ChangeKind.CHANGED,
+            {"mode": ("auto", "always_on"), "power": (3300, 5000)},
+        )
+    ]
+
+    # A repeat of the same state changes nothing and is not reported.
+    broker.push(
+        "smartcocoon/fan-a/state", {"mode": "always_on", "power": 5000}
+    )
+    assert len(received) == 1
+
+
+@pytest.mark.asyncio
+async def test_fans_without_credentials_stay_on_rest() -> None:
+    """Only fans with MQTT credentials are connected."""
+    broker = _Broker()
+    manager, api, _ = await _started(
+        [_fan("fan-a"), _fan("fan-b", username=None)], broker
+    )
+
+    assert broker.connections == ["user"]
+    assert await manager.async_fan_turn_on("fan-b")
+    assert len(api.writes) == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_connects_new_and_drops_removed_fans() -> None:
+    """The set of connected fans follows the fans the cloud lists."""
+    broker = _Broker()
+    manager, api, _ = await _started([_fan("fan-a")], broker)
+
+    api.fans = [_fan("fan-b")]
+    changes = await manager.async_update_data()
+
+    assert {c.identifier for c in changes.of_type(EntityType.FANS)} == {
+        "fan-a",
+        "fan-b",
+    }
+    assert manager._mqtt is not None
+    assert manager._mqtt.fan_ids == {"fan-b"}
+    assert broker.disconnected == 1
+
+
+@pytest.mark.asyncio
+async def test_pushed_state_of_the_wrong_type_is_dropped() -> None:
+    """A message with a field the fan cannot hold changes nothing."""
+    broker = _Broker()
+    manager, _, received = await _started([_fan("fan-a")], broker)
+
+    for state in (
+        {"power": "fast", "mode": "always_on"},
+        {"connected": 1},
+        {"mode": "turbo"},
+    ):
+        broker.push("smartcocoon/fan-a/state", state)
+
+    fan = manager.fans["fan-a"]
+    assert (fan.mode, fan.power, fan.connected) == ("auto", 3300, True)
+    assert fan.speed_pct == 33 and not received
+
+
+@pytest.mark.asyncio
+async def test_cached_fans_do_not_undo_mqtt_state() -> None:
+    """A poll the cache answers leaves pushed and commanded state alone."""
+    session = FakeSession(fans=[_fan("fan-a")])
+    api = SmartCocoonAPI(
+        session, response_cache=ResponseCache()  # type: ignore[arg-type]
+    )
+    manager = SmartCocoonManager(api=api)
+    await manager.async_update_fans()
+    broker = _Broker()
+    await manager.async_enable_mqtt(MqttFanTransport(broker.connect))
+    received: list[ChangeSet] = []
+    manager.subscribe(received.append)
+    fan = manager.fans["fan-a"]
+
+    broker.push(
+        "smartcocoon/fan-a/state", {"mode": "always_on", "power": 10000}
+    )
+    assert await manager.async_set_fan_speed("fan-a", 60)
+    requests = len(session.requests)
+    await manager.async_update_fans()
+
+    assert len(session.requests) == requests
+    assert (fan.mode, fan.power) == ("always_on", 6000)
+    # Only the pushed state was reported, not a revert by the poll.
+    assert len(received) == 1
+
+
+class _FailingAiomqtt:
+    """An aiomqtt client whose connection drops when the test says so."""
+
+    def __init__(self) -> None:
+        self.lost: asyncio.Future[None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self.published: list[str] = []
+
+    @property
+    def messages(self) -> AsyncIterator[Any]:
+        """Yield nothing until the connection is lost, then raise."""
+        return self._messages()
+
+    async def _messages(self) -> AsyncIterator[Any]:
+        await self.lost
+        yield  # pragma: no cover
+
+    async def publish(self, topic: str, payload: bytes) -> None:
+        """Record the topic."""
+        del payload
+        self.published.append(topic)
+
+    async def subscribe(self, topic: str) -> None:
+        """Accept the subscription."""
+        del topic
+
+
+@pytest.mark.asyncio
+async def test_lost_connection_detaches_until_the_next_refresh(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """A failed listener detaches its fan, and a refresh reconnects it."""
+    clients: list[_FailingAiomqtt] = []
+
+    async def _connect(
+        username: str,
+        password: str,
+        on_message: MessageHandler,
+        on_disconnect: DisconnectHandler,
+    ) -> _AiomqttClient:
+        del username, password
+        clients.append(_FailingAiomqtt())
+        return _AiomqttClient(
+            clients[-1], AsyncExitStack(), on_message, on_disconnect
+        )
+
+    api = _CloudAPI([_fan("fan-a")])
+    manager = SmartCocoonManager(api=api)  # type: ignore[arg-type]
+    await manager.async_update_data()
+    transport = MqttFanTransport(_connect)
+    await manager.async_enable_mqtt(transport)
+    fan = manager.fans["fan-a"]
+    assert transport.is_attached(fan)
+
+    clients[0].lost.set_exception(ConnectionError("broker went away"))
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert not transport.is_attached(fan)
+    assert "MQTT connection lost" in caplog.text
+    assert await manager.async_fan_turn_off("fan-a")
+    assert len(api.writes) == 1 and not clients[0].published
+
+    await manager.async_update_data()
+    assert transport.is_attached(fan) and len(clients) == 2
+    await manager.async_disable_mqtt()
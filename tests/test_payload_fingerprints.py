@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Tests for skipping records that have not changed.
+
+Every poll rebuilt the state of every location, thermostat and room to diff
+it, even though most records come back exactly as they were. The fields read
+from a record are now compared with the entity's own first, and a record
+that matches costs nothing further and reports no change.
+"""
+
+from typing import Any
+
+import pytest
+from conftest import FakeResponse, FakeSession, fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.changes import ChangeSet
+from pysmartcocoon.const import API_URL, EntityType
+from pysmartcocoon.entity import RecordEntity
+from pysmartcocoon.location import Location
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.room import Room
+from pysmartcocoon.thermostat import Thermostat
+
+
+def _collections(temperature: float = 19.5) -> dict[str, list[Any]]:
+    return {
+        "client_systems": [{"id": 1, "location": {"postal_code": "A1A"}}],
+        "thermostats": [
+            {
+                "id": 3,
+                "name": "Hall",
+                "thermostat_id": 30,
+                "token": "t",
+                "hvac_mode": "heat",
+                "hvac_state": "idle",
+                "temperature": 20.0,
+                "target_temperature": 21.0,
+                "vendor": "ecobee",
+            }
+        ],
+        "rooms": [
+            {
+                "id": 7,
+                "name": "Office",
+                "desired_temperature": 21.0,
+                "hvac_mode": "heat",
+                "hvac_state": "idle",
+                "is_estimating": False,
+                "predicted_temperature": 20.0,
+                "target_temperature": 21.0,
+                "temperature": temperature,
+                "thermostat_id": 3,
+            }
+        ],
+        "fans": [fan_payload(connected=False, room_id=7)],
+    }
+
+
+class _FakeSession(FakeSession):
+    """Serves freshly built records on every request, as the cloud does."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.temperature = 19.5
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Answer a collection GET."""
+        del method, kwargs
+        key = url.removeprefix(API_URL)
+        return FakeResponse({key: _collections(self.temperature)[key]})
+
+
+@pytest.fixture(name="states")
+def fixture_states(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Record every time an entity's state is built for a diff."""
+    built: list[str] = []
+    for model in (Location, Thermostat, Room):
+        original = model.state
+
+        def _counting(entity: Any, original: Any = original) -> Any:
+            built.append(type(entity).__name__)
+            return original.fget(entity)
+
+        monkeypatch.setattr(model, "state", property(_counting))
+    return built
+
+
+@pytest.mark.asyncio
+async def test_unchanged_records_cost_nothing(states: list[str]) -> None:
+    """A repeated poll builds no state and reports no changes."""
+    session = _FakeSession()
+    manager = SmartCocoonManager(
+        api=SmartCocoonAPI(session)  # type: ignore[arg-type]
+    )
+    received: list[ChangeSet] = []
+    manager.subscribe(received.append)
+
+    await manager.async_update_data()
+    states.clear()
+    assert not await manager.async_update_data()
+    assert not states and len(received) == 1
+
+    session.temperature = 18.0
+    changes = await manager.async_update_data()
+    assert [(c.entity_type, c.fields) for c in changes] == [
+        (EntityType.ROOMS, {"temperature": (19.5, 18.0)})
+    ]
+    assert states == ["Room", "Room"]
+
+
+@pytest.mark.parametrize(
+    "model, key",
+    [
+        (Location, "client_systems"),
+        (Thermostat, "thermostats"),
+        (Room, "rooms"),
+    ],
+)
+def test_matching_records_change_nothing(model: Any, key: str) -> None:
+    """update reports nothing for a record equal to the entity's own."""
+    record = _collections()[key][0]
+    entity = model(record)
+    assert entity.update(dict(record)) == {}
+    assert entity == model(record)
+
+    broken = dict(record)
+    del broken["id"]
+    with pytest.raises(KeyError):
+        entity.update(broken)
+
+
+def test_incomplete_entities_cannot_be_created() -> None:
+    """A record entity missing part of its contract fails on creation."""
+
+    # pylint: disable=abstract-method,abstract-class-instantiated
+    class _Unfinished(RecordEntity):
+        __slots__ = ("_identifier",)
+
+        def _apply(self, values: tuple[Any, ...]) -> None:
+            (self._identifier,) = values
+
+    with pytest.raises(TypeError, match="_read, state"):
+        _Unfinished({"id": 1})  # type: ignore[abstract]
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Tests for the adaptive polling schedule.
+
+Polling at one fixed interval was too slow right after a fan was changed
+and wasteful when nothing changed for hours. The schedule polls quickly
+after a command and backs off while polls find nothing new.
+"""
+
+import asyncio
+import copy
+from collections.abc import Callable
+from typing import Any, Optional
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.changes import ChangeSet
+from pysmartcocoon.const import API_URL, FanMode
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.scheduler import PollScheduler
+
+
+class _Clock:
+    """A clock the test moves by hand."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _scheduler(clock: _Clock) -> PollScheduler:
+    return PollScheduler(
+        interval=60,
+        fast_interval=5,
+        fast_window=30,
+        max_interval=480,
+        clock=clock,
+    )
+
+
+def test_unchanged_polls_back_off_to_the_maximum() -> None:
+    """Each empty poll doubles the interval; a change resets it."""
+    clock = _Clock()
+    scheduler = _scheduler(clock)
+
+    intervals = []
+    for _ in range(5):
+        scheduler.on_poll(changed=False)
+        intervals.append(scheduler.interval)
+    assert intervals == [120, 240, 480, 480, 480]
+
+    scheduler.on_poll(changed=True)
+    assert scheduler.interval == 60
+
+
+def test_command_polls_fast_for_the_window() -> None:
+    """After a command, polls are due every fast_interval for a while."""
+    clock = _Clock()
+    scheduler = _scheduler(clock)
+    for _ in range(3):
+        scheduler.on_poll(changed=False)
+
+    scheduler.on_command()
+    assert scheduler.interval == 5
+    assert scheduler.next_delay() == 5
+
+    # Fast polls that find nothing do not back off inside the window.
+    clock.now += 5
+    scheduler.on_poll(changed=False)
+    assert scheduler.next_delay() == 5
+
+    clock.now += 30
+    assert scheduler.interval == 60
+
+
+def test_rate_limit_ends_fast_polling_and_pauses() -> None:
+    """A 429 backs off and holds polls for Retry-After."""
+    clock = _Clock()
+    scheduler = _scheduler(clock)
+    scheduler.on_command()
+
+    scheduler.on_rate_limited(retry_after=300)
+
+    assert scheduler.interval == 120
+    assert scheduler.next_delay() == 300
+
+
+def test_small_interval_moves_the_defaults() -> None:
+    """An interval below the default fast interval is still accepted."""
+    scheduler = PollScheduler(1)
+    scheduler.on_command()
+    assert scheduler.interval == 1
+
+
+@pytest.mark.parametrize("kwargs", [{"interval": 0}, {"backoff": 0.5}])
+def test_invalid_settings_are_rejected(kwargs: dict[str, Any]) -> None:
+    """A schedule that would never poll, or speed up forever, is refused."""
+    with pytest.raises(ValueError):
+        PollScheduler(**kwargs)
+
+
+def _fan(fan_id: str, mode: str = "auto") -> dict[str, Any]:
+    return fan_payload(fan_id=fan_id, mode=mode)
+
+
+class _CloudAPI:
+    """Serves one fan, counts fan list requests and accepts updates."""
+
+    def __init__(self) -> None:
+        self.fan = _fan("fan-a")
+        self.polls = 0
+        self.listener: Optional[Callable[[Optional[float]], None]] = None
+
+    async def async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Answer collection GETs."""
+        del method, kwargs
+        key = url.removeprefix(API_URL)
+        if key == "fans":
+            self.polls += 1
+            return {"fans": [copy.deepcopy(self.fan)]}
+        return {key: []}
+
+    async def async_update_fan(
+        self, fan_identifier: int, mode: str, power: int
+    ) -> dict[str, Any]:
+        """Accept the change and answer with the full fan."""
+        del fan_identifier
+        self.fan = {**self.fan, "mode": mode, "power": power}
+        return copy.deepcopy(self.fan)
+
+    def add_rate_limit_listener(
+        self, listener: Callable[[Optional[float]], None]
+    ) -> Callable[[], None]:
+        """Keep the listener so the test can play a 429."""
+        self.listener = listener
+        return lambda: None
+
+
+@pytest.mark.asyncio
+async def test_manager_polls_fast_after_a_command() -> None:
+    """A command wakes a backed-off poller straight into fast polling."""
+    api = _CloudAPI()
+    manager = SmartCocoonManager(api=api)  # type: ignore[arg-type]
+    await manager.async_update_data()
+    # Polls only run for somebody.
+    received: list[ChangeSet] = []
+    manager.subscribe_fan("fan-a", received.append)
+
+    manager.start_updates(
+        scheduler=PollScheduler(
+            interval=3600,
+            fast_interval=0.01,
+            fast_window=10,
+            max_interval=7200,
+        )
+    )
+    assert manager.poll_interval == 3600
+    await asyncio.sleep(0.05)
+    assert api.polls == 1
+
+    await manager.async_set_fan_modes("fan-a", FanMode.ON, 50)
+    assert manager.poll_interval == 0.01
+    await asyncio.sleep(0.1)
+    assert api.polls > 3
+
+    # A 429 ends the fast window and backs off.
+    assert api.listener is not None
+    api.listener(None)
+    assert manager.poll_interval == 7200
+    await manager.async_stop_updates()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Tests for pacing requests with a token bucket.
+
+Reacting to 429 only after it arrives lets requests go out in bursts, get
+rejected together and retry together. The bucket spaces them out up front
+and slows down when the cloud says it is being asked too often.
+"""
+
+import asyncio
+import time
+from typing import Any
+
+import pytest
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.fleet import SmartCocoonFleet
+from pysmartcocoon.ratelimit import TokenBucket
+
+# pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_requests_are_paced_to_the_rate() -> None:
+    """Beyond the burst, requests are spaced 1/rate apart."""
+    bucket = TokenBucket(rate=100, burst=2)
+
+    started = time.monotonic()
+    for _ in range(6):
+        await bucket.acquire()
+    elapsed = time.monotonic() - started
+
+    # Two from the burst, then four at 10ms each.
+    assert elapsed >= 0.035
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_counts_waiters() -> None:
+    """Requests held by the bucket are visible as queue depth."""
+    bucket = TokenBucket(rate=50)
+    await bucket.acquire()
+
+    waiters = [asyncio.create_task(bucket.acquire()) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert bucket.queue_depth == 3
+
+    await asyncio.gather(*waiters)
+    assert bucket.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_halves_rate_and_pauses() -> None:
+    """A 429 slows the bucket and holds requests for Retry-After."""
+    bucket = TokenBucket(rate=1000, min_rate=100)
+    bucket.on_rate_limited(retry_after=0.05)
+    assert bucket.rate == 500
+
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.045
+
+    for _ in range(5):
+        bucket.on_rate_limited()
+    assert bucket.rate == 100
+
+
+def test_success_recovers_towards_configured_rate() -> None:
+    """The rate climbs back, but never above where it started."""
+    bucket = TokenBucket(rate=100, recovery=0.25)
+    bucket.on_rate_limited()
+    assert bucket.rate == 50
+
+    bucket.on_success()
+    assert bucket.rate == 75
+    bucket.on_success()
+    bucket.on_success()
+    assert bucket.rate == 100
+
+
+@pytest.mark.parametrize("kwargs", [{"rate": 0}, {"rate": 1, "burst": 0}])
+def test_invalid_settings_are_rejected(kwargs: dict[str, Any]) -> None:
+    """A bucket that could never release a request is refused."""
+    with pytest.raises(ValueError):
+        TokenBucket(**kwargs)
+
+
+class _FakeSession(FakeSession):
+    """Answers 429 to the first request and 200 afterwards."""
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Reject the first request only."""
+        del method, kwargs
+        return FakeResponse(
+            {"ok": True},
+            429 if len(self.requests) == 1 else 200,
+            {"Retry-After": "0"},
+            url,
+        )
+
+
+@pytest.mark.asyncio
+async def test_api_feeds_429_back_to_every_limiter() -> None:
+    """Both the account's bucket and the shared one slow down."""
+    account = TokenBucket(rate=100)
+    shared = TokenBucket(rate=100)
+    api = SmartCocoonAPI(
+        _FakeSession(),  # type: ignore[arg-type]
+        rate_limiters=(account, shared),
+    )
+
+    assert await api.async_get_fan(42) == {"ok": True}
+
+    # Halved by the 429, then nudged back up by the retry's success.
+    assert account.rate == shared.rate == 55
+    assert api.rate_limiters == (account, shared)
+
+
+@pytest.mark.asyncio
+async def test_fleet_shares_its_bucket_between_accounts() -> None:
+    """Every account gets its own bucket plus the fleet-wide one."""
+    shared = TokenBucket(rate=10)
+    async with SmartCocoonFleet(
+        rate_limiter=shared, account_rate_limit=2
+    ) as fleet:
+        first = await fleet.async_add_account("a", "u", "p")
+        second = await fleet.async_add_account("b", "u", "p")
+
+    first_limiters = first._api.rate_limiters
+    second_limiters = second._api.rate_limiters
+    assert first_limiters[1] is second_limiters[1] is shared
+    assert first_limiters[0] is not second_limiters[0]
+    assert first_limiters[0].rate == 2
+
+
+@pytest.mark.asyncio
+async def test_api_reports_429_to_listeners() -> None:
+    """Listeners hear the Retry-After of each 429, until removed."""
+    api = SmartCocoonAPI(_FakeSession())  # type: ignore[arg-type]
+    heard: list[Any] = []
+    remove = api.add_rate_limit_listener(heard.append)
+
+    await api.async_get_fan(42)
+    remove()
+    api._session = _FakeSession()  # type: ignore[assignment]
+    await api.async_get_fan(43)
+
+    assert heard == [0.0]
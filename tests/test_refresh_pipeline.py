@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Tests for fetching every collection of a refresh at once.
+
+async_update_data used to fetch fans only after locations, thermostats and
+rooms had all finished, so every refresh paid for two round trips in
+sequence. All four are now in flight together, and fans are applied in one
+batch once rooms are known.
+"""
+
+import asyncio
+from typing import Any
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.const import API_URL
+from pysmartcocoon.errors import RequestError
+from pysmartcocoon.manager import SmartCocoonManager
+
+
+def _fan(identifier: int, fan_id: str, room_id: int) -> dict[str, Any]:
+    return fan_payload(id=identifier, fan_id=fan_id, room_id=room_id)
+
+
+def _room(room_id: int, name: str) -> dict[str, Any]:
+    return {
+        "id": room_id,
+        "name": name,
+        "desired_temperature": 21.0,
+        "hvac_mode": "heat",
+        "hvac_state": "idle",
+        "is_estimating": False,
+        "predicted_temperature": 20.0,
+        "target_temperature": 21.0,
+        "temperature": 19.5,
+        "thermostat_id": 3,
+    }
+
+
+class _SlowAPI:
+    """Answers each collection after its own delay, tracking overlap."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, delays: dict[str, float]) -> None:
+        self._delays = delays
+        self.active = 0
+        self.peak = 0
+        self.responses: dict[str, dict[str, Any]] = {
+            "client_systems": {"client_systems": []},
+            "thermostats": {"thermostats": []},
+            "rooms": {"rooms": [_room(1, "Office"), _room(2, "Den")]},
+            "fans": {"fans": [_fan(1, "fan-a", 1), _fan(2, "fan-b", 2)]},
+        }
+
+    async def async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Return the collection for url after its delay."""
+        del method, kwargs
+        entity = url.removeprefix(API_URL)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(self._delays.get(entity, 0))
+        self.active -= 1
+        return self.responses[entity]
+
+
+def _manager(api: _SlowAPI) -> SmartCocoonManager:
+    manager = SmartCocoonManager()
+    manager._api = api  # type: ignore[assignment] # pylint: disable=W0212
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_all_collections_are_fetched_at_once() -> None:
+    """Four requests overlap rather than running in two stages."""
+    api = _SlowAPI({"client_systems": 0.02, "fans": 0.02})
+    manager = _manager(api)
+
+    await manager.async_update_data()
+
+    assert api.peak == 4
+    assert set(manager.fans) == {"fan-a", "fan-b"}
+
+
+@pytest.mark.asyncio
+async def test_room_names_resolve_when_rooms_arrive_last() -> None:
+    """Fans answered first still get the names from the later rooms."""
+    api = _SlowAPI({"rooms": 0.05, "fans": 0})
+    manager = _manager(api)
+
+    await manager.async_update_data()
+
+    assert manager.fans["fan-a"].room_name == "Office"
+    assert manager.fans["fan-b"].room_name == "Den"
+
+
+@pytest.mark.asyncio
+async def test_failed_collection_leaves_the_rest_applied() -> None:
+    """One collection failing does not hold back the others."""
+    api = _SlowAPI({})
+    manager = _manager(api)
+    await manager.async_update_data()
+
+    async def _failing(method: str, url: str, **kwargs: Any) -> Any:
+        del kwargs
+        if url.endswith("rooms"):
+            raise RequestError("boom")
+        return await _SlowAPI.async_request(api, method, url)
+
+    api.responses["fans"] = {"fans": [_fan(3, "fan-c", 1)]}
+    api.async_request = _failing  # type: ignore[method-assign]
+    await manager.async_update_data()
+
+    assert manager.fans["fan-c"].room_name == "Office"
+    assert set(manager.rooms) == {1, 2}
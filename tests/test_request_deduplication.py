@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Tests for sharing one request between identical concurrent GETs.
+
+Several pollers asking for the same collection at the same moment used to
+send one request each. Identical GETs in flight together now share a single
+request and its parsed result.
+"""
+
+import asyncio
+from typing import Any
+
+import pytest
+from aiohttp import ClientConnectionError
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_FANS_URL, API_URL
+from pysmartcocoon.errors import RequestError
+
+# pylint: disable=protected-access
+
+
+class _FakeSession(FakeSession):
+    """Answers slowly enough for requests to overlap, counting each one."""
+
+    def __init__(self, fail: bool = False) -> None:
+        super().__init__()
+        self.fail = fail
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Answer after a short delay, echoing the URL back."""
+        del method, kwargs
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise ClientConnectionError("unreachable")
+        return FakeResponse({"url": url})
+
+
+def _api(session: _FakeSession, **kwargs: Any) -> SmartCocoonAPI:
+    return SmartCocoonAPI(session, **kwargs)  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_gets_share_one_request() -> None:
+    """Five callers, one request, one shared result."""
+    session = _FakeSession()
+    api = _api(session)
+
+    results = await asyncio.gather(*(api.async_get_fan(42) for _ in range(5)))
+
+    assert session.requests == [("GET", f"{API_FANS_URL}42")]
+    assert all(result is results[0] for result in results)
+    assert not api._in_flight
+
+
+@pytest.mark.asyncio
+async def test_different_urls_are_not_merged() -> None:
+    """Only identical requests are shared."""
+    session = _FakeSession()
+    api = _api(session)
+
+    await asyncio.gather(
+        api.async_get_fan(1),
+        api.async_get_fan(2),
+        api.async_request("GET", f"{API_URL}rooms"),
+    )
+
+    assert len(session.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_sequential_gets_are_not_merged() -> None:
+    """A finished request is not reused; that would be a cache."""
+    session = _FakeSession()
+    api = _api(session)
+
+    await api.async_get_fan(42)
+    await api.async_get_fan(42)
+
+    assert len(session.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_writes_are_never_merged() -> None:
+    """Two identical updates are two updates."""
+    session = _FakeSession()
+    api = _api(session)
+
+    await asyncio.gather(
+        api.async_update_fan(42, "always_on", 5000),
+        api.async_update_fan(42, "always_on", 5000),
+    )
+
+    assert len(session.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Each caller sharing a failed request sees the error."""
+
+    async def _no_sleep(_: float) -> None:
+        return None
+
+    session = _FakeSession(fail=True)
+    api = _api(session)
+    monkeypatch.setattr("pysmartcocoon.api.asyncio.sleep", _no_sleep)
+
+    results = await asyncio.gather(
+        *(api.async_get_fan(42) for _ in range(3)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RequestError) for result in results)
+    # One request's worth of attempts, not three.
+    assert len(session.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_one_cancelled_caller_does_not_cancel_the_others() -> None:
+    """The shared request outlives a caller that gives up on it."""
+    session = _FakeSession()
+    api = _api(session)
+
+    first = asyncio.create_task(api.async_get_fan(42))
+    second = asyncio.create_task(api.async_get_fan(42))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == {"url": f"{API_FANS_URL}42"}
+    assert len(session.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_deduplication_can_be_turned_off() -> None:
+    """With it off, every call sends its own request."""
+    session = _FakeSession()
+    api = _api(session, deduplicate_requests=False)
+
+    await asyncio.gather(*(api.async_get_fan(42) for _ in range(3)))
+
+    assert len(session.requests) == 3
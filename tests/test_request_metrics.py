@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Tests for request instrumentation.
+
+The only view into requests was DEBUG logging. Observers passed to
+SmartCocoonAPI now hear about every attempt and sign-in, and RequestMetrics
+turns those into per-endpoint counters and latency histograms.
+"""
+
+from typing import Any, Optional, Union
+
+import pytest
+from aiohttp.client_exceptions import ClientConnectionError
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_AUTH_URL, API_FANS_URL, API_URL
+from pysmartcocoon.errors import RequestError, UnauthorizedError
+from pysmartcocoon.fleet import SmartCocoonFleet
+from pysmartcocoon.metrics import (
+    LatencyHistogram,
+    RequestMetrics,
+    RequestObserver,
+    RequestRecord,
+    endpoint_for_url,
+)
+
+_AUTH_HEADERS = {"access-token": "t", "client": "c", "expiry": "3600"}
+
+
+class _ScriptedSession(FakeSession):
+    """Answers each request with the next status, or raises an error."""
+
+    def __init__(self, *script: Union[int, Exception]) -> None:
+        super().__init__()
+        self._script = list(script)
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Play the next step of the script."""
+        del method, kwargs
+        step = self._script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        body: Any = {"ok": True}
+        headers = {"Retry-After": "0"}
+        if url == API_AUTH_URL:
+            body = {"data": {"id": 1, "email": "e"}}
+            headers.update(_AUTH_HEADERS)
+        return FakeResponse(body, step, headers, url, content_length=7)
+
+
+def _api(session: _ScriptedSession, *observers: Any) -> SmartCocoonAPI:
+    return SmartCocoonAPI(
+        session, observers=observers  # type: ignore[arg-type]
+    )
+
+
+def test_endpoints_replace_ids() -> None:
+    """Per-fan URLs share one endpoint, whatever the fan."""
+    assert endpoint_for_url(f"{API_FANS_URL}41") == "fans/{id}"
+    assert endpoint_for_url(f"{API_FANS_URL}7/status") == "fans/{id}/status"
+    assert endpoint_for_url(f"{API_URL}client_systems") == "client_systems"
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    """A duration counts in its bucket and every one above it."""
+    histogram = LatencyHistogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(3.65)
+
+
+@pytest.mark.parametrize(
+    ("last", "status"),
+    [(503, 503), (ClientConnectionError(), None)],
+    ids=["server-error", "connection-error"],
+)
+@pytest.mark.asyncio
+async def test_every_attempt_is_recorded(
+    last: Union[int, Exception], status: Optional[int]
+) -> None:
+    """Retries, 429s and the final failure are all counted."""
+    records: list[RequestRecord] = []
+
+    class _Recorder(RequestObserver):
+        def on_request(self, record: RequestRecord) -> None:
+            records.append(record)
+
+    metrics = RequestMetrics()
+    api = _api(_ScriptedSession(429, 429, last), metrics, _Recorder())
+
+    with pytest.raises(RequestError):
+        await api.async_get_fan(41)
+
+    assert [(r.status, r.attempt, r.will_retry) for r in records] == [
+        (429, 1, True),
+        (429, 2, True),
+        (status, 3, False),
+    ]
+    totals = metrics.endpoints[("GET", "fans/{id}")]
+    assert (totals.requests, totals.retries, totals.errors) == (3, 2, 3)
+    assert totals.rate_limited == 2
+    assert totals.server_errors == (1 if status else 0)
+    assert totals.latency.count == 3
+
+
+@pytest.mark.asyncio
+async def test_bytes_are_counted_both_ways() -> None:
+    """Request bodies and response lengths add up per endpoint."""
+    metrics = RequestMetrics()
+    api = _api(_ScriptedSession(200), metrics)
+
+    await api.async_update_fan(41, "auto", 3300)
+
+    totals = metrics.endpoints[("PUT", "fans/{id}")]
+    assert totals.bytes_sent == len('{"mode": "auto", "power": 3300}')
+    assert totals.bytes_received == 7
+    assert totals.errors == 0
+
+
+@pytest.mark.asyncio
+async def test_sign_ins_and_refreshes_are_counted() -> None:
+    """The first sign-in is not a refresh, later ones are; failures too."""
+    metrics = RequestMetrics()
+    api = _api(_ScriptedSession(200, 200, 401), metrics)
+
+    assert await api.async_authenticate("u", "p")
+    assert await api.async_authenticate("u", "p")
+    with pytest.raises(UnauthorizedError):
+        await api.async_authenticate("u", "p")
+    await api.close()
+
+    assert metrics.sign_ins == 3
+    assert metrics.token_refreshes == 1
+    assert metrics.sign_in_failures == 1
+    assert metrics.endpoints[("POST", "auth/sign_in")].requests == 3
+
+    metrics.reset()
+    assert not metrics.endpoints and metrics.sign_ins == 0
+
+
+@pytest.mark.asyncio
+async def test_fleet_gives_every_account_its_observers() -> None:
+    """One RequestMetrics can count the requests of a whole fleet."""
+    metrics = RequestMetrics()
+    async with SmartCocoonFleet(observers=[metrics]) as fleet:
+        first = await fleet.async_add_account("a", "u", "p")
+        second = await fleet.async_add_account("b", "u", "p")
+
+    # pylint: disable-next=protected-access
+    assert first._api.observers == second._api.observers == (metrics,)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Tests for caching GET responses with a lifetime per entity type.
+
+Locations, thermostats and rooms rarely change, so re-fetching them on every
+poll is mostly wasted. The cache answers those from memory until their TTL
+runs out, while fans can be kept for seconds or not at all.
+"""
+
+from typing import Any
+
+import pytest
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.cache import ResponseCache, entity_type_for_url
+from pysmartcocoon.const import API_AUTH_URL, API_FANS_URL, API_URL, EntityType
+
+ROOMS_URL = f"{API_URL}rooms"
+LOCATIONS_URL = f"{API_URL}client_systems"
+FANS_URL = f"{API_URL}fans"
+
+
+class _Clock:
+    """A clock the test moves by hand."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(clock: _Clock, **ttls: float) -> ResponseCache:
+    return ResponseCache(
+        ttls={EntityType[name.upper()]: ttl for name, ttl in ttls.items()},
+        clock=clock,
+    )
+
+
+def test_entries_expire_per_entity_type() -> None:
+    """Each type keeps its own lifetime."""
+    clock = _Clock()
+    cache = _cache(clock, locations=3600, rooms=60)
+    cache.put(LOCATIONS_URL, {"client_systems": []})
+    cache.put(ROOMS_URL, {"rooms": []})
+
+    clock.now += 120
+
+    assert cache.get(LOCATIONS_URL) == {"client_systems": []}
+    assert cache.get(ROOMS_URL) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_types_without_a_ttl_are_not_cached_or_counted() -> None:
+    """No TTL means no caching, and lookups for it are not misses."""
+    cache = _cache(_Clock(), rooms=60)
+    cache.put(FANS_URL, {"fans": []})
+
+    assert cache.get(FANS_URL) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    """Reading an entry keeps it; the oldest untouched one goes."""
+    cache = ResponseCache(
+        ttls={EntityType.FANS: 60}, max_entries=2, clock=_Clock()
+    )
+    cache.put(f"{API_FANS_URL}1", {"id": 1})
+    cache.put(f"{API_FANS_URL}2", {"id": 2})
+    cache.get(f"{API_FANS_URL}1")
+    cache.put(f"{API_FANS_URL}3", {"id": 3})
+
+    assert cache.get(f"{API_FANS_URL}1") == {"id": 1}
+    assert cache.get(f"{API_FANS_URL}2") is None
+    assert cache.get(f"{API_FANS_URL}3") == {"id": 3}
+
+
+def test_invalidation_by_type_and_entirely() -> None:
+    """Invalidation can target one type or clear everything."""
+    cache = _cache(_Clock(), locations=60, rooms=60)
+    cache.put(LOCATIONS_URL, {"client_systems": []})
+    cache.put(ROOMS_URL, {"rooms": []})
+
+    cache.invalidate(EntityType.ROOMS)
+    assert cache.get(ROOMS_URL) is None
+    assert cache.get(LOCATIONS_URL) is not None
+
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    ("url", "entity"),
+    [
+        (FANS_URL, EntityType.FANS),
+        (f"{API_FANS_URL}42", EntityType.FANS),
+        (ROOMS_URL, EntityType.ROOMS),
+        (LOCATIONS_URL, EntityType.LOCATIONS),
+        (API_AUTH_URL, None),
+    ],
+)
+def test_entity_type_for_url(url: str, entity: EntityType | None) -> None:
+    """A single fan's URL counts as a fan, like the collection does."""
+    assert entity_type_for_url(url) is entity
+
+
+class _FakeSession(FakeSession):
+    """Counts requests per URL."""
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Echo the URL back."""
+        del method, kwargs
+        return FakeResponse({"url": url})
+
+
+@pytest.mark.asyncio
+async def test_api_answers_repeat_gets_from_the_cache() -> None:
+    """A cached collection is fetched once until it expires."""
+    clock = _Clock()
+    session = _FakeSession()
+    api = SmartCocoonAPI(
+        session,  # type: ignore[arg-type]
+        response_cache=_cache(clock, rooms=60),
+    )
+
+    first = await api.async_request("GET", ROOMS_URL)
+    second = await api.async_request("GET", ROOMS_URL)
+    clock.now += 61
+    await api.async_request("GET", ROOMS_URL)
+
+    assert first == second == {"url": ROOMS_URL}
+    assert session.requests == [("GET", ROOMS_URL)] * 2
+
+
+@pytest.mark.asyncio
+async def test_fan_update_invalidates_cached_fans() -> None:
+    """After a write, the next read of that type goes to the cloud."""
+    session = _FakeSession()
+    api = SmartCocoonAPI(
+        session,  # type: ignore[arg-type]
+        response_cache=_cache(_Clock(), fans=60, rooms=60),
+    )
+
+    await api.async_request("GET", FANS_URL)
+    await api.async_request("GET", ROOMS_URL)
+    await api.async_update_fan(42, "always_on", 5000)
+    await api.async_request("GET", FANS_URL)
+    await api.async_request("GET", ROOMS_URL)
+
+    assert session.requests == [
+        ("GET", FANS_URL),
+        ("GET", ROOMS_URL),
+        ("PUT", f"{API_FANS_URL}42"),
+        ("GET", FANS_URL),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_no_cache_by_default() -> None:
+    """Without a cache supplied, every GET is sent."""
+    session = _FakeSession()
+    api = SmartCocoonAPI(session)  # type: ignore[arg-type]
+
+    await api.async_request("GET", ROOMS_URL)
+    await api.async_request("GET", ROOMS_URL)
+
+    assert api.response_cache is None
+    assert len(session.requests) == 2
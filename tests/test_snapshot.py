@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Tests for saving a manager's state and warm-starting from it.
+
+Starting normally signs in and then waits on four collection requests before
+any entity exists. From a snapshot, entities are available immediately and
+the cloud is consulted in the background.
+"""
+
+import asyncio
+import os
+import stat
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_URL
+from pysmartcocoon.errors import RequestError
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.snapshot import (
+    SNAPSHOT_VERSION,
+    decode_snapshot,
+    encode_snapshot,
+    read_snapshot,
+)
+
+# pylint: disable=protected-access
+
+FAN_ID = "abc123"
+
+
+def _fan(power: int = 3300) -> dict[str, Any]:
+    return fan_payload(
+        id=42, fan_id=FAN_ID, mode="always_on", power=power, room_id=7
+    )
+
+
+def _collections(power: int = 3300) -> dict[str, dict[str, Any]]:
+    return {
+        f"{API_URL}client_systems": {
+            "client_systems": [{"id": 1, "location": {"postal_code": "A1A"}}]
+        },
+        f"{API_URL}thermostats": {
+            "thermostats": [
+                {
+                    "id": 3,
+                    "name": "Hall",
+                    "thermostat_id": 9,
+                    "token": "secret",
+                    "hvac_mode": "heat",
+                    "hvac_state": "idle",
+                    "temperature": 20.5,
+                    "target_temperature": 21.0,
+                    "vendor": "ecobee",
+                }
+            ]
+        },
+        f"{API_URL}rooms": {
+            "rooms": [
+                {
+                    "id": 7,
+                    "name": "Office",
+                    "desired_temperature": 21.0,
+                    "hvac_mode": "heat",
+                    "hvac_state": "idle",
+                    "is_estimating": False,
+                    "predicted_temperature": 20.0,
+                    "target_temperature": 21.0,
+                    "temperature": 19.5,
+                    "thermostat_id": 3,
+                }
+            ]
+        },
+        f"{API_URL}fans": {"fans": [_fan(power)]},
+    }
+
+
+class _FakeCloud:
+    """Serves canned collections and records what was asked of it."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, power: int = 3300, delay: float = 0) -> None:
+        self.responses = _collections(power)
+        self.requests: list[str] = []
+        self.sign_ins = 0
+        self.delay = delay
+        self.fail = False
+
+    def attach(self, api: SmartCocoonAPI) -> SmartCocoonAPI:
+        """Route the API's requests here instead of the network."""
+
+        async def _request(
+            method: str, url: str, **kwargs: Any
+        ) -> Optional[dict[str, Any]]:
+            del method, kwargs
+            self.requests.append(url)
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RequestError("503 Service Unavailable")
+            return self.responses.get(url)
+
+        async def _authenticate(username: str, password: str) -> bool:
+            del username, password
+            self.sign_ins += 1
+            api._authenticated = True
+            return True
+
+        api.async_request = _request  # type: ignore[method-assign]
+        api.async_authenticate = _authenticate  # type: ignore[method-assign]
+        return api
+
+
+def _signed_in_api(cloud: _FakeCloud) -> SmartCocoonAPI:
+    api = cloud.attach(SmartCocoonAPI())
+    api.restore_auth(
+        {
+            "access-token": "token",
+            "client": "client",
+            "uid": "user@example.com",
+            "user_id": 5,
+            "expiry": (datetime.now() + timedelta(hours=1)).timestamp(),
+        }
+    )
+    return api
+
+
+async def _saved_manager(path: Path, include_auth: bool = False) -> None:
+    manager = SmartCocoonManager(api=_signed_in_api(_FakeCloud()))
+    await manager.async_update_data()
+    await manager.async_save_snapshot(path, include_auth=include_auth)
+
+
+@pytest.mark.asyncio
+async def test_entities_are_available_before_revalidation(
+    tmp_path: Path,
+) -> None:
+    """Warm start serves snapshot values, then the background refresh wins."""
+    path = tmp_path / "snapshot.json"
+    await _saved_manager(path)
+
+    cloud = _FakeCloud(power=8000, delay=0.05)
+    manager = SmartCocoonManager(api=cloud.attach(SmartCocoonAPI()))
+    assert await manager.async_start_from_snapshot(path, "u", "p") is True
+
+    fan = manager.fans[FAN_ID]
+    assert fan.power == 3300
+    assert fan.room_name == "Office"
+    assert manager.locations[1].postal_code == "A1A"
+    assert manager.thermostats[3].name == "Hall"
+    assert manager.rooms[7].temperature == 19.5
+
+    assert manager.revalidation is not None
+    assert await manager.revalidation is True
+    assert cloud.sign_ins == 1
+    assert manager.fans[FAN_ID].power == 8000
+
+
+@pytest.mark.asyncio
+async def test_revalidation_reports_an_unreachable_cloud(
+    tmp_path: Path,
+) -> None:
+    """Signing in is not enough; the collections must arrive too."""
+    path = tmp_path / "snapshot.json"
+    await _saved_manager(path, include_auth=True)
+
+    cloud = _FakeCloud(power=8000)
+    cloud.fail = True
+    manager = SmartCocoonManager(api=cloud.attach(SmartCocoonAPI()))
+    await manager.async_start_from_snapshot(path, "u", "p")
+
+    assert manager.revalidation is not None
+    assert await manager.revalidation is False
+    assert len(cloud.requests) == 4
+    assert manager.fans[FAN_ID].power == 3300
+
+
+@pytest.mark.asyncio
+async def test_saved_auth_skips_sign_in(tmp_path: Path) -> None:
+    """With auth opted in, a valid token is reused instead of signing in."""
+    path = tmp_path / "snapshot.json"
+    await _saved_manager(path, include_auth=True)
+
+    cloud = _FakeCloud()
+    manager = SmartCocoonManager(api=cloud.attach(SmartCocoonAPI()))
+    await manager.async_start_from_snapshot(path, "u", "p")
+    assert manager.revalidation is not None
+    await manager.revalidation
+
+    assert cloud.sign_ins == 0
+    assert manager._api._headers_auth["access-token"] == "token"
+
+
+@pytest.mark.asyncio
+async def test_auth_is_left_out_by_default(tmp_path: Path) -> None:
+    """The auth triple is only written when asked for."""
+    path = tmp_path / "snapshot.json"
+    await _saved_manager(path)
+
+    snapshot = read_snapshot(path)
+    assert snapshot is not None
+    assert "auth" not in snapshot
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_private(tmp_path: Path) -> None:
+    """Snapshots hold credentials, so only the owner may read them."""
+    path = tmp_path / "snapshot.json"
+    await _saved_manager(path)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "contents",
+    [b"not json", b"[]", encode_snapshot({"fans": []})[:-5]],
+)
+async def test_unusable_snapshot_falls_back_to_normal_start(
+    tmp_path: Path, contents: bytes
+) -> None:
+    """A damaged snapshot behaves as if there were none."""
+    path = tmp_path / "snapshot.json"
+    path.write_bytes(contents)
+
+    cloud = _FakeCloud()
+    manager = SmartCocoonManager(api=cloud.attach(SmartCocoonAPI()))
+    assert await manager.async_start_from_snapshot(path, "u", "p") is True
+
+    assert manager.revalidation is None
+    assert cloud.sign_ins == 1
+    assert FAN_ID in manager.fans
+
+
+def test_other_versions_are_ignored() -> None:
+    """A snapshot from a different layout is not guessed at."""
+    raw = encode_snapshot({"fans": []})
+    assert decode_snapshot(raw) == {"version": SNAPSHOT_VERSION, "fans": []}
+    assert (
+        decode_snapshot(raw.replace(b'"version":1', b'"version":99')) is None
+    )
+
+
+def test_expired_auth_is_not_restored() -> None:
+    """A token past its expiry would only produce 401s."""
+    api = SmartCocoonAPI()
+    assert not api.restore_auth(
+        {
+            "access-token": "token",
+            "client": "client",
+            "uid": "user@example.com",
+            "expiry": (datetime.now() - timedelta(seconds=1)).timestamp(),
+        }
+    )
+    assert api.auth_state is None
+
+
+@pytest.mark.parametrize("expiry", ["soon", 1e20, float("nan")])
+def test_unusable_expiry_is_not_restored(expiry: Any) -> None:
+    """An expiry that is not a timestamp means signing in as usual."""
+    api = SmartCocoonAPI()
+    assert not api.restore_auth(
+        {
+            "access-token": "token",
+            "client": "client",
+            "uid": "user@example.com",
+            "expiry": expiry,
+        }
+    )
+    assert api.auth_state is None
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Tests for streaming the fans response.
+
+async_request buffered the whole body and built the whole tree of dicts
+before a single fan was applied. With stream_fans the response is parsed as
+it arrives, and each fan is applied as soon as its payload is complete.
+"""
+
+import json
+from typing import Any, Optional
+
+import pytest
+from aiohttp import ClientPayloadError
+from conftest import FakeResponse, FakeSession, fan_payload
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_URL
+from pysmartcocoon.errors import RequestError
+from pysmartcocoon.manager import SmartCocoonManager
+from pysmartcocoon.streaming import JsonArrayStream
+
+
+def _fan(identifier: int, power: int = 3300) -> dict[str, Any]:
+    return fan_payload(
+        id=identifier, fan_id=f"fan-{identifier}", power=power, room_id=7
+    )
+
+
+def _room() -> dict[str, Any]:
+    return {
+        "id": 7,
+        "name": "Salle à manger",
+        "desired_temperature": 21.0,
+        "hvac_mode": "heat",
+        "hvac_state": "idle",
+        "is_estimating": False,
+        "predicted_temperature": 20.0,
+        "target_temperature": 21.0,
+        "temperature": 19.5,
+        "thermostat_id": 3,
+    }
+
+
+def _parse(body: bytes, key: str, chunk: int) -> list[Any]:
+    parser = JsonArrayStream(key)
+    items: list[Any] = []
+    for start in range(0, len(body), chunk):
+        items += parser.feed(body[start : start + chunk])
+    return items + parser.close()
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 7, 64, 100_000])
+def test_items_survive_any_chunking(chunk: int) -> None:
+    """Items split anywhere, even inside a UTF-8 character, come out whole."""
+    document = {
+        "meta": {"fans": [0]},
+        "fans": [_fan(1), {"name": "é☃", "n": [1.5e3, -2]}, 12, None],
+        "tail": 1.25,
+    }
+    body = json.dumps(document, ensure_ascii=False, indent=1).encode()
+    assert _parse(body, "fans", chunk) == document["fans"]
+
+
+def test_items_are_returned_as_soon_as_complete() -> None:
+    """An item is handed back before the rest of the array arrives."""
+    parser = JsonArrayStream("fans")
+    assert parser.feed(b'{"fans": [{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(b": 2}]}") == [{"id": 2}]
+    assert not parser.close()
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"fans": [1, 2',
+        b'{"rooms": []}',
+        b'[{"id": 1}]',
+        b'{"fans": {"id": 1}}',
+        b'{"fans": [1 2]}',
+        b'{"fans": []} trailing',
+    ],
+)
+def test_malformed_bodies_are_refused(body: bytes) -> None:
+    """Cut-short, mis-shaped and trailing data raise ValueError."""
+    with pytest.raises(ValueError):
+        _parse(body, "fans", 3)
+
+
+class _Content:
+    """The part of aiohttp's StreamReader that streaming reads."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, body: bytes, fail_after: Optional[int]) -> None:
+        self._body = body
+        self._fail_after = fail_after
+        self.reads = 0
+
+    async def read(self, size: int) -> bytes:
+        """Return the next size bytes, or fail after fail_after reads."""
+        if self._fail_after is not None and self.reads >= self._fail_after:
+            raise ClientPayloadError("Response payload is not completed")
+        offset = self.reads * size
+        self.reads += 1
+        return self._body[offset : offset + size]
+
+
+class _StreamedResponse(FakeResponse):
+    """A response that can be decoded whole or read in chunks."""
+
+    def __init__(self, document: Any, fail_after: Optional[int]) -> None:
+        super().__init__(document)
+        self.content = _Content(
+            json.dumps(document).encode(), fail_after=fail_after
+        )
+
+
+class _FakeSession(FakeSession):
+    """Serves rooms and a configurable fan list."""
+
+    def __init__(self, fans: list[dict[str, Any]]) -> None:
+        super().__init__()
+        self.fans = fans
+        self.fail_after: Optional[int] = None
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Answer a collection GET."""
+        del method, kwargs
+        key = url.removeprefix(API_URL)
+        items: dict[str, list[dict[str, Any]]] = {
+            "fans": self.fans,
+            "rooms": [_room()],
+        }
+        return _StreamedResponse(
+            {key: items.get(key, [])},
+            self.fail_after if key == "fans" else None,
+        )
+
+
+def _manager(session: _FakeSession) -> SmartCocoonManager:
+    api = SmartCocoonAPI(session)  # type: ignore[arg-type]
+    return SmartCocoonManager(api=api, stream_fans=True)
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_items_before_the_body_is_read() -> None:
+    """The first fan arrives after one chunk, not the whole body."""
+    session = _FakeSession([_fan(i) for i in range(20)])
+    api = SmartCocoonAPI(session)  # type: ignore[arg-type]
+
+    stream = api.async_stream_items(f"{API_URL}fans", "fans", chunk_size=512)
+    first = await anext(stream)
+    response = session.responses[0]
+    assert isinstance(response, _StreamedResponse)
+    reads_at_first = response.content.reads
+    rest = [item async for item in stream]
+
+    assert first == _fan(0) and rest == [_fan(i) for i in range(1, 20)]
+    assert reads_at_first == 1 < response.content.reads
+    assert response.released
+
+
+@pytest.mark.asyncio
+async def test_manager_applies_streamed_fans() -> None:
+    """Streamed fans are added, named after rooms, changed and removed."""
+    session = _FakeSession([_fan(1), _fan(2)])
+    manager = _manager(session)
+
+    changes = await manager.async_update_data()
+    assert sorted(manager.fans) == ["fan-1", "fan-2"]
+    assert manager.fans["fan-1"].room_name == "Salle à manger"
+    assert {c.identifier for c in changes.added} >= {"fan-1", "fan-2"}
+
+    session.fans = [_fan(1, power=5000)]
+    changes = await manager.async_update_data()
+    assert [c.identifier for c in changes.removed] == ["fan-2"]
+    assert [c.fields for c in changes.changed] == [{"power": (3300, 5000)}]
+
+
+@pytest.mark.asyncio
+async def test_failure_partway_keeps_fans_already_applied() -> None:
+    """A broken stream removes nothing, but keeps what it applied."""
+    session = _FakeSession([_fan(i) for i in range(100)])
+    manager = _manager(session)
+    await manager.async_update_fans()
+    assert len(manager.fans) == 100
+
+    # The body is about twice the 16 KiB read, so about half the fans
+    # arrive before the connection drops.
+    session.fans = [_fan(i, power=1000) for i in range(100)]
+    session.fail_after = 1
+    await manager.async_update_fans()
+
+    assert len(manager.fans) == 100
+    updated = [f for f in manager.fans.values() if f.speed_pct == 10]
+    assert 0 < len(updated) < 100
+
+
+@pytest.mark.asyncio
+async def test_stream_errors_are_request_errors() -> None:
+    """A lost connection surfaces as RequestError from the API."""
+    session = _FakeSession([_fan(1)])
+    session.fail_after = 0
+    api = SmartCocoonAPI(session)  # type: ignore[arg-type]
+
+    with pytest.raises(RequestError):
+        async for _ in api.async_stream_items(f"{API_URL}fans", "fans"):
+            pass
+    assert session.responses[0].released
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Tests for filtered subscriptions and polling on subscribers' behalf.
+
+Consumers used to learn about fan changes only by each calling
+async_update_fans on a timer, so every extra consumer meant extra requests.
+Consumers now subscribe to a fan or an entity type, and the manager polls
+once for all of them and delivers only what each asked for.
+"""
+
+import asyncio
+import copy
+from typing import Any
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.changes import ChangeSet
+from pysmartcocoon.const import API_URL, EntityType
+from pysmartcocoon.manager import SmartCocoonManager
+
+# pylint: disable=protected-access
+
+
+def _fan(fan_id: str, power: int = 3300) -> dict[str, Any]:
+    return fan_payload(id=40 + len(fan_id), fan_id=fan_id, power=power)
+
+
+class _CloudAPI:
+    """Serves the test's collections and counts requests per collection."""
+
+    def __init__(self) -> None:
+        self.responses: dict[str, Any] = {
+            "client_systems": {"client_systems": []},
+            "thermostats": {"thermostats": []},
+            "rooms": {"rooms": []},
+            "fans": {"fans": [_fan("fan-a"), _fan("fan-b")]},
+        }
+        self.requests: dict[str, int] = {}
+
+    async def async_request(
+        self, method: str, url: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Return a copy, as a real response would be a fresh object."""
+        del method, kwargs
+        key = url.removeprefix(API_URL)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        return copy.deepcopy(self.responses[key])
+
+    def add_rate_limit_listener(self, listener: Any) -> Any:
+        """Accept the listener; this cloud never answers 429."""
+        del listener
+        return lambda: None
+
+
+async def _started() -> tuple[SmartCocoonManager, _CloudAPI]:
+    api = _CloudAPI()
+    manager = SmartCocoonManager(api=api)  # type: ignore[arg-type]
+    await manager.async_update_data()
+    api.requests.clear()
+    return manager, api
+
+
+@pytest.mark.asyncio
+async def test_fan_subscriber_only_hears_about_its_fan() -> None:
+    """A change to another fan is not delivered."""
+    manager, api = await _started()
+    fan_a: list[ChangeSet] = []
+    fan_b: list[ChangeSet] = []
+    manager.subscribe_fan("fan-a", fan_a.append)
+    manager.subscribe_fan("fan-b", fan_b.append)
+
+    api.responses["fans"] = {"fans": [_fan("fan-a"), _fan("fan-b", 5000)]}
+    await manager.async_update_fans()
+
+    assert not fan_a
+    assert [(c.identifier, c.fields) for c in fan_b[0]] == [
+        ("fan-b", {"power": (3300, 5000)})
+    ]
+
+
+@pytest.mark.asyncio
+async def test_type_subscriber_ignores_other_types() -> None:
+    """A rooms subscriber is not called for fan changes."""
+    manager, api = await _started()
+    rooms: list[ChangeSet] = []
+    manager.subscribe(rooms.append, EntityType.ROOMS)
+
+    api.responses["fans"] = {"fans": [_fan("fan-a", 5000), _fan("fan-b")]}
+    await manager.async_update_data()
+
+    assert not rooms
+
+
+def test_identifier_needs_an_entity_type() -> None:
+    """An identifier alone is ambiguous across types."""
+    with pytest.raises(ValueError):
+        SmartCocoonManager().subscribe(print, identifier="fan-a")
+
+
+@pytest.mark.asyncio
+async def test_poll_fetches_only_subscribed_types_once() -> None:
+    """Many fan subscribers cost one fans request and nothing else."""
+    manager, api = await _started()
+    for _ in range(10):
+        manager.subscribe_fan("fan-a", lambda _: None)
+
+    await manager._async_poll_subscribed()
+
+    assert api.requests == {"fans": 1}
+
+
+@pytest.mark.asyncio
+async def test_poll_without_subscribers_makes_no_requests() -> None:
+    """Nobody listening means nothing to fetch."""
+    manager, api = await _started()
+    unsubscribe = manager.subscribe(lambda _: None)
+    unsubscribe()
+
+    assert not await manager._async_poll_subscribed()
+    assert not api.requests
+
+
+@pytest.mark.asyncio
+async def test_background_updates_deliver_changes() -> None:
+    """start_updates polls until stopped."""
+    manager, api = await _started()
+    received: list[ChangeSet] = []
+    manager.subscribe_fan("fan-a", received.append)
+
+    api.responses["fans"] = {"fans": [_fan("fan-a", 5000), _fan("fan-b")]}
+    manager.start_updates(interval=0.01)
+    for _ in range(100):
+        if received:
+            break
+        await asyncio.sleep(0.01)
+    await manager.async_stop_updates()
+
+    assert [c.identifier for c in received[0]] == ["fan-a"]
+    polls = api.requests["fans"]
+    await asyncio.sleep(0.05)
+    assert api.requests["fans"] == polls
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Tests for renewing the token before it expires.
+
+Expiry used to be discovered only when a request failed with 401, so every
+token lifetime ended in a failed request and a retry. The token is now
+renewed ahead of time, and requests made meanwhile wait on that one sign-in.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from conftest import FakeResponse, FakeSession
+
+from pysmartcocoon.api import SmartCocoonAPI
+from pysmartcocoon.const import API_AUTH_URL, API_FANS_URL
+
+# pylint: disable=protected-access
+
+
+class _FakeSession(FakeSession):
+    """Signs in with a new token each time and records every request."""
+
+    def __init__(self, expiry: int = 3600, sign_in_delay: float = 0) -> None:
+        super().__init__()
+        self.expiry = expiry
+        self.sign_in_delay = sign_in_delay
+        self.sign_ins = 0
+        self.refuse_sign_ins = False
+        self.tokens_sent: list[str] = []
+
+    async def respond(
+        self, method: str, url: str, **kwargs: Any
+    ) -> FakeResponse:
+        """Answer a sign-in or a fan request."""
+        del method
+        if url == API_AUTH_URL:
+            self.sign_ins += 1
+            token = f"token-{self.sign_ins}"
+            await asyncio.sleep(self.sign_in_delay)
+            if self.refuse_sign_ins:
+                return FakeResponse(status=401, url=url)
+            return FakeResponse(
+                {"data": {"id": 1, "email": "user@example.com"}},
+                headers={
+                    "access-token": token,
+                    "client": "client",
+                    "expiry": str(self.expiry),
+                },
+            )
+        self.tokens_sent.append(kwargs["headers"].get("access-token", ""))
+        return FakeResponse({"id": 42})
+
+
+def _api(session: _FakeSession, **kwargs: Any) -> SmartCocoonAPI:
+    return SmartCocoonAPI(session, **kwargs)  # type: ignore[arg-type]
+
+
+@pytest.mark.asyncio
+async def test_requests_wait_on_the_sign_in_in_flight() -> None:
+    """Requests made during a sign-in send the token it produces."""
+    session = _FakeSession(sign_in_delay=0.05)
+    api = _api(session)
+    try:
+        sign_in = asyncio.create_task(api.async_authenticate("u", "p"))
+        await asyncio.sleep(0)
+        await asyncio.gather(
+            *(api.async_get_fan(fan) for fan in range(3)), sign_in
+        )
+    finally:
+        await api.close()
+
+    assert session.sign_ins == 1
+    assert session.tokens_sent == ["token-1"] * 3
+
+
+@pytest.mark.asyncio
+async def test_due_token_is_renewed_once_for_concurrent_requests() -> None:
+    """A token due for renewal is renewed by one sign-in, not one each."""
+    session = _FakeSession(sign_in_delay=0.01)
+    api = _api(session)
+    try:
+        await api.async_authenticate("u", "p")
+        api._token_refresh_at = datetime.now() - timedelta(seconds=1)
+
+        await asyncio.gather(*(api.async_get_fan(fan) for fan in range(5)))
+    finally:
+        await api.close()
+
+    assert session.sign_ins == 2
+    assert session.tokens_sent == ["token-2"] * 5
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_is_not_retried_before_every_request() -> None:
+    """Once a refresh fails, requests use the token they have meanwhile."""
+    session = _FakeSession()
+    api = _api(session)
+    try:
+        await api.async_authenticate("u", "p")
+        api._token_refresh_at = datetime.now() - timedelta(seconds=1)
+        session.refuse_sign_ins = True
+
+        for fan in range(3):
+            await api.async_get_fan(fan)
+
+        assert session.sign_ins == 2
+        assert session.tokens_sent == ["token-1"] * 3
+        # Retried in the background instead, after a growing delay.
+        assert api._token_refresh_at > datetime.now() + timedelta(seconds=20)
+        assert api._refresh_task is not None
+    finally:
+        await api.close()
+
+
+@pytest.mark.asyncio
+async def test_token_is_renewed_in_the_background(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Without any requests, the token is still renewed before expiry."""
+    monkeypatch.setattr("pysmartcocoon.api.MIN_TOKEN_REFRESH_DELAY", 0)
+    # The API treats expiry as seconds and keeps 10 in hand, so this is a
+    # one second lifetime, renewed halfway through.
+    session = _FakeSession(expiry=11)
+    api = _api(session)
+    try:
+        await api.async_authenticate("u", "p")
+        await asyncio.sleep(0.7)
+        assert session.sign_ins == 2
+        assert api._headers_auth["access-token"] == "token-2"
+    finally:
+        await api.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_can_be_turned_off() -> None:
+    """With no margin, nothing is scheduled or renewed early."""
+    session = _FakeSession()
+    api = _api(session, token_refresh_margin=None)
+    try:
+        await api.async_authenticate("u", "p")
+        assert api._refresh_task is None
+
+        await api.async_request("GET", f"{API_FANS_URL}42")
+    finally:
+        await api.close()
+
+    assert session.sign_ins == 1
+
+
+@pytest.mark.asyncio
+async def test_close_stops_the_background_refresh() -> None:
+    """close() must not leave the refresh task running."""
+    api = _api(_FakeSession())
+    await api.async_authenticate("u", "p")
+    task = api._refresh_task
+    assert task is not None
+
+    await api.close()
+    await asyncio.sleep(0)
+
+    assert task.cancelled()
+    assert api._refresh_task is None
+
+
+@pytest.mark.asyncio
+async def test_sign_in_finishing_after_close_schedules_nothing() -> None:
+    """close() stops a sign-in in flight, and no refresh starts after it."""
+    session = _FakeSession(sign_in_delay=0.05)
+    api = _api(session)
+    sign_in = asyncio.create_task(api.async_authenticate("u", "p"))
+    await asyncio.sleep(0.01)
+
+    await api.close()
+    with pytest.raises(asyncio.CancelledError):
+        await sign_in
+    api._schedule_token_refresh()
+
+    assert api._refresh_task is None and api._sign_in is None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Tests for applying a fan update's response instead of re-fetching.
+
+The update's response is normally the fan itself, so following every update
+with a GET of the same fan doubled the latency of each command. The GET is
+now only made when the response is not a complete fan payload.
+"""
+
+from typing import Any, Optional
+
+import pytest
+from conftest import fan_payload
+
+from pysmartcocoon.fan import Fan
+
+FAN_ID = "abc123"
+
+
+def _api_payload(power: int = 3300, mode: str = "always_on") -> dict[str, Any]:
+    """A fan payload shaped like the API's, for seeding state."""
+    return fan_payload(id=42, fan_id=FAN_ID, mode=mode, power=power, room_id=7)
+
+
+class _StubAPI:
+    """Returns a configurable update response and counts fetches."""
+
+    # pylint: disable=unused-argument
+
+    def __init__(self, update_result: Optional[dict[str, Any]]) -> None:
+        self._update_result = update_result
+        self.get_calls = 0
+
+    async def async_update_fan(
+        self, fan_identifier: int, mode: str, power: int
+    ) -> Optional[dict[str, Any]]:
+        """Return the configured response."""
+        return self._update_result
+
+    async def async_get_fan(self, fan_identifier: int) -> dict[str, Any]:
+        """Count the confirming fetch."""
+        self.get_calls += 1
+        return _api_payload(power=6000)
+
+
+async def _seeded_fan(api: Any, **kwargs: Any) -> Fan:
+    fan = Fan(FAN_ID, api, **kwargs)
+    await fan.async_update_api_data(_api_payload())
+    return fan
+
+
+@pytest.mark.asyncio
+async def test_complete_response_is_applied_without_a_fetch() -> None:
+    """A full payload in the response replaces the confirming GET."""
+    api = _StubAPI(update_result=_api_payload(power=5000))
+    fan = await _seeded_fan(api)
+
+    assert await fan.async_set_fan_modes(fan_speed_pct=50) is True
+    assert api.get_calls == 0
+    assert fan.power == 5000
+
+
+@pytest.mark.asyncio
+async def test_partial_response_falls_back_to_a_fetch() -> None:
+    """A response that is not a whole fan still gets confirmed."""
+    api = _StubAPI(update_result={"success": True})
+    fan = await _seeded_fan(api)
+
+    assert await fan.async_set_fan_modes(fan_speed_pct=50) is True
+    assert api.get_calls == 1
+    assert fan.power == 6000
+
+
+@pytest.mark.asyncio
+async def test_fallback_fetch_can_be_disabled() -> None:
+    """With the fallback off, a partial response keeps the local values."""
+    api = _StubAPI(update_result={"success": True})
+    fan = await _seeded_fan(api, refresh_on_partial_response=False)
+
+    assert await fan.async_set_fan_modes(fan_speed_pct=50) is True
+    assert api.get_calls == 0
+    assert fan.power == 5000
+
+
+def test_missing_api_fields() -> None:
+    """The completeness check names exactly the absent fields."""
+    data = _api_payload()
+    assert not Fan.missing_api_fields(data)
+
+    del data["power"]
+    del data["room_id"]
+    assert Fan.missing_api_fields(data) == ["power", "room_id"]